@@ -1,2 +1,8 @@
+import sys
+from src.startup import startup
+if '--startup-report' in sys.argv[1:]:
+    startup.enable() # Time everything from here to the first main menu, including the game's imports
 from src import game
-game.start_game()
\ No newline at end of file
+startup.mark('imports')
+exit_code = game.start_game(profile='--profile' in sys.argv[1:])
+sys.exit(exit_code or startup.finish()) # No startup report if the main menu was never reached
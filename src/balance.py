@@ -0,0 +1,124 @@
+from .utils import *
+from .simulation import np, require_numpy, simulate_battles
+from . import globals
+
+import csv
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+# Columns of the balance matrix, in the order they are written to CSV files
+COLUMNS = ['weapon', 'enemy', 'level', 'playerHealth', 'winRate', 'meanTurns', 'unfinished', 'xpPerTurn', 'moneyPerTurn']
+
+def init_worker(enemies, weapons, attacks):
+    """Loads the game content sent by the main process into a worker process, so workers don't read the data folders again."""
+    globals.enemies = enemies
+    globals.weapons = weapons
+    globals.attacks = attacks
+    globals.index_content()
+
+def run_cell(cell):
+    """
+    Simulates the battles of one cell of the balance matrix.
+
+    Parameters:
+    cell (tuple): Weapon ID, enemy ID, player level, number of battles and the cell's numpy.random.SeedSequence
+
+    Returns:
+    dict: One row of the balance matrix (see COLUMNS)
+    """
+    weapon_id, enemy_id, level, battles, seed = cell
+    enemy = globals.get_enemy(enemy_id)
+    result = simulate_battles(globals.get_weapon(weapon_id), enemy, level, battles, seed)
+
+    # Average reward of a battle (only won battles are rewarded) spread over the average length of a battle
+    rewards = enemy['rewards']
+    mean_turns = result['meanTurns']
+    xp_per_turn = result['winRate'] * (rewards['minXp'] + rewards['maxXp']) / 2 / mean_turns if mean_turns else 0.0
+    money_per_turn = result['winRate'] * (rewards['minMoney'] + rewards['maxMoney']) / 2 / mean_turns if mean_turns else 0.0
+
+    return {
+        'weapon': weapon_id,
+        'enemy': enemy_id,
+        'level': level,
+        'playerHealth': globals.Player.health_for_level(level),
+        'winRate': result['winRate'],
+        'meanTurns': mean_turns,
+        'unfinished': result['unfinished'],
+        'xpPerTurn': xp_per_turn,
+        'moneyPerTurn': money_per_turn
+    }
+
+def sweep(weapon_ids, enemy_ids, levels, battles=10000, seed=None, workers=None, chunksize=None):
+    """
+    Simulates every weapon, enemy and level combination in parallel over a pool of processes.
+    Every cell gets its own random stream spawned from the seed, so results don't depend on the number of workers.
+
+    Parameters:
+    weapon_ids (list): IDs of the weapons to test
+    enemy_ids (list): IDs of the enemies to test
+    levels (list): Player levels to test
+    battles (int): Number of battles simulated per cell
+    seed (int, optional): Seed for reproducible results
+    workers (int, optional): Number of worker processes, defaults to the number of CPU cores
+    chunksize (int, optional): Number of cells sent to a worker at once, picked from the number of cells and workers if not set
+
+    Returns:
+    list: One row per cell (see run_cell), in weapon, enemy, level order
+    """
+    require_numpy()
+    cell_keys = [(weapon_id, enemy_id, level) for weapon_id in weapon_ids for enemy_id in enemy_ids for level in levels]
+    seeds = np.random.SeedSequence(seed).spawn(len(cell_keys))
+    cells = [key + (battles, cell_seed) for key, cell_seed in zip(cell_keys, seeds)]
+
+    workers = workers or os.cpu_count() or 1
+    # A few chunks per worker keeps every core busy until the end without sending cells one by one
+    chunksize = chunksize or max(1, len(cells) // (workers * 4))
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(globals.enemies, globals.weapons, globals.attacks)) as executor:
+        return list(executor.map(run_cell, cells, chunksize=chunksize))
+
+def write_matrix(path, rows):
+    """Writes the balance matrix to a CSV file if the path ends with .csv, otherwise to a JSON file."""
+    if path.lower().endswith('.csv'):
+        with open(path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.DictWriter(file, fieldnames=COLUMNS)
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(rows, file, indent=4)
+
+def main(arguments=None):
+    """Command line entry point: python -m src.balance [--output balance.csv]"""
+    import argparse
+    from .game import load_content
+
+    parser = argparse.ArgumentParser(description="Simulate every weapon against every enemy at every player level.")
+    parser.add_argument('-o', '--output', default='balance.json', help="File to write the matrix to, .csv or .json (default: balance.json)")
+    parser.add_argument('-n', '--battles', type=int, default=10000, help="Number of battles per cell")
+    parser.add_argument('--levels', type=int, nargs=2, default=[0, 40], metavar=('MIN', 'MAX'), help="Range of player levels, inclusive (default: 0 40)")
+    parser.add_argument('--weapons', nargs='+', default=None, help="IDs of the weapons to test (default: all)")
+    parser.add_argument('--enemies', nargs='+', default=None, help="IDs of the enemies to test (default: all)")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="Number of worker processes (default: CPU count)")
+    parser.add_argument('--chunksize', type=int, default=None, help="Number of cells sent to a worker at once")
+    parser.add_argument('--seed', type=int, default=None, help="Seed for reproducible results")
+    arguments = parser.parse_args(arguments)
+
+    load_content()
+    weapon_ids = arguments.weapons or [weapon['id'] for weapon in globals.weapons]
+    enemy_ids = arguments.enemies or [enemy['id'] for enemy in globals.enemies]
+    unknown = [id for id in weapon_ids if globals.get_weapon(id) is None] + [id for id in enemy_ids if globals.get_enemy(id) is None]
+    if unknown:
+        parser.error(f"Unknown IDs: {', '.join(unknown)}")
+    levels = list(range(arguments.levels[0], arguments.levels[1] + 1))
+
+    start_time = time.perf_counter()
+    rows = sweep(weapon_ids, enemy_ids, levels, arguments.battles, arguments.seed, arguments.workers, arguments.chunksize)
+    elapsed = time.perf_counter() - start_time
+
+    write_matrix(arguments.output, rows)
+    total_battles = len(rows) * arguments.battles
+    print(f"Simulated {len(rows)} cells ({total_battles:,} battles) in {elapsed:.2f}s ({total_battles / max(elapsed, 1e-9):,.0f} battles/s), saved to {arguments.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,285 @@
+from .menus import *
+from .utils import *
+from . import globals
+
+import io
+
+# Benchmarks register themselves here with @benchmark (name: setup function returning the function to time)
+BENCHMARKS = {}
+
+PERCENTILES = [50, 90, 99]  # Percentiles of the time per operation that are reported
+REGRESSION_THRESHOLD = 0.10  # Slowdown compared to the baseline that is reported as a regression (10%)
+
+def benchmark(name):
+    """
+    Registers a benchmark. The decorated function prepares the data and returns the function to time,
+    so the preparation isn't part of the results.
+
+    Parameters:
+    name (str): Name of the benchmark in the results
+    """
+    def decorator(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return decorator
+
+# ========================
+#        RUNNER
+# ========================
+
+def percentile(sorted_values, percent):
+    """Returns the percentile of sorted values, interpolating between the closest two."""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * percent / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+def run_benchmark(function, duration=0.5, batch_time=0.002):
+    """
+    Times a function by calling it in batches until the duration has passed.
+
+    Parameters:
+    function (function): The function to time, called without arguments
+    duration (float): Seconds to run the benchmark for
+    batch_time (float): Target seconds per batch, fast functions are called many times per batch so timer overhead doesn't count
+
+    Returns:
+    dict: Operations per second, mean and percentiles of the seconds per operation, and the number of operations
+    """
+    # Warm up (fills caches like the content snapshot) and pick the batch size
+    start = time.perf_counter()
+    function()
+    single = time.perf_counter() - start
+    batch_size = max(1, int(batch_time / single)) if single > 0 else 1000
+
+    samples = []  # Seconds per operation of each batch
+    operations = 0
+    total = 0.0
+    while total < duration or len(samples) < 5:
+        start = time.perf_counter()
+        for _ in range(batch_size):
+            function()
+        elapsed = time.perf_counter() - start
+        samples.append(elapsed / batch_size)
+        operations += batch_size
+        total += elapsed
+
+    samples.sort()
+    result = {
+        'opsPerSecond': operations / total,
+        'mean': total / operations,
+        'operations': operations,
+        'batchSize': batch_size
+    }
+    for percent in PERCENTILES:
+        result[f'p{percent}'] = percentile(samples, percent)
+    return result
+
+def run_benchmarks(names=None, duration=0.5):
+    """
+    Runs the registered benchmarks.
+
+    Parameters:
+    names (list, optional): Names (or parts of names) of the benchmarks to run, every benchmark if not set
+    duration (float): Seconds to run each benchmark for
+
+    Returns:
+    dict: Results with the environment they were measured in and the result of each benchmark by name
+    """
+    results = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'benchmarks': {}
+    }
+    for name, setup in BENCHMARKS.items():
+        if names and not any(part in name for part in names):
+            continue
+        function = setup()
+        results['benchmarks'][name] = run_benchmark(function, duration)
+        print(format_result(name, results['benchmarks'][name]))
+    return results
+
+def format_time(seconds):
+    """Formats seconds per operation with a readable unit."""
+    if seconds >= 1:
+        return f'{seconds:.2f} s'
+    if seconds >= 1e-3:
+        return f'{seconds * 1e3:.2f} ms'
+    if seconds >= 1e-6:
+        return f'{seconds * 1e6:.2f} µs'
+    return f'{seconds * 1e9:.0f} ns'
+
+def format_result(name, result, baseline=None):
+    """Formats a benchmark result as a line of the report, with the change from the baseline result if given."""
+    line = f"{name:<46} {result['opsPerSecond']:>14,.0f} ops/s " + ' '.join(f"p{percent} {format_time(result[f'p{percent}']):>10}" for percent in PERCENTILES)
+    if baseline:
+        change = baseline['opsPerSecond'] / result['opsPerSecond'] - 1  # Positive when slower than the baseline
+        line += f" {'slower' if change > 0 else 'faster'} {abs(change) * 100:6.1f}%"
+        if change > REGRESSION_THRESHOLD:
+            line += ' (regression)'
+    return line
+
+def compare_results(results, baseline):
+    """
+    Prints the results next to a baseline measured before a change.
+
+    Returns:
+    list: Names of the benchmarks that got slower than the regression threshold
+    """
+    regressions = []
+    print(f"\nCompared to the baseline from {baseline.get('timestamp')} (Python {baseline.get('python')}):")
+    for name, result in results['benchmarks'].items():
+        baseline_result = baseline['benchmarks'].get(name)
+        print(format_result(name, result, baseline_result))
+        if baseline_result and baseline_result['opsPerSecond'] / result['opsPerSecond'] - 1 > REGRESSION_THRESHOLD:
+            regressions.append(name)
+    return regressions
+
+# ========================
+#       BENCHMARKS
+# ========================
+
+def captured_console():
+    """Returns a Console that renders into memory like a 120 column color terminal, so menus can be rendered without printing."""
+    return Console(file=io.StringIO(), width=120, force_terminal=True, color_system='truecolor')
+
+def reset_console(console):
+    """Empties the output of a captured console so it doesn't keep growing."""
+    console.file.seek(0)
+    console.file.truncate()
+
+@benchmark('load_game_data')
+def bench_load_game_data():
+    from . import game
+    from .session import GameSession
+    from .save_manager import SaveManager
+
+    # Load the player from a temporary save file so the real one is never touched
+    globals.save_manager = SaveManager(tempfile.mkdtemp(), 'save_file')
+    return lambda: game.load_game_data(GameSession())
+
+def sort_setup(key, order):
+    """Returns a benchmark of sorting an inventory of every weapon in shuffled order."""
+    def setup():
+        from .game import sort_displayed_weapons
+        weapon_ids = [weapon['id'] for weapon in globals.weapons]
+        random.Random(0).shuffle(weapon_ids)
+        return lambda: sort_displayed_weapons(key, order, weapon_ids)
+    return setup
+
+for sort_key in ['levelRequirement', 'price']:
+    for sort_order in [True, False]:
+        benchmark(f"sort_displayed_weapons[{sort_key},{'asc' if sort_order else 'desc'}]")(sort_setup(sort_key, sort_order))
+
+@benchmark('determine_attack')
+def bench_determine_attack():
+    from .combat import CombatEngine, resolve_abilities
+    weapon = max(globals.weapons, key=lambda weapon: weapon.get('levelRequirement', 0))
+    enemy = max(globals.enemies, key=lambda enemy: enemy.get('level', 0))
+    engine = CombatEngine(resolve_abilities(weapon), enemy, 20, rng=random.Random(0))
+    attack = engine.abilities[0]
+    return lambda: engine.determine_attack(attack)
+
+@benchmark('get_random_message')
+def bench_get_random_message():
+    from .fight import get_random_message, enemy_attack_messages
+    format = {
+        'attack_name': style_text({'color': [252, 144, 3]}, 'Fireball'),
+        'enemy_name': Text('Dragon'),
+        'damage': style_text({'color': [201, 237, 154]}, '42')
+    }
+    return lambda: get_random_message(enemy_attack_messages['crit'], format)
+
+@benchmark('style_text')
+def bench_style_text():
+    styled = Text('existing text', style='italic')
+    return lambda: style_text({'style': 'bold', 'color': [252, 144, 3]}, 'Lvl. ', styled)
+
+@benchmark('wrap_text')
+def bench_wrap_text():
+    description = ' '.join(weapon.get('description', '') for weapon in globals.weapons[:5]) or 'word ' * 100
+    return lambda: wrap_text(description, 60, '    ')
+
+@benchmark('merge_sort')
+def bench_merge_sort():
+    weapons = list(globals.weapons)
+    random.Random(0).shuffle(weapons)
+    return lambda: merge_sort(weapons, 'levelRequirement')
+
+@benchmark('roll_percentage')
+def bench_roll_percentage():
+    rng = random.Random(0)
+    return lambda: roll_percentage(0.025, rng)
+
+@benchmark('print_basic_menu')
+def bench_print_basic_menu():
+    from . import menus
+    console = captured_console()
+    options = [Text(option) for option in ['Play', 'Shop', 'Inventory', 'Settings', 'Exit']]
+    title = style_text({'style': 'bold'}, 'Main Menu | Lvl. 20')
+    tooltip = style_text({'style': 'italic'}, ' Arrow Keys ↑/↓ to navigate | ENTER to select')
+
+    def render():
+        menus.console = console
+        reset_console(console)
+        menus.print_basic_menu(options, 2, title, None, None, tooltip)
+    return render
+
+@benchmark('print_paged_menu')
+def bench_print_paged_menu():
+    from . import menus
+    console = captured_console()
+    options = [style_text(weapon['title'], weapon['name']) for weapon in globals.weapons]
+    title = style_text({'style': 'bold'}, 'Shop')
+    tooltip = style_text({'style': 'italic'}, ' Arrow Keys ↑/↓ to navigate | ←/→ to change page | ENTER to select')
+
+    def render():
+        menus.console = console
+        reset_console(console)
+        menus.print_paged_menu(list(options), len(options) // 2, title, tooltip, 5)
+    return render
+
+def main(arguments=None):
+    """Command line entry point: python -m src.benchmark"""
+    import argparse
+    from .game import load_content
+
+    parser = argparse.ArgumentParser(description="Benchmark the game's hot paths and compare the results with an earlier run.")
+    parser.add_argument('names', nargs='*', help="Only run benchmarks whose name contains one of these")
+    parser.add_argument('-t', '--time', type=float, default=0.5, help="Seconds to run each benchmark for (default: 0.5)")
+    parser.add_argument('-o', '--output', help="Save the results to this JSON file")
+    parser.add_argument('-c', '--compare', help="Compare the results with a JSON file saved by an earlier run")
+    parser.add_argument('-l', '--list', action='store_true', help="List the benchmarks and exit")
+    arguments = parser.parse_args(arguments)
+
+    if arguments.list:
+        print('\n'.join(BENCHMARKS))
+        return 0
+
+    configure_logging('WARNING')  # Keep the benchmarked functions from filling the debug log
+    load_content()
+    from . import menus
+    original_console = menus.console
+    try:
+        results = run_benchmarks(arguments.names, arguments.time)
+    finally:
+        menus.console = original_console
+
+    if arguments.output:
+        write_json_atomic(arguments.output, results)
+        print(f'Saved results to {arguments.output}')
+
+    if arguments.compare:
+        with open(arguments.compare, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+        regressions = compare_results(results, baseline)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) got more than {REGRESSION_THRESHOLD * 100:.0f}% slower: {', '.join(regressions)}")
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+from .utils import *
+
+# ========================
+#         CLOCKS
+# ========================
+
+class RealClock:
+    """Waits in real time."""
+    def now(self):
+        """Returns the current time in seconds."""
+        return time.monotonic()
+
+    def to_real(self, seconds):
+        """Returns how many real seconds a wait of this clock takes."""
+        return seconds
+
+    def sleep(self, seconds):
+        """Waits for the given number of seconds."""
+        if seconds > 0:
+            time.sleep(self.to_real(seconds))
+
+class ScaledClock(RealClock):
+    """
+    Waits in real time multiplied by a scale, e.g. 0.5 makes every wait twice as fast.
+
+    Parameters:
+    scale (float): Multiplier of every wait
+    """
+    def __init__(self, scale):
+        self.scale = max(scale, 0)
+
+    def to_real(self, seconds):
+        return seconds * self.scale
+
+class InstantClock(RealClock):
+    """Never waits, the time only moves forward virtually so replays and automated battles finish immediately."""
+    def __init__(self):
+        self.virtual_time = 0.0  # Total seconds waited on this clock
+
+    def now(self):
+        return self.virtual_time
+
+    def to_real(self, seconds):
+        return 0
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self.virtual_time += seconds
+
+# ========================
+#      ACTIVE CLOCKS
+# ========================
+
+# Battles use two clocks: one for pacing the battle logs and one for ticking the turn timer.
+# Clocks set with set_clock() take priority over the clock picked from the player's settings.
+# The battle log clock is picked per battle (see battle_clock), so sessions with different settings don't share it.
+pacing_override = None
+turn_timer_override = None
+real_clock = RealClock()
+
+def clock_from_settings(settings):
+    """
+    Picks the clock for battle logs from the player's settings.
+
+    Parameters:
+    settings (dict): The player's settings
+
+    Returns:
+    RealClock: InstantClock if instant battle logs are enabled, ScaledClock if the battle clock scale isn't 1, otherwise RealClock.
+    """
+    if settings.get('instantBattleLogs'):
+        return InstantClock()
+    scale = settings.get('battleClockScale', 1)
+    if isinstance(scale, (int, float)) and scale != 1:
+        return ScaledClock(scale)
+    return RealClock()
+
+def battle_clock(settings):
+    """
+    Returns the clock for the battle logs of a battle: the clock set with set_clock, otherwise the one picked from the player's settings.
+
+    Parameters:
+    settings (dict): The settings of the battle's player
+    """
+    return pacing_override or clock_from_settings(settings)
+
+def set_clock(clock, turn_timer=False):
+    """
+    Sets the clock for battle logs or the turn timer, e.g. InstantClock() for automated battles.
+
+    Parameters:
+    clock (RealClock or None): The clock to use, None goes back to the default
+    turn_timer (bool): Whether to set the clock of the turn timer (True) or the battle logs (False)
+    """
+    global pacing_override, turn_timer_override
+    if turn_timer:
+        turn_timer_override = clock
+    else:
+        pacing_override = clock
+
+def get_clock(turn_timer=False):
+    """Returns the clock used for battle logs, or for the turn timer if turn_timer is True."""
+    if turn_timer:
+        return turn_timer_override or real_clock
+    return pacing_override or real_clock
+
+def sleep(seconds):
+    """Waits on the battle log clock."""
+    get_clock().sleep(seconds)
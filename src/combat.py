@@ -0,0 +1,289 @@
+from .utils import *
+from . import globals
+
+# ========================
+#        ABILITIES
+# ========================
+
+def resolve_abilities(weapon):
+    """
+    Merges the abilities of a weapon with the data of their corresponding attacks.
+
+    Parameters:
+    weapon (dict): Data of the weapon
+
+    Returns:
+    list: A dictionary for each ability with its stats, name, title and messages
+    """
+    abilities = []
+    for ability in weapon['abilities']:
+        attack = globals.get_attack(ability['id'])
+
+        if attack is None:
+            raise Exception(f"Couldn't load data properly for {weapon['id']}: weapon ability is missing a corresponding attack")
+
+        ability_info = {}
+        for key, value in ability.items():
+            ability_info[key] = value
+
+        for key, value in attack.items():
+            if key in ['id', 'description']:
+                continue # Skip id because we already fetched it before, skip description because it's not needed
+            ability_info[key] = value
+
+        # Important keys required for fight mechanics
+        important_keys = ['name', 'title', 'id', 'messages', 'minDamage', 'maxDamage', 'critMulti', 'critChance', 'hitChance', 'cooldown']
+        for key in important_keys:
+            if key not in ability_info:
+                raise Exception(f"Couldn't load data properly for {weapon['id']}: ability is missing key: {key}")
+
+        abilities.append(ability_info)
+    return abilities
+
+def expected_damage(ability):
+    """
+    Estimates the average damage of an ability, used to decide which ability a headless player prefers.
+
+    Parameters:
+    ability (dict): The resolved ability
+
+    Returns:
+    float: The average damage per use, taking hit chance, crit chance and crit multiplier into account
+    """
+    average_damage = (ability['minDamage'] + ability['maxDamage']) / 2
+    hit_rate = ability.get('hitChance', 100) / 100
+    crit_rate = ability['critChance'] / 100
+    return average_damage * hit_rate * (1 + crit_rate * ability['critMulti'])
+
+# ========================
+#      COMBAT ENGINE
+# ========================
+
+class Combatant:
+    """Health and streak state of one side of a battle."""
+    def __init__(self, health):
+        self.health = health                  # Current health
+        self.max_health = health              # Health at the start of the battle
+
+        self.previous_attack_id = None        # ID of the last attack used
+        self.previous_attack_type = None      # Type of the last attack used ('miss', 'normal' or 'crit')
+        self.previous_hit_success = None      # Hit chance of the last attack
+        self.previous_crit_success = None     # Crit chance of the last attack
+
+class CombatEngine:
+    """
+    Runs the rules of a battle between the player and an enemy without any output, sleeps or threads.
+    Each turn is the player's attack (or idling) followed by the enemy's attack if it is still alive.
+
+    Parameters:
+    abilities (list): Resolved abilities of the player's weapon (see resolve_abilities)
+    enemy (dict): Data of the enemy
+    player_level (int): Level of the player, used to scale the player's health
+    rng (random.Random, optional): Random number generator, pass a seeded one for reproducible battles
+    player_health (int, optional): Overrides the player's health instead of scaling it by level
+    """
+    def __init__(self, abilities, enemy, player_level, rng=None, player_health=None):
+        self.abilities = abilities
+        self.enemy_data = enemy
+        self.player_level = player_level
+        self.rng = rng or random.Random()
+
+        if player_health is None:
+            player_health = globals.Player.health_for_level(player_level)
+        self.player = Combatant(player_health)
+        self.enemy = Combatant(enemy['health'])
+
+        self.cooldowns = {}  # Holds cooldowns for attacks by attack ID
+        self.turns = 0       # Number of turns started
+
+        # Order in which a headless player tries abilities, strongest first
+        self.priority = sorted(self.abilities, key=expected_damage, reverse=True)
+
+    @property
+    def is_over(self):
+        """Whether the player or the enemy has been defeated."""
+        return self.player.health <= 0 or self.enemy.health <= 0
+
+    @property
+    def victory(self):
+        """Whether the player won the battle."""
+        return self.enemy.health <= 0 and self.player.health > 0
+
+    # ========================
+    #     ATTACK COOLDOWN
+    # ========================
+
+    def is_available(self, ability):
+        """Whether the ability is off cooldown."""
+        return not self.cooldowns.get(ability['id'])
+
+    def set_cooldown(self, attack):
+        """Sets a cooldown timer for an attack"""
+        id = attack['id']  # Unique ID for the attack
+        if id not in self.cooldowns or self.cooldowns[id] <= 0:  # If the attack isn't on cooldown or the cooldown has ended
+            self.cooldowns[id] = attack['cooldown'] + 1  # Set the cooldown timer
+
+    def update_cooldowns(self):
+        """Updates cooldown timers for all active attacks"""
+        for id, cooldown in self.cooldowns.items():
+            if cooldown > 0:
+                self.cooldowns[id] = cooldown - 1
+
+    # =======================
+    #   DAMAGE CALCULATION
+    # =======================
+
+    def determine_attack(self, attack, player=True):
+        """
+        Determines the outcome of an attack (hit, crit, or miss) and updates the attacker's streak state.
+
+        Parameters:
+        attack (dict): The attack object containing details such as minDamage, maxDamage, hitChance, critChance, etc.
+        player (bool): Whether the attack is from the player (True) or the enemy (False). Defaults to True.
+
+        Returns:
+        tuple: The attack result ('miss', 'normal' or 'crit') and the damage dealt.
+        """
+        attacker = self.player if player else self.enemy
+
+        # Calculate damage based on the attack's min and max damage
+        damage = self.rng.randint(attack['minDamage'], attack['maxDamage'])
+        # Set hit and crit chances based on the previous attack, enemies never carry over their hit chance
+        hit_chance = (attacker.previous_hit_success if player else 100) or attack.get('hitChance', 100)
+        crit_chance = attacker.previous_crit_success or attack['critChance']
+
+        # Reset hit and crit chances if the attack ID is different from the last one
+        if attacker.previous_attack_id != attack['id']:
+            hit_chance = attack.get('hitChance', 100)
+            crit_chance = attack['critChance']
+
+        # Streak prevention: Adjust chances based on previous attack outcomes
+        if player and attacker.previous_attack_type == 'miss':
+            hit_chance = min(hit_chance + 5, 100)  # Increase hit chance by 5% if player missed previously
+        elif attacker.previous_attack_type == 'normal':
+            crit_chance = min(crit_chance + 1, 100)  # Increase crit chance by 1% if player or enemy didn't crit previously
+
+        attacker.previous_attack_id = attack['id']
+
+        # Determine the outcome of the attack (miss, crit, or normal)
+        if hit_chance < 100 and roll_chance(100 - hit_chance, self.rng):  # Missed attack
+            attacker.previous_attack_type = 'miss'
+            attacker.previous_hit_success = hit_chance
+            attacker.previous_crit_success = attack['critChance']
+            return 'miss', damage
+        elif roll_chance(crit_chance, self.rng):  # Critical hit
+            crit_damage = max(round(damage * (1 + attack['critMulti'])), attack['maxDamage'] + 1)
+            attacker.previous_attack_type = 'crit'
+            attacker.previous_hit_success = attack.get('hitChance', 100)
+            attacker.previous_crit_success = attack['critChance']
+            return 'crit', crit_damage
+        else:  # Normal hit
+            attacker.previous_attack_type = 'normal'
+            attacker.previous_hit_success = attack.get('hitChance', 100)
+            attacker.previous_crit_success = crit_chance
+            return 'normal', damage
+
+    # ========================
+    #          TURNS
+    # ========================
+
+    def choose_ability(self):
+        """Returns the strongest ability that is off cooldown, or None if every ability is on cooldown."""
+        return next((ability for ability in self.priority if self.is_available(ability)), None)
+
+    def player_attack(self, ability):
+        """
+        Starts a turn with the player's attack. Passing None makes the player idle for the turn.
+
+        Parameters:
+        ability (dict or None): The ability the player uses
+
+        Returns:
+        tuple: The attack result ('miss', 'normal', 'crit' or 'idle') and the damage dealt to the enemy.
+        """
+        self.turns += 1
+        if ability is None:
+            return 'idle', 0
+
+        self.set_cooldown(ability)
+        self.update_cooldowns()
+
+        attack_output, damage = self.determine_attack(ability)
+        if attack_output == 'miss':
+            return attack_output, 0
+        self.enemy.health = max(self.enemy.health - damage, 0)
+        return attack_output, damage
+
+    def enemy_attack(self):
+        """
+        Ends a turn with the enemy's attack, chosen by the weights of the enemy's attacks.
+
+        Returns:
+        tuple: The enemy's attack, the attack result and the damage dealt to the player.
+        """
+        attacks = self.enemy_data['attacks']
+        attack = self.rng.choices(attacks, weights=[att['attackChance'] for att in attacks], k=1)[0]
+        attack_output, damage = self.determine_attack(attack, player=False)
+        if attack_output == 'miss':
+            return attack, attack_output, 0
+        self.player.health = max(self.player.health - damage, 0)
+        return attack, attack_output, damage
+
+    def step(self, ability=None):
+        """
+        Plays one full turn. If no ability is given, the strongest available ability is used.
+
+        Parameters:
+        ability (dict, optional): The ability the player uses
+
+        Returns:
+        dict: The outcome of the player's and the enemy's attack for this turn.
+        """
+        ability = ability or self.choose_ability()
+        attack_output, damage = self.player_attack(ability)
+        turn = {'ability': ability, 'output': attack_output, 'damage': damage, 'enemyAttack': None, 'enemyOutput': None, 'enemyDamage': 0}
+        if self.enemy.health > 0:
+            turn['enemyAttack'], turn['enemyOutput'], turn['enemyDamage'] = self.enemy_attack()
+        return turn
+
+    def run(self, max_turns=10000):
+        """
+        Plays turns until the battle is over or the turn limit is reached.
+
+        Parameters:
+        max_turns (int): Maximum number of turns to play
+
+        Returns:
+        bool: Whether the player won the battle.
+        """
+        while not self.is_over and self.turns < max_turns:
+            self.step()
+        return self.victory
+
+    # ========================
+    #         REWARDS
+    # ========================
+
+    def roll_rewards(self, inventory):
+        """
+        Rolls the rewards for defeating the enemy.
+
+        Parameters:
+        inventory (list): Weapon IDs the player already owns, these can't be dropped again
+
+        Returns:
+        tuple: XP reward, money reward and the ID of the dropped weapon (or None).
+        """
+        rewards = self.enemy_data['rewards']
+        xp_reward = self.rng.randint(rewards['minXp'], rewards['maxXp'])  # Random XP reward
+        money_reward = self.rng.randint(rewards['minMoney'], rewards['maxMoney'])  # Random money reward
+
+        rolled_rewards = [] # Initialize won rewards
+        # Iterate through weapon drops
+        for drop, chance in rewards.get('weapons', {}).items():
+            # If successfully rolled chance
+            if roll_percentage(chance, self.rng) and drop not in inventory:
+                rolled_rewards.append(drop) # Add reward to won rewards
+
+        weapon_reward = rolled_rewards[-1] if rolled_rewards else None # Get the latest won reward
+        return xp_reward, money_reward, weapon_reward
@@ -0,0 +1,215 @@
+from .menus import *
+from .utils import *
+from . import globals
+from . import clock
+from .session import GameSession
+from .metrics import redraw_seconds
+from .benchmark import percentile, format_time, PERCENTILES
+
+import contextlib
+import io
+
+# Special steps of input scripts, every other step is the name of a key to press
+WAIT = 'WAIT'     # Wait until the game sets a new key handler (e.g. after starting a battle)
+FIGHT = 'FIGHT'   # Attack with the first available ability until the battle ends
+WAIT_TIMEOUT = 30  # Seconds to wait for the game to accept keys before the run fails
+
+# Main menu -> shop -> weapon view -> buy -> inventory -> equip -> play -> fight -> main menu
+DEFAULT_SCRIPT = [
+    'down', 'enter',                        # Main menu: open the shop
+    'enter',                                # Shop: view the first weapon
+    'enter', 'down', 'enter',               # Weapon view: buy it and confirm
+    'esc', 'esc',                           # Back to the shop and the main menu
+    'down', 'enter',                        # Main menu: open the inventory
+    'down', 'enter',                        # Inventory: view the bought weapon
+    'enter',                                # Weapon view: equip it
+    'esc', 'esc',                           # Back to the inventory and the main menu
+    'up', 'up', 'enter',                    # Main menu: open the play menu
+    'enter', 'down', 'enter', WAIT,         # Pick the first enemy and confirm the fight
+    FIGHT,                                  # Fight until the battle is over
+    'esc'                                   # Back to the main menu
+]
+
+class NullWriter(io.TextIOBase):
+    """Output sink that throws away everything written to it."""
+    def write(self, text):
+        return len(text)
+
+class ScriptedInput:
+    """
+    Feeds a scripted key sequence to the handlers a session set with set_handler, without any input backend.
+    Keys are handled on the calling thread one at a time, so every key's handler latency is measured exactly.
+    Battles run on their own thread like in the game, so the script waits for the next turn's handler (see WAIT and FIGHT).
+
+    Parameters:
+    session (GameSession): The session to play
+    timeout (float): Seconds to wait for the game to accept keys
+    """
+    def __init__(self, session, timeout=WAIT_TIMEOUT):
+        self.session = session
+        self.input = session.input
+        self.timeout = timeout
+        self.latencies = []  # (key, seconds) of every key pressed
+
+    def press(self, key, wait=False):
+        """
+        Calls the current handler with a key.
+
+        Parameters:
+        key (str): Name of the key, like the input backends produce
+        wait (bool): Whether to wait for the game to set a new handler, which counts towards the key's latency
+        """
+        version = self.input.handler_version
+        handler = self.input.current_handler
+        if handler is None:
+            raise Exception(f"No key handler is set to press {key}")
+        start = time.perf_counter()
+        handler(key)
+        if wait and not self.input.wait_for_handler(version, self.timeout):
+            raise Exception(f"The game didn't accept keys within {self.timeout}s after pressing {key}")
+        self.latencies.append((key, time.perf_counter() - start))
+
+    def wait(self):
+        """Waits until the game accepts keys."""
+        if not self.input.wait_for_handler(self.input.handler_version - 1, self.timeout):
+            raise Exception(f"The game didn't accept keys within {self.timeout}s")
+
+    def fight(self):
+        """Attacks with the first available ability every turn until the battle is over."""
+        while self.session.in_combat:
+            battle = self.session.battle
+            ability_number = next(index + 1 for index, ability in enumerate(battle.equipped_weapon.abilities) if battle.engine.is_available(ability))
+            self.press(str(ability_number % 10), wait=True)
+        # The battle thread shows the play menu again once it ends
+        for thread in threading.enumerate():
+            if thread.name == 'battle':
+                thread.join(self.timeout)
+
+    def run(self, script):
+        """Runs the steps of a script (key names, WAIT and FIGHT)."""
+        for step in script:
+            if step == WAIT:
+                self.wait()
+            elif step == FIGHT:
+                self.fight()
+            else:
+                self.press(step)
+
+def prepare_game(seed):
+    """
+    Loads the content and a session with a fresh player that can afford and equip the weapons of the default script,
+    saved to a temporary directory so the real save file is never touched.
+
+    Returns:
+    GameSession: The session to play
+    """
+    from . import game
+    from .save_manager import SaveManager
+
+    game.load_content()
+    globals.save_manager = SaveManager(tempfile.mkdtemp(), 'save_file')
+    session = GameSession(battle_seed=seed)  # Battle rolls
+    session.player.load()
+    session.player.level = 10
+    session.player.level_up()  # Sets the XP goal and health for the level
+    session.player.balance = 1000000
+
+    random.seed(seed)  # Battle messages
+    return session
+
+def run_session(script=DEFAULT_SCRIPT, seed=0, output=None):
+    """
+    Plays a scripted session from the main menu with the battle logs on an instant clock.
+
+    Parameters:
+    script (list): Steps of the script
+    seed (int): Seed of the battles
+    output (file, optional): Where the game's output goes, thrown away if not set
+
+    Returns:
+    dict: Per-key latencies, frames (menu redraws) rendered and total seconds
+    """
+    from . import game
+
+    session = prepare_game(seed)
+    original_file = console.file
+    console.file = output or NullWriter()
+    clock.set_clock(clock.InstantClock())
+    driver = ScriptedInput(session)
+    frames_before = redraw_seconds.total_count()
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(console.file):  # clear_terminal prints escape codes directly
+            game.main_menu(session)
+            driver.run(script)
+    finally:
+        clock.set_clock(None)
+        console.file = original_file
+        session.input.set_handler(None)
+        globals.save_manager.flush()
+    return {
+        'seconds': time.perf_counter() - start,
+        'frames': redraw_seconds.total_count() - frames_before,
+        'latencies': driver.latencies
+    }
+
+def summarize(sessions):
+    """
+    Summarizes the key latencies and frames of sessions.
+
+    Returns:
+    dict: Key count, mean and percentile latencies, the slowest keys, frames and seconds per session
+    """
+    latencies = [latency for session in sessions for _, latency in session['latencies']]
+    sorted_latencies = sorted(latencies)
+    slowest = sorted(((key, latency) for session in sessions for key, latency in session['latencies']), key=lambda item: item[1], reverse=True)
+    summary = {
+        'sessions': len(sessions),
+        'keys': len(latencies),
+        'frames': sum(session['frames'] for session in sessions),
+        'seconds': sum(session['seconds'] for session in sessions),
+        'mean': sum(latencies) / len(latencies) if latencies else 0,
+        'max': sorted_latencies[-1] if latencies else 0,
+        'slowest': [{'key': key, 'seconds': latency} for key, latency in slowest[:5]]
+    }
+    for percent in PERCENTILES:
+        summary[f'p{percent}'] = percentile(sorted_latencies, percent)
+    return summary
+
+def main(arguments=None):
+    """Command line entry point: python -m src.e2e"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Play scripted sessions through the real menus and report per-key latency and frames rendered.")
+    parser.add_argument('-s', '--script', help="JSON file with a list of keys to press (plus 'WAIT' and 'FIGHT' steps), defaults to a shop, inventory and fight session")
+    parser.add_argument('-n', '--sessions', type=int, default=5, help="Number of sessions to play (default: 5)")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the battles (default: 0)")
+    parser.add_argument('--capture', help="Write the game's output of the last session to this file")
+    parser.add_argument('-o', '--output', help="Save the summary to this JSON file")
+    arguments = parser.parse_args(arguments)
+
+    script = DEFAULT_SCRIPT
+    if arguments.script:
+        with open(arguments.script, 'r', encoding='utf-8') as file:
+            script = json.load(file)
+
+    configure_logging('WARNING')  # Keep the sessions from filling the debug log
+    sessions = []
+    for index in range(max(arguments.sessions, 1)):
+        capture = io.StringIO() if arguments.capture and index == arguments.sessions - 1 else None
+        sessions.append(run_session(script, arguments.seed, capture))
+        if capture:
+            with open(arguments.capture, 'w', encoding='utf-8') as file:
+                file.write(capture.getvalue())
+
+    summary = summarize(sessions)
+    print(f"{summary['sessions']} sessions, {summary['keys']} keys, {summary['frames']} frames in {summary['seconds']:.2f}s")
+    print('Key latency: mean ' + format_time(summary['mean']) + ''.join(f", p{percent} {format_time(summary[f'p{percent}'])}" for percent in PERCENTILES) + f", max {format_time(summary['max'])}")
+    print('Slowest keys: ' + ', '.join(f"{item['key']} ({format_time(item['seconds'])})" for item in summary['slowest']))
+
+    if arguments.output:
+        write_json_atomic(arguments.output, summary)
+        print(f'Saved summary to {arguments.output}')
+
+if __name__ == '__main__':
+    main()
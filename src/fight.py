@@ -1,8 +1,11 @@
 from .menus import *
 from .utils import *
-from .keyboard_manager import keyboard_manager
-from .globals import player
+from .combat import CombatEngine, resolve_abilities
 from . import globals
+from . import clock
+from .scheduler import scheduler
+from .profiler import profiler
+from .metrics import redraw_seconds, battles_started, battles_finished, battle_turns
 
 # ========================
 # CLASSES AND GLOBAL STATE
@@ -15,32 +18,21 @@ class Weapon:
         self.abilities = []           # List of abilities (could be a list of Attack objects)
 
 class Player:
+    """Displayed state of the player in combat, the rules are handled by the CombatEngine."""
     def __init__(self):
-        self.health = 100             # Default health (example value)
+        self.health = 100             # Displayed health
         self.max_health = 100         # Default max health (example value)
         self.faster_logs = False      # Whether faster battle logs are enabled
 
-        self.previous_attack_id = None    # ID of the last attack used
-        self.previous_attack_type = None  # Type of the last attack used
-        self.previous_hit_success = None  # Whether the last attack hit
-        self.previous_crit_success = None # Whether the last attack was a critical hit
-
 class Enemy:
+    """Displayed state of the enemy in combat, the rules are handled by the CombatEngine."""
     def __init__(self):
         self.name = None              # Name of the enemy
         self.id = None                # Unique identifier for the enemy
-        self.health = 100             # Default health (example value)
+        self.health = 100             # Displayed health
         self.max_health = 100         # Default max health (example value)
-        self.attacks = []             # List of attacks (could be a list of Attack objects)
-        self.rewards = []             # List of rewards (e.g., items, money)
         self.level = 1                # Default level (example value)
 
-        self.previous_attack = None          # Last attack used by the enemy
-        self.previous_attack_id = None       # ID of the last attack used
-        self.previous_attack_type = None     # Type of the last attack used
-        self.previous_hit_success = None     # Whether the last attack hit
-        self.previous_crit_success = None    # Whether the last attack was a critical hit
-
 class MenuState:
     """Manages the state of the current menu, including options, navigation, etc."""
     def __init__(self):
@@ -55,39 +47,26 @@ class MenuState:
         self.chosen_attack = None           # The attack chosen by the player (or None)
         self.timer = 0                      # Timer for any time-limited actions or effects
         self.timer_tooltip = None           # Tooltip for the timer or any time-related info
+        self.on_timer = None                # Called by the turn timer every time it ticks, set by the current menu
 
-# Initialize global state
-menu_state = MenuState() # Tracks the state of the current menu
-fighting_player = Player() # Represents the player in combat
-fighting_enemy = Enemy() # Represents the enemy in combat
-equipped_weapon = Weapon() # Holds the currently equipped weapon
+class BattleState:
+    """State of a session's battle, a new one is created for every battle (see GameSession.battle)."""
+    def __init__(self):
+        self.menu_state = MenuState()               # Tracks the state of the current menu
+        self.fighting_player = Player()             # Represents the player in combat
+        self.fighting_enemy = Enemy()               # Represents the enemy in combat
+        self.equipped_weapon = Weapon()             # Holds the currently equipped weapon
+        self.engine = None                          # Runs the rules of the battle (see combat.py)
+        self.clock = clock.real_clock               # Paces the battle logs, picked from the player's settings
+        self.turn_condition = threading.Condition() # Notified whenever the player's turn may have ended (attack chosen, timer ran out or fled)
 
 # ========================
-#     ATTACK COOLDOWN
+#       TURN TIMER
 # ========================
 
-attack_cooldowns = {}  # Holds cooldowns for attacks by attack ID
-
-def set_cooldown_timer(attack):
-    """Function to set a cooldown timer for an attack"""
-    id = attack['id']  # Unique ID for the attack
-    if id not in attack_cooldowns:  # If the attack isn't already on cooldown
-        attack_cooldowns[id] = attack['cooldown']  + 1  # Set the cooldown timer
-    elif attack_cooldowns[id] <= 0:  # If the cooldown has ended
-        del attack_cooldowns[id]  # Remove the cooldown
-        set_cooldown_timer(attack)  # Reset the cooldown timer
-
-def update_cooldown_timers():
-    """Function to update cooldown timers for all active attacks"""
-    old_cooldowns = dict(attack_cooldowns)  # Make a copy of the current cooldowns
-    for id in old_cooldowns.keys():  # Loop through each attack ID
-        cooldown = attack_cooldowns.get(id)  # Get the cooldown for the current attack ID
-        if cooldown:  # If there is a valid cooldown
-            if cooldown > 0:  # If the cooldown is greater than 0
-                attack_cooldowns[id] -= 1  # Decrease the cooldown by 1 second
-
-def get_timer():
-    """Function to return the remaining cooldown time as a formatted string"""
+def get_timer(session):
+    """Function to return the remaining cooldown time of a session's turn as a formatted string"""
+    menu_state = session.battle.menu_state
     timer_color = [201, 237, 154]  # Default color for the timer (greenish)
     if 3 < menu_state.timer <= 6:  # Change color to yellow if timer is between 3 and 6
         timer_color = [237, 198, 154]
@@ -96,20 +75,55 @@ def get_timer():
 
     return style_text({'color': timer_color}, f'{menu_state.timer}s')  # Return the styled timer with color
 
+def notify_turn(session):
+    """Wakes up the session's battle loop so it can check if the player's turn has ended"""
+    with session.battle.turn_condition:
+        session.battle.turn_condition.notify_all()
+
+def turn_ended(session):
+    """Whether the player's turn has ended: an attack was chosen, combat ended, or the timer ran out at the player's turn menu"""
+    menu_state = session.battle.menu_state
+    return not session.in_combat or menu_state.chosen_attack or (menu_state.current_menu == 'player_turn' and menu_state.timer < 0)
+
+def tick_timer(session):
+    """
+    Counts the turn timer down by 1 second. Runs on the scheduler thread every second of the turn timer clock
+    until the timer runs out, the player selects an attack or the combat ends.
+
+    Parameters:
+    session (GameSession): The player's game session
+
+    Returns:
+    bool: Whether the timer should keep ticking
+    """
+    menu_state = session.battle.menu_state
+    if not session.in_combat or menu_state.chosen_attack or menu_state.timer < 0:
+        return False
+    menu_state.timer -= 1  # Decrease the timer by 1 second
+    if menu_state.on_timer:
+        menu_state.on_timer()  # Let the current menu update its display
+    notify_turn(session)
+    return menu_state.timer >= 0
+
 # =======================
 #     PRINT TOP INFO
 # =======================
 
-def print_top_info(enemy_first=False, victory=None):
+def print_top_info(session, enemy_first=False, victory=None):
     """
     Function to print the top info (player and enemy stats) on the screen.
 
     Parameters:
+    - session (GameSession): The player's game session.
     - enemy_first (bool): If True, the enemy's stats will be printed first. Defaults to False (player first).
     - victory (bool, optional): If provided, determines whether the player won or lost the battle. 
                                  If True, the player's victory status is highlighted.
                                  If False, the player's defeat status is highlighted.
     """
+    player = session.player
+    fighting_player = session.battle.fighting_player
+    fighting_enemy = session.battle.fighting_enemy
+
     # Determine the names and health of the player and enemy based on whether the enemy goes first
     first_name = fighting_enemy.name + Text(f' Lvl. {fighting_enemy.level}') if enemy_first else style_text({'style':'bold'}, 'You') + Text(f' Lvl. {player.level}')
     first_health = fighting_enemy.health if enemy_first else fighting_player.health
@@ -231,84 +245,25 @@ def get_random_message(messages, format):
         styled_message += Text(substring) if not isinstance(substring, Text) else substring
     return styled_message
 
-# =======================
-#   DAMAGE CALCULATION
-# =======================
-
-def determine_attack(attack, player=True):
-    """
-    Function to determine the outcome of an attack (hit, crit, or miss).
-
-    Parameters:
-    - attack (dict): The attack object containing details such as minDamage, maxDamage, hitChance, critChance, etc.
-    - player (bool): A boolean to specify whether the attack is from the player (True) or the enemy (False). Defaults to True.
-
-    Returns:
-    - tuple: A tuple containing the attack result (hit, crit, or miss) and the damage dealt.
-    """
-    # Calculate damage based on the attack's min and max damage
-    damage = random.randint(attack['minDamage'], attack['maxDamage'])
-    # Set hit and crit chances based on player or enemy
-    hit_chance = (fighting_player.previous_hit_success if player else 100) or attack.get('hitChance', 100)
-    crit_chance = (fighting_player.previous_crit_success if player else fighting_enemy.previous_crit_success) or attack['critChance']
-
-    # Reset hit and crit chances if the attack ID is different from the last one
-    if (player and fighting_player.previous_attack_id != attack['id']) or (not player and fighting_enemy.previous_attack_id != attack['id']):
-        hit_chance = attack.get('hitChance', 100)
-        crit_chance = attack['critChance']
-
-    # Streak prevention: Adjust chances based on previous attack outcomes
-    if player and fighting_player.previous_attack_type == 'miss':
-        hit_chance = min(hit_chance + 5, 100)  # Increase hit chance by 5% if player missed previously
-    elif (player and fighting_player.previous_attack_type == 'normal') or (not player and fighting_enemy.previous_attack_type == 'normal'):
-        crit_chance = min(crit_chance + 1, 100)  # Increase crit chance by 1% if player or enemy didn't crit previously
-
-    # Update previous attack ID for both player and enemy
-    if player:
-        fighting_player.previous_attack_id = attack['id']
-    else:
-        fighting_enemy.previous_attack_id = attack['id']
-
-    # Determine the outcome of the attack (miss, crit, or normal)
-    if hit_chance < 100 and roll_chance(100 - hit_chance):  # Missed attack
-        fighting_player.previous_attack_type = 'miss'
-        fighting_player.previous_hit_success = hit_chance
-        fighting_player.previous_crit_success = attack['critChance']
-        return 'miss', damage
-    elif roll_chance(crit_chance):  # Critical hit
-        crit_damage = max(round(damage * (1 + attack['critMulti'])), attack['maxDamage'] + 1)
-        if player:
-            fighting_player.previous_attack_type = 'crit'
-            fighting_player.previous_hit_success = attack['hitChance']
-            fighting_player.previous_crit_success = attack['critChance']
-        else:
-            fighting_enemy.previous_attack_type = 'crit'
-            fighting_enemy.previous_crit_success = attack['critChance']
-        return 'crit', crit_damage
-    else:  # Normal hit
-        if player:
-            fighting_player.previous_attack_type = 'normal'
-            fighting_player.previous_hit_success = attack['hitChance']
-            fighting_player.previous_crit_success = crit_chance
-        else:
-            fighting_enemy.previous_attack_type = 'normal'
-            fighting_enemy.previous_crit_success = crit_chance
-        return 'normal', damage
-
 # ========================
 #       MENU FUNCTIONS
 # ========================
 
-def flee_confirm(old_selected):
+def flee_confirm(session, old_selected):
     """
     Initializes the flee confirmation menu, handles key presses for navigation and selection,
     and displays the current combat timer, allowing the player to decide whether to flee or not.
     
     Parameters:
+    session (GameSession): The player's game session
 
     old_selected (int): The index of the pre-selected option for the player's turn. 
                         Used to restore the player's selection in the player's turn when returning from here. 
     """
+    player = session.player
+    menu_state = session.battle.menu_state
+    fighting_enemy = session.battle.fighting_enemy
+
     # Set up the menu state for the flee confirm menu
     menu_state.current_menu = 'flee_confirm'  # Identify this menu as the flee confirm screen
     menu_state.options = [style_text({'style': 'bold'}, 'No'), style_text({'style': 'bold'}, 'Yes')]  # Menu options: No and Yes
@@ -330,63 +285,54 @@ def flee_confirm(old_selected):
         """
         if key == ('up' if player.use_arrow_keys else 'w'):  # Up arrow or 'w' for navigation
             menu_state.selected = 0  # Select 'No'
-            redraw_menu()  # Redraw the menu to reflect the new selection
+            redraw_menu(session)  # Redraw the menu to reflect the new selection
         elif key == ('down' if player.use_arrow_keys else 's'):  # Down arrow or 's' for navigation
             menu_state.selected = 1  # Select 'Yes'
-            redraw_menu()  # Redraw the menu to reflect the new selection
+            redraw_menu(session)  # Redraw the menu to reflect the new selection
         elif key == 'enter':  # Enter key
             if menu_state.selected == 0:  # If 'No' is selected
-                debug.info(f"Did not flee from {fighting_enemy.name}")  # Log action
-                player_turn(old_selected)  # Continue with the player's turn
+                debug.info("Did not flee from %s", fighting_enemy.name)  # Log action
+                player_turn(session, old_selected)  # Continue with the player's turn
             elif menu_state.selected == 1:  # If 'Yes' is selected
-                debug.info(f"Fleed from {fighting_enemy.name}")  # Log action
-                globals.in_combat = False  # Exit combat mode
+                debug.info("Fleed from %s", fighting_enemy.name)  # Log action
+                session.in_combat = False  # Exit combat mode
+                notify_turn(session)  # Let the battle loop know that combat ended
         elif key == 'esc':  # ESC key
-            player_turn(old_selected)  # Go back to the player's turn
+            player_turn(session, old_selected)  # Go back to the player's turn
 
     def update_timer_display():
         """
         Updates the display of the combat timer in the flee confirm menu.
         
-        This function is responsible for refreshing the display of the time left for the player
-        to make a decision on fleeing. The time left is based on the current combat timer.
-        """
-        if menu_state.current_menu == original_menu:  # If the menu is still active
-            menu_state.timer_tooltip = style_text({'style': 'bold'}, f'Time left: ', get_timer())  # Update the timer tooltip with the current time left
-            redraw_menu()  # Redraw the menu with updated timer display
-    def flee_confirm_timer():
-        """
-        Handles the countdown timer for the flee confirm menu, which reflects the current combat timer.
-        
-        The timer decrements over time, and the menu display is updated whenever the timer changes.
-        The loop will exit once the timer reaches 0 or the combat ends.
+        This function is called by the turn timer every time it ticks, while the flee confirm menu is active
+        and there is time left. The time left is based on the current combat timer.
         """
-        old_timer = menu_state.timer  # Store the current timer value
-        while globals.in_combat and menu_state.current_menu == original_menu and menu_state.timer >= 0:  # While the timer is active and combat continues
-            if menu_state.timer != old_timer:  # If the timer has changed
-                old_timer = menu_state.timer  # Update the old timer value
-                update_timer_display()  # Update the timer display
-
-            if menu_state.timer < 0: break # If the timer runs out
-
-            time.sleep(0.1)  # Sleep for a short time to avoid using too much CPU
+        if menu_state.current_menu == original_menu and menu_state.timer >= 0:  # If the menu is still active
+            menu_state.timer_tooltip = style_text({'style': 'bold'}, f'Time left: ', get_timer(session))  # Update the timer tooltip with the current time left
+            redraw_menu(session)  # Redraw the menu with updated timer display
 
     # Set the current menu handler for key presses
-    keyboard_manager.set_handler(on_press)
-    redraw_menu()  # Redraw the menu initially
-    threading.Thread(target=flee_confirm_timer, daemon=True).start()  # Start the timer in a separate thread to avoid blocking
+    session.input.set_handler(on_press)
+    menu_state.on_timer = update_timer_display  # Update the timer display when the turn timer ticks
+    redraw_menu(session)  # Redraw the menu initially
 
-def player_turn(selected=0):
+def player_turn(session, selected=0):
     """
     Sets up and handles the player's turn in combat. The menu allows the player to choose an attack
     or flee from combat. The player's options are dynamically updated based on the abilities of the
     equipped weapon and their cooldowns. The combat timer is also displayed.
 
     Parameters:
+    session (GameSession): The player's game session
     selected (int): The index of the pre-selected option for this menu. 
                     Used to restore the player's selection when returning here from other menus or functions. 
                     Defaults to None if not set.
     """
+    player = session.player
+    menu_state = session.battle.menu_state
+    equipped_weapon = session.battle.equipped_weapon
+    engine = session.battle.engine
+
     # Set up the menu state for the player's turn
     menu_state.current_menu = 'player_turn'  # Identify this menu as the player's turn menu
     menu_state.menu_type = 'basic'  # Simple menu type
@@ -409,7 +355,7 @@ def player_turn(selected=0):
         if index == 10: index = 0  # Number key list from 1-9 and then 0 so index becomes 0
         elif index > 10: break  # Limit weapon abilities to a maximum of 10
         option_name = ability['name']
-        cooldown = attack_cooldowns.get(ability['id'])
+        cooldown = engine.cooldowns.get(ability['id'])
         if cooldown and cooldown > 0:
             option_name = style_text({'color': [173, 173, 173]}, option_name) + Text(f' ({cooldown} turns left)')
         menu_state.options.append(Text(f'[{index}]: ') + option_name)
@@ -431,21 +377,23 @@ def player_turn(selected=0):
             update_selection(1)  # Move down in the menu
         elif key == 'enter':  # Enter key to select an option
             if menu_state.selected == len(menu_state.options) - 1:  # Last option is always flee
-                exit = flee_confirm(menu_state.selected)  # Confirm flee action
-                if exit: globals.in_combat = False  # Exit combat if confirmed
+                exit = flee_confirm(session, menu_state.selected)  # Confirm flee action
+                if exit: session.in_combat = False  # Exit combat if confirmed
             else:
                 # Select an attack from the weapon abilities
                 chosen_attack = equipped_weapon.abilities[menu_state.selected]
-                if not attack_cooldowns.get(chosen_attack['id']):  # Check if the attack is off cooldown
+                if engine.is_available(chosen_attack):  # Check if the attack is off cooldown
                     menu_state.chosen_attack = chosen_attack  # Set the chosen attack
+                    notify_turn(session)  # End the player's turn
         elif key == 'esc':  # ESC key to flee
-            exit = flee_confirm(menu_state.selected)  # Confirm flee action
-            if exit: globals.in_combat = False  # Exit combat if confirmed
+            exit = flee_confirm(session, menu_state.selected)  # Confirm flee action
+            if exit: session.in_combat = False  # Exit combat if confirmed
         elif key_int and key_int < len(menu_state.options):  # If a valid number key is pressed
-            debug.debug(f'Pressed {key_int} key')
+            debug.debug('Pressed %s key', key_int)
             chosen_attack = equipped_weapon.abilities[key_int - 1]  # Select the attack based on key
-            if not attack_cooldowns.get(chosen_attack['id']):  # Check if the attack is off cooldown
+            if engine.is_available(chosen_attack):  # Check if the attack is off cooldown
                 menu_state.chosen_attack = chosen_attack  # Set the chosen attack
+                notify_turn(session)  # End the player's turn
 
     def update_selection(delta):
         """
@@ -458,105 +406,97 @@ def player_turn(selected=0):
         menu_state.selected = (menu_state.selected + delta) % len(menu_state.options)  # Adjust the selected option
         update_menu_info()  # Update the menu info with the new selection
 
+    @profiler.profile()
     def update_menu_info():
         """
         Updates the top info section and the tooltip display with the current combat timer and 
         control hints.
         """
-        print_top_info()  # Print the top section info (e.g., health, etc.)
+        print_top_info(session)  # Print the top section info (e.g., health, etc.)
 
-        menu_state.timer_tooltip = style_text({'style': 'bold'}, f'Time left: ', get_timer())  # Display the remaining time in the combat timer
+        menu_state.timer_tooltip = style_text({'style': 'bold'}, f'Time left: ', get_timer(session))  # Display the remaining time in the combat timer
         menu_state.tooltip = style_text({'style': 'italic'}, 'Arrow Keys ↑/↓ to navigate | ENTER to select | ESC to go back') if player.display_controls else None  # Display controls
 
-        redraw_menu(clear=False)  # Redraw the menu 
+        redraw_menu(session, clear=False)  # Redraw the menu 
     
-    def player_turn_timer():
+    def update_timer():
         """
-        Handles the countdown for the player's turn timer. While the player's turn is active,
-        it continually checks and updates the display based on the remaining time. Once the time
-        runs out, it clears the menu and ends the turn.
+        Handles the ticks of the turn timer while the player's turn menu is active. It updates the display
+        with the remaining time, and once the time runs out, it clears the menu while the turn ends.
 
-        This function runs in a separate thread to avoid blocking the main game loop.
+        This function is called by the turn timer on the scheduler thread.
         """
-        old_timer = menu_state.timer  # Store the current timer value
-        while globals.in_combat and menu_state.current_menu == original_menu and menu_state.timer >= 0:  # Continue while combat is ongoing
-            if menu_state.timer != old_timer:  # If the timer changes
-                old_timer = menu_state.timer  # Update the old timer value
-                update_menu_info()  # Update the menu info (timer, controls)
-
-            if menu_state.timer < 0:  # If the timer runs out
-                menu_state.current_menu = None  # Close the menu
-                menu_state.title = None  # Remove the title
-                menu_state.info = None  # Clear the info section
-                menu_state.timer_tooltip = None  # Remove the timer tooltip
-                menu_state.tooltip = None  # Remove the control tooltip
-                break
-            time.sleep(0.1)  # Sleep briefly to avoid using excessive CPU
+        if menu_state.current_menu != original_menu:  # If the menu isn't active anymore
+            return
+
+        if menu_state.timer < 0:  # If the timer runs out, the battle loop ends the turn and closes the menu
+            menu_state.title = None  # Remove the title
+            menu_state.info = None  # Clear the info section
+            menu_state.timer_tooltip = None  # Remove the timer tooltip
+            menu_state.tooltip = None  # Remove the control tooltip
+        else:
+            update_menu_info()  # Update the menu info (timer, controls)
 
     # Set the current menu handler for key presses
-    keyboard_manager.set_handler(on_press)
+    session.input.set_handler(on_press)
+    menu_state.on_timer = update_timer  # Update the display when the turn timer ticks
     update_menu_info()  # Update the menu info initially
-    threading.Thread(target=player_turn_timer, daemon=True).start()  # Start the timer in a separate thread
+    notify_turn(session)  # The turn may already be over if the timer ran out in another menu
 
-def battle():
+def battle(session):
     """
-    Manages the entire combat sequence between the player and the enemy. This includes turn-based
-    mechanics, where each side (player and enemy) takes turns attacking. The function also manages
-    timers, messages, damage calculation, and handles the win/loss conditions.
+    Presents the entire combat sequence between the player and the enemy. The rules (turns, damage
+    calculation, cooldowns and win/loss conditions) are handled by the CombatEngine, while this function
+    manages the player's input, timers and messages.
 
     This function runs in a loop until either the player or enemy is defeated.
-    """
-    def timer():
-        """
-        A timer function that counts down from the initial time limit (10 seconds). The timer runs
-        in a separate thread and decreases the menu timer by 1 each second. The timer stops when
-        the turn ends or the player selects an attack.
 
-        The timer is used to limit how long the player has to make a move during their turn.
-        """
-        while globals.in_combat and menu_state.timer >= 0 and not menu_state.chosen_attack:
-            time.sleep(1)  # Wait for 1 second
-            menu_state.timer -= 1  # Decrease the timer by 1 second
+    Parameters:
+    session (GameSession): The player's game session
+    """
+    player = session.player
+    menu_state = session.battle.menu_state
+    fighting_player = session.battle.fighting_player
+    fighting_enemy = session.battle.fighting_enemy
+    equipped_weapon = session.battle.equipped_weapon
+    engine = session.battle.engine
+    turn_condition = session.battle.turn_condition
+    battle_clock = session.battle.clock
 
     # Turn-based mechanics
-    while fighting_enemy.health > 0 and fighting_player.health > 0:  
+    while not engine.is_over:  
         """
         The main combat loop runs as long as both the player and enemy are alive. Each iteration
         represents a player's turn followed by the enemy's turn.
         """
-        try:
-            # Reset menu state and set timer
-            menu_state.chosen_attack = None
-            menu_state.timer = 10  # Set a 10-second timer for the player's turn
-
-            # Start the timer in a separate thread
-            timer_task = threading.Thread(target=timer, daemon=True)
-            timer_task.start()
+        # Reset menu state and set timer
+        menu_state.chosen_attack = None
+        menu_state.timer = 10  # Set a 10-second timer for the player's turn
 
-            # Run the player's turn (choose an attack or flee)
-            player_turn()
+        # Tick the timer every second of the turn timer clock on the scheduler thread
+        timer_handle = scheduler.call_every(clock.get_clock(turn_timer=True).to_real(1), lambda: tick_timer(session))
 
-            # Loop until the timer is over and the player is at player's turn
-            while globals.in_combat and not menu_state.chosen_attack:
-                if menu_state.current_menu == 'player_turn' and menu_state.timer < 0: break
-                # Wait for the player to make a selection or for the combat to end
-                time.sleep(0.1)
+        # Run the player's turn (choose an attack or flee)
+        player_turn(session)
 
-            if not globals.in_combat: return  # Exit if combat has ended
+        # Wait until the player makes a selection, the timer runs out at the player's turn or the combat ends
+        with turn_condition:
+            turn_condition.wait_for(lambda: turn_ended(session))
+        timer_handle.cancel()
 
-            # End the player's turn and clear input handler
-            menu_state.current_menu = None
-            keyboard_manager.set_handler(None)
+        if not session.in_combat: return  # Exit if combat has ended
 
-            # Determine the result of the player's attack
-            attack_output, damage = 'miss', 0
-            if menu_state.chosen_attack:
-                set_cooldown_timer(menu_state.chosen_attack)  # Set cooldown for the attack
-                update_cooldown_timers()  # Update the cooldown timers
+        # End the player's turn and clear input handler
+        menu_state.current_menu = None
+        session.input.set_handler(None)
 
-                attack_output, damage = determine_attack(menu_state.chosen_attack)  # Execute the attack
+        # Profile the turn once the player has chosen, so waiting for input doesn't hold the profiler
+        # while the turn menus (player_turn, redraw_menu) are profiled
+        with profiler.section('fight.battle.turn'):
+            # Determine the result of the player's attack (or idling if no attack was chosen)
+            attack_output, damage = engine.player_attack(menu_state.chosen_attack)
 
-            print_top_info()  # Print the top info (e.g., health, turn info)
+            print_top_info(session)  # Print the top info (e.g., health, turn info)
             
             if menu_state.chosen_attack:  # If the player chose an attack
                 attack_name =  menu_state.chosen_attack['name']
@@ -564,17 +504,17 @@ def battle():
                 start_message = get_random_message(messages['start'], {"attack_name": attack_name})  # Get attack start message
                 console.print(style_text({'style':'italic'}, " ", start_message))
     
-                time.sleep(0.5 if fighting_player.faster_logs else 1.5)  # Adjust log speed
+                battle_clock.sleep(0.5 if fighting_player.faster_logs else 1.5)  # Adjust log speed
 
                 # Handle missed attack
                 if attack_output == 'miss':
-                    print_top_info()  # Print top info again for miss
+                    print_top_info(session)  # Print top info again for miss
                     miss_message = get_random_message(messages['miss'], {"attack_name": attack_name, "enemy_name": fighting_enemy.name})
                     console.print(style_text({'style':'italic'}, " ", miss_message))
                 else:
                     # Handle successful or critical hit
-                    fighting_enemy.health = max(fighting_enemy.health - damage, 0)  # Decrease enemy health
-                    print_top_info()  # Update top info after hit
+                    fighting_enemy.health = engine.enemy.health  # Display decreased enemy health
+                    print_top_info(session)  # Update top info after hit
 
                     is_crit = attack_output == 'crit'
                     styled_damage = style_text({'color': [252, 144, 3] if is_crit else [201, 237, 154]}, str(damage))  # Style damage based on crit or normal hit
@@ -584,17 +524,16 @@ def battle():
                 idle_message = get_random_message(idle_messages, {"enemy_name": fighting_enemy.name, "weapon_name": equipped_weapon.name})
                 console.print(style_text({'style':'italic'}, " ", idle_message))  # If the player didn't attack, show idle message
 
-            if fighting_enemy.health > 0:  # If the enemy is still alive, take its turn
-                time.sleep(0.5 if fighting_player.faster_logs else 1.5)  # Adjust log speed
+            if engine.enemy.health > 0:  # If the enemy is still alive, take its turn
+                battle_clock.sleep(0.5 if fighting_player.faster_logs else 1.5)  # Adjust log speed
 
-                # Determine the enemy's attack
-                enemy_attack = random.choices(fighting_enemy.attacks, weights=[att['attackChance'] for att in fighting_enemy.attacks], k=1)[0]
-                enemy_attack_output, enemy_damage = determine_attack(enemy_attack, player=False)  # Enemy attacks the player
+                # Determine the enemy's attack and its result
+                enemy_attack, enemy_attack_output, enemy_damage = engine.enemy_attack()
 
                 # Update player health after enemy's attack
-                fighting_player.health = max(fighting_player.health - enemy_damage, 0)
+                fighting_player.health = engine.player.health
 
-                print_top_info(enemy_first=True)  # Print updated info for the enemy's attack
+                print_top_info(session, enemy_first=True)  # Print updated info for the enemy's attack
 
                 # Print the message for the enemy's attack
                 attack_name =  style_text(enemy_attack['title'], enemy_attack['name'])
@@ -603,48 +542,35 @@ def battle():
                 enemy_message = get_random_message(enemy_attack_messages['crit' if is_crit else 'hit'], {"attack_name": attack_name, "enemy_name": fighting_enemy.name, "damage": styled_enemy_damage})
                 console.print(style_text({'style':'italic'}, " ", enemy_message))
 
-            time.sleep(1.5 if fighting_player.faster_logs else 2.5)  # Adjust log speed between turns
-        except Exception as e:
-            raise
+            battle_clock.sleep(1.5 if fighting_player.faster_logs else 2.5)  # Adjust log speed between turns
 
     # Checks for loss/victory
-    if globals.in_combat:
+    if session.in_combat:
         menu_state.current_menu = None  # End the combat menu
-        keyboard_manager.set_handler(None)  # Remove keyboard input handler
+        session.input.set_handler(None)  # Remove keyboard input handler
 
         # Check if the player or enemy won the battle
-        victory = True if fighting_enemy.health <= 0 else False
-        victory = False if fighting_player.health <= 0 else victory
+        victory = engine.victory
 
-        print_top_info(victory=victory)  # Print final battle info
+        print_top_info(session, victory=victory)  # Print final battle info
         if victory:
             console.print(f'You defeated {fighting_enemy.name}! Victory is yours!')  # Victory message
-            rewards = fighting_enemy.rewards
-            xp_reward = random.randint(rewards['minXp'], rewards['maxXp'])  # Random XP reward
-            money_reward = random.randint(rewards['minMoney'], rewards['maxMoney'])  # Random money reward
+            rewards = engine.enemy_data['rewards']
+            xp_reward, money_reward, reward = engine.roll_rewards(player.inventory)  # Random XP, money and weapon rewards
 
-            time.sleep(0.5 if fighting_player.faster_logs else 2)
+            battle_clock.sleep(0.5 if fighting_player.faster_logs else 2)
 
             player.balance += money_reward  # Add money to player's balance
             player.xp += xp_reward  # Add XP to player's total
             leveled_up = player.level_up()  # Check if player levels up
             console.print(Text(f"You've gained ") + style_text({'color': [201, 237, 154]}, str(xp_reward)) + Text(f" XP and ") + style_text({'color': [201, 237, 154]}, f'${money_reward}'))
 
-            # If enemy has weapon rewards
-            if rewards.get('weapons'):
-                rolled_rewards = [] # Initialize won rewards
-                # Iterate through weapon drops
-                for drop, chance in rewards['weapons'].items():
-                    # If successfully rolled chance
-                    if roll_percentage(chance) and not drop in player.inventory:
-                        rolled_rewards.append(drop) # Add reward to won rewards
-
-                if len(rolled_rewards) > 0:
-                    reward = rolled_rewards[len(rolled_rewards) - 1] # Get the latest won reward
-                    player.inventory.append(reward) # Put won reward in inventory
-                    
-                    weapon = next((item for item in globals.weapons if item['id'] == drop), None) # Get weapon data of reward
-                    console.print(Text("You have obtained: ") + style_text(weapon['title'], f"{weapon['name']} ({chance}%)"))
+            # If a weapon reward was dropped
+            if reward:
+                player.inventory.append(reward) # Put won reward in inventory
+
+                weapon = globals.get_weapon(reward) # Get weapon data of reward
+                console.print(Text("You have obtained: ") + style_text(weapon['title'], f"{weapon['name']} ({rewards['weapons'][reward]}%)"))
 
             player.save()  # Save player progress
 
@@ -653,102 +579,102 @@ def battle():
         else:
             console.print(f'You have been defeated. The {fighting_enemy.name} stands victorious.')  # Defeat message
 
-        time.sleep(1.5 if fighting_player.faster_logs else 2)
+        battle_clock.sleep(1.5 if fighting_player.faster_logs else 2)
 
         console.print(Text(f'Exiting battle from ') + fighting_enemy.name + Text('...'))
 
-        time.sleep(0 if fighting_player.faster_logs else 0.5)
+        battle_clock.sleep(0 if fighting_player.faster_logs else 0.5)
 
-    globals.in_combat = False  # End the combat
+    session.in_combat = False  # End the combat
 
 # ========================
 #       REDRAW LOGIC
 # ========================
 
-def redraw_menu(clear=True):
-    """Redraw the menu."""
-    if clear: clear_terminal()
-    if menu_state.menu_type == 'basic':
-        print_basic_menu(
-            menu_state.options,
-            menu_state.selected,
-            menu_state.title,
-            menu_state.info,
-            menu_state.timer_tooltip,
-            menu_state.tooltip
-        )
-    elif menu_state.menu_type == 'horizontal':
-        print_horizontal_menu(
-            menu_state.info,
-            menu_state.title,
-            menu_state.tooltip
-        )
+@profiler.profile()
+def redraw_menu(session, clear=True):
+    """Redraw the battle menu of a session."""
+    menu_state = session.battle.menu_state
+    with redraw_seconds.time(menu=f'battle_{menu_state.menu_type}'):  # Track redraw counts and durations per menu type
+        if clear: clear_terminal()
+        if menu_state.menu_type == 'basic':
+            print_basic_menu(
+                menu_state.options,
+                menu_state.selected,
+                menu_state.title,
+                menu_state.info,
+                menu_state.timer_tooltip,
+                menu_state.tooltip
+            )
+        elif menu_state.menu_type == 'horizontal':
+            print_horizontal_menu(
+                menu_state.info,
+                menu_state.title,
+                menu_state.tooltip
+            )
 
 # ========================
 #    INITIALIZE BATTLE
 # ========================
 
 # Function for game.py
-def initiate_fight(enemy, enemy_name, enemy_id):
-    global attack_cooldowns
+def initiate_fight(session, enemy, enemy_name, enemy_id):
+    """
+    Sets up a battle of a session against an enemy and runs it until it ends.
 
-    # Reset values from previous battle
-    attack_cooldowns = {}
-    menu_state.__init__()
-    fighting_player.__init__()
-    fighting_enemy.__init__()
-    equipped_weapon.__init__()
+    Parameters:
+    session (GameSession): The player's game session
+    enemy (dictionary): Data of the enemy
+    enemy_name (str or Text): (Styled) name of the enemy
+    enemy_id (str): ID of the enemy
+    """
+    player = session.player
+    session.battle = BattleState()  # Nothing is left over from the previous battle
+    fighting_player = session.battle.fighting_player
+    fighting_enemy = session.battle.fighting_enemy
+    equipped_weapon = session.battle.equipped_weapon
 
     clear_terminal()
-    debug.info(f'Initiated fight for {enemy_name}...')
+    debug.info('Initiated fight for %s...', enemy_name)
     console.print(Text(f'Loading battle for ') + enemy_name + Text('...'))
 
     fighting_player.health = player.health
     fighting_player.max_health = player.health
     fighting_player.faster_logs = player.settings['fasterBattleLogs']
+    session.battle.clock = clock.battle_clock(player.settings)  # Pick the battle log clock (instant, scaled or real time)
 
     fighting_enemy.health = enemy['health']
     fighting_enemy.max_health = enemy['health']
     fighting_enemy.name = enemy_name
     fighting_enemy.id = enemy_id
     fighting_enemy.level = enemy['level']
-    fighting_enemy.attacks = enemy['attacks']
-    fighting_enemy.rewards = enemy['rewards']
 
-    weapon = next((item for item in globals.weapons if item['id'] == player.equipped), None)
+    weapon = globals.get_weapon(player.equipped)
         
     if (fighting_player.health or fighting_enemy.health or weapon) is None:
         raise Exception(f"Error fighting {enemy_name}: Couldn't load data properly, player/enemy health or weapon data is missing")
     
     equipped_weapon.name = style_text(weapon['title'], weapon['name'])
-    
-    for ability in weapon['abilities']:
-        attack = next((att for att in globals.attacks if att['id'] == ability['id']), None)
-
-        if attack is None:
-            raise Exception(f"Error fighting {enemy_name}: Couldn't load data properly, weapon ability is missing a corresponding attack")
-        
-        ability_info = {}
-        for key, value in ability.items():
-            ability_info[key] = value
-
-        for key, value in attack.items():
-            if key in ['id', 'description']:
-                continue # Skip id because we already fetched it before, skip description because it's not needed
-            ability_info[key] = value
 
-        # Important keys required for fight mechanics
-        important_keys = ['name', 'title', 'id', 'messages', 'minDamage', 'maxDamage', 'critMulti', 'critChance', 'hitChance', 'cooldown'] 
-        for key in important_keys:
-            if key not in ability_info:
-                raise Exception(f"Error fighting {enemy_name}: Couldn't load data properly, ability is missing key: {key}")
+    try:
+        abilities = resolve_abilities(weapon)
+    except Exception as e:
+        raise Exception(f"Error fighting {enemy_name}: {e}")
 
+    for ability_info in abilities:
         # Store name as styled text and remove title because it's not needed
         ability_info['name'] = style_text(ability_info['title'], ability_info['name'])
         del ability_info['title']
 
         equipped_weapon.abilities.append(ability_info)
 
-    debug.info(f'Initiated fight for {enemy_name}')
+    # The engine runs the rules of the battle, while battle() presents it
+    rng = random.Random(session.battle_seed) if session.battle_seed is not None else None
+    engine = session.battle.engine = CombatEngine(equipped_weapon.abilities, enemy, player.level, rng=rng, player_health=player.health)
+
+    debug.info('Initiated fight for %s', enemy_name)
 
-    battle()
\ No newline at end of file
+    battles_started.inc()
+    battle(session)
+    battles_finished.inc(result=('victory' if engine.victory else 'defeat') if engine.is_over else 'fled')
+    battle_turns.observe(engine.turns)
\ No newline at end of file
@@ -1,8 +1,13 @@
 from .menus import *
 from .utils import *
 from .fight import initiate_fight
-from .keyboard_manager import keyboard_manager
-from .globals import player
+from .keyboard_manager import keyboard_manager, input_available
+from . import clock
+from .profiler import profiler
+from .metrics import metrics, redraw_seconds, METRICS_FILE_ENV
+from .startup import startup
+from .session import GameSession
+from .profiles import flush_profile_saves
 from . import globals
 
 # ========================
@@ -39,15 +44,16 @@ def load_enemies():
     """
     Loads enemy data from the ENEMIES_DIR and sorts by level requirement.
     """
+    enemies = []  # Rebuilt on every load, so loading again (e.g. when the snapshot couldn't be saved) doesn't duplicate enemies
     for enemy_folder in os.listdir(ENEMIES_DIR):
         enemy_path = os.path.join(ENEMIES_DIR, enemy_folder)
         if os.path.isdir(enemy_path):  # Ensure it's a directory for an enemy
             enemy_data = load_enemy_data(enemy_path)
-            globals.enemies.append(enemy_data)
+            enemies.append(enemy_data)
     
     # Assuming each enemy has a 'main' data containing 'level'
-    globals.enemies = merge_sort(globals.enemies, 'level')
-    debug.info(f'Loaded {len(globals.enemies)} enemies.')
+    globals.enemies = merge_sort(enemies, 'level')
+    debug.info('Loaded %d enemies.', len(globals.enemies))
 
 def load_attacks(): 
     """
@@ -63,14 +69,74 @@ def load_weapons():
     globals.weapons = load_data_from_directory(WEAPONS_DIR, 'weapon')
     globals.weapons = merge_sort(globals.weapons, 'levelRequirement')
     load_attacks()
-    debug.info(f'Loaded {len(globals.weapons)} weapons.')
+    debug.info('Loaded %d weapons.', len(globals.weapons))
 
     # Create a new list of globals.weapons from existing globals.weapons list but removes items that are not shop items
     globals.shop_weapons = [weapon['id'] for weapon in globals.weapons if weapon['inShop']]
 
-def sort_displayed_weapons(key, order, weapons_list):
+# Bump this whenever the layout of the snapshot changes so old snapshots get rebuilt
+CONTENT_SNAPSHOT_VERSION = 1
+
+def load_content_snapshot(fingerprint):
+    """
+    Loads the compiled content snapshot (already parsed and sorted enemies, weapons, attacks and shop weapons)
+    from the CACHE_DIR if it was built from the same content files.
+
+    Parameters:
+    fingerprint (str): Fingerprint of the current content files
+
+    Returns:
+    bool: True if the snapshot was valid and loaded, False if the content has to be loaded from the files
+    """
+    if not os.path.exists(os.path.join(CACHE_DIR, 'content_snapshot.json')):
+        return False
+
+    snapshot = load_file_from_directory(CACHE_DIR, 'content_snapshot')
+    if not snapshot or snapshot.get('version') != CONTENT_SNAPSHOT_VERSION or snapshot.get('fingerprint') != fingerprint:
+        debug.info('Content snapshot is outdated, rebuilding it.')
+        return False
+
+    globals.enemies = snapshot['enemies']
+    globals.weapons = snapshot['weapons']
+    globals.attacks = snapshot['attacks']
+    globals.shop_weapons = snapshot['shopWeapons']
+    debug.info('Loaded %d enemies and %d weapons from content snapshot.', len(globals.enemies), len(globals.weapons))
+    return True
+
+def save_content_snapshot(fingerprint):
+    """
+    Saves the loaded content into a single snapshot file inside the CACHE_DIR, so the next start can skip
+    opening and parsing every content file.
+
+    Parameters:
+    fingerprint (str): Fingerprint of the content files the snapshot was built from
     """
-    Sorts a list of weapons for display (like shop or inventory), with a given key and order.
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    snapshot = {
+        'version': CONTENT_SNAPSHOT_VERSION,
+        'fingerprint': fingerprint,
+        'enemies': globals.enemies,
+        'weapons': globals.weapons,
+        'attacks': globals.attacks,
+        'shopWeapons': globals.shop_weapons
+    }
+    # Compact JSON without a backup because the snapshot can always be rebuilt from the content files
+    save_file_from_directory(CACHE_DIR, 'content_snapshot', snapshot, backup=False, debugging=False, indent=None)
+
+def load_content():
+    """Loads enemies, weapons and attacks, from the content snapshot if it is still valid or else from the content files."""
+    fingerprint = get_directory_fingerprint(ENEMIES_DIR, WEAPONS_DIR)
+    if not load_content_snapshot(fingerprint):
+        load_enemies()
+        load_weapons()
+        save_content_snapshot(fingerprint)
+    globals.index_content() # Index the loaded content by ID for fast lookups
+    build_sort_orders() # Precompute shop and inventory orders
+
+def sort_weapons(key, order, weapons_list):
+    """
+    Sorts a list of weapons with a given key and order.
+    This is only done once per sort type and order when the content is loaded, see build_sort_orders().
 
     Parameters:
     key (str): Name of key.
@@ -84,18 +150,18 @@ def sort_displayed_weapons(key, order, weapons_list):
         displayed_shop_weapons = sorted(
             [
                 weapon_id for weapon_id in weapons_list
-                if next((weapon for weapon in globals.weapons if weapon['id'] == weapon_id and weapon['inShop'] is True), None) is not None
+                if globals.get_weapon(weapon_id) is not None and globals.get_weapon(weapon_id)['inShop'] is True
             ], 
-            key = lambda weapon_id: next((item[key] for item in globals.weapons if item['id'] == weapon_id), 0),
+            key = lambda weapon_id: globals.get_weapon(weapon_id)[key],
             reverse = not order
         )
         # Weapons not in shop are sorted by levelRequirement in default
         not_in_shop_weapons = sorted(
             [
                 weapon_id for weapon_id in weapons_list
-                if next((weapon for weapon in globals.weapons if weapon['id'] == weapon_id and weapon['inShop'] is False), None) is not None
+                if globals.get_weapon(weapon_id) is not None and globals.get_weapon(weapon_id)['inShop'] is False
             ], 
-            key = lambda weapon_id: next((item['levelRequirement'] for item in globals.weapons if item['id'] == weapon_id), 0),
+            key = lambda weapon_id: globals.get_weapon(weapon_id)['levelRequirement'],
             reverse = not order
         )
         if order: return not_in_shop_weapons + displayed_shop_weapons # In ascending order, the non-shop weapons are always at the top
@@ -105,87 +171,90 @@ def sort_displayed_weapons(key, order, weapons_list):
     else:
         weapons_list = sorted(
             weapons_list, 
-            key = lambda weapon_id: next((item[key] for item in globals.weapons if item['id'] == weapon_id), 0),
+            key = lambda weapon_id: globals.get_weapon(weapon_id)[key] if globals.get_weapon(weapon_id) else 0,
             reverse = not order
         )
         return weapons_list
 
-# ========================
-#       GLOBAL STATE
-# ========================
+# The sort types that can be chosen in the shop and inventory menus
+SORT_TYPES = ['levelRequirement', 'price']
+
+def build_sort_orders():
+    """
+    Precomputes the order of all weapons and of the shop weapons for every sort type and order,
+    so menus never have to sort when they are opened or when the sorting is toggled.
+    """
+    all_weapons = [weapon['id'] for weapon in globals.weapons]
+    globals.weapon_sort_orders = {}
+    globals.shop_sort_orders = {}
+    for sort_type in SORT_TYPES:
+        for order in [True, False]:
+            globals.weapon_sort_orders[(sort_type, order)] = sort_weapons(sort_type, order, all_weapons)
+            globals.shop_sort_orders[(sort_type, order)] = sort_weapons(sort_type, order, globals.shop_weapons)
 
-class MenuState:
-    """Manages the state of the current menu, including options, pagination, sorting, and UI elements."""
-    def __init__(self):
-        # Core menu state
-        self.current_menu = None               # Tracks the current active menu
-        self.should_exit = False               # Determines whether the menu should exit
-
-        # Menu option state
-        self.selected = 0                      # Index of the currently selected option
-        self.main_menu_selected = 0            # Last selected for the main menu
-        self.shop_selected = 0                 # Last selected for the shop
-        self.options = []                      # List of menu options
-        self.title = None                      # Title displayed at the top of the menu
-        self.info = None                       # Additional information displayed in the menu
-        self.tooltip_before = None             # Tooltip displayed before the main tooltip (used for timers)
-        self.tooltip = None                    # Main tooltip for the current menu
-        self.menu_type = 'basic'               # Type of menu: 'basic', 'horizontal', or 'paged'
-
-        # Pagination state
-        self.page_size = 5                     # Number of options per page for paged menus
-        self.current_page = 1                  # Current page number (1-based index)
-        self.total_pages = 1                   # Total number of pages
-        self.start_index = 0                   # Index of the first option on the current page
-
-        # Sorting state
-        self.sort_type = None                  # Type of sorting applied (e.g., alphabetical, value-based)
-        self.sort_order = None                 # Order of sorting (e.g., ascending or descending)
-
-# Initialize global state
-menu_state = MenuState()
+def sort_displayed_weapons(key, order, weapons_list):
+    """
+    Sorts a list of weapons for display (like an inventory), with a given key and order.
+    Filters the precomputed order of all weapons instead of sorting the list again.
+
+    Parameters:
+    key (str): Name of key.
+    order (bool): False for descending order, True for ascending order.
+    weapons_list (list): List of weapon IDs.
+    """
+    displayed_weapons = set(weapons_list)
+    sorted_list = [weapon_id for weapon_id in globals.weapon_sort_orders[(key, order)] if weapon_id in displayed_weapons]
+    # Keep IDs without weapon data at the end so menus can still find and handle them
+    sorted_list += [weapon_id for weapon_id in weapons_list if globals.get_weapon(weapon_id) is None]
+    return sorted_list
 
 # ========================
 #       CRASH HANDLER
 # ========================
 
-def crash_handling(error):
+def crash_handling(session, error):
     """
     This function runs after an error happens which would stop the game.
 
     Parameters:
+    session (GameSession): The player's game session
     error (Exception): Error that contains the main error
     """
     globals.crashed = True 
     keyboard_manager.stop() # Stops keyboard inputs
+    globals.save_manager.flush() # Write any unsaved player data
+    flush_profile_saves()
     
     # Log the crash
     crash_log_path = os.path.join(LOGS_DIR, 'crash.log')
-    debug.error(f"An error was caught and crashed the game. Please check {crash_log_path}")
-    crash.error(f"Error caught while running the game:\n{error}\n{traceback.format_exc()}") # Full traceback of error cause
+    debug.error("An error was caught and crashed the game. Please check %s", crash_log_path)
+    crash.error("Error caught while running the game:\n%s\n%s", error, traceback.format_exc()) # Full traceback of error cause
 
     # Print crash statemment in game
     clear_terminal()
     print("The game unexpectedly crashed! Restarting in a second...")
-    time.sleep(2)
+    clock.sleep(2)
 
     globals.crashed = False
-    menu_state.should_exit = False
-    keyboard_manager.start()  # Restart keyboard listener
+    session.menu_state.should_exit = False  # start_game restarts the keyboard listener with the next session
 
 # ========================
 #       MENU FUNCTIONS
 # ========================
 
-def main_menu():
+@profiler.profile()
+def main_menu(session):
     """
     Displays the nain menu at the start of the game where the player can select the main options of the game
 
     Parameters:
+    session (GameSession): The player's game session
     selected (int): The index of the pre-selected option for this menu. 
                     Used to restore the player's selection when returning here from other menus or functions. 
                     Defaults to 0 if not set.
     """
+    menu_state = session.menu_state
+    player = session.player
 
     # Set up menu state for main menu
     menu_state.options = ['Play', 'Shop', 'Inventory', 'Settings', 'Exit']
@@ -220,34 +289,37 @@ def main_menu():
         """
         menu_state.selected = (menu_state.selected + delta) % len(menu_state.options) # Allows wrap-around
         menu_state.main_menu_selected = menu_state.selected
-        redraw_menu()
+        redraw_menu(session)
 
     def handle_enter():
         """Handle menu item selection"""
         if menu_state.selected == 0:  # Play
-            play_selection_menu()
+            play_selection_menu(session)
         elif menu_state.selected == 1:  # Shop
-            shop_menu()
+            shop_menu(session)
         elif menu_state.selected == 2:  # Inventory
-            inventory_menu()
+            inventory_menu(session)
         elif menu_state.selected == 3:  # Settings
-            settings_menu()
+            settings_menu(session)
         elif menu_state.selected == 4:  # Exit
-            exit_confirmation()
+            exit_confirmation(session)
 
     # Set the keyboard handler to this menu's key-input handler
-    keyboard_manager.set_handler(on_press)
-    redraw_menu()
+    session.input.set_handler(on_press)
+    redraw_menu(session)
 
-def exit_confirmation():
+def exit_confirmation(session):
     """
     Displays the exit confirmation menu when player selects 'Exit' from the main menu
 
     Parameters:
+    session (GameSession): The player's game session
     old_selected (int): The index of the pre-selected option for the main menu. 
                         Used to restore the player's selection in the main menu when returning from here. 
                         Defaults to 0 if not set.
     """
+    menu_state = session.menu_state
+    player = session.player
 
     # Set up the menu state for exit confirmation menu
     menu_state.options = ['Go Back', 'Confirm']
@@ -267,7 +339,7 @@ def exit_confirmation():
         """
         # No wrap around in here
         menu_state.selected = new_selection
-        redraw_menu()
+        redraw_menu(session)
 
     def on_press(key):
         """
@@ -283,24 +355,25 @@ def exit_confirmation():
             update_selection(1)
         elif key == 'enter':  # Enter key
             if menu_state.selected == 0:
-                main_menu() # Go back to main menu with the old_selected value
+                main_menu(session) # Go back to main menu with the old_selected value
             elif menu_state.selected == 1: 
                 player.save()
                 print('\nExiting game...')
                 menu_state.should_exit = True
         elif key == 'esc':  # Escape key
-            main_menu() # Go back to main menu with the old_selected value
+            main_menu(session) # Go back to main menu with the old_selected value
 
     # Set the keyboard handler to this menu's key-input handler
-    keyboard_manager.set_handler(on_press)
-    redraw_menu()
+    session.input.set_handler(on_press)
+    redraw_menu(session)
 
-def play_selection_menu(selected=0):
+def play_selection_menu(session, selected=0):
     """
     Displays the play selection menu when player selects 'Play' from the main menu.
     Players can navigate enemies for information and prompt to fight them if they meet requirements.
 
     Parameters:
+    session (GameSession): The player's game session
     selected (int): The index of the pre-selected option for this menu. 
                     Used to restore the player's selection when returning here from other menus or functions. 
                     Defaults to 0 if not set.
@@ -309,6 +382,8 @@ def play_selection_menu(selected=0):
                         Used to restore the player's selection in the main menu when returning from here. 
                         Defaults to 0 if not set.
     """
+    menu_state = session.menu_state
+    player = session.player
 
     # Set up the menu state for the play selection menu
     menu_state.menu_type = 'horizontal'
@@ -330,7 +405,7 @@ def play_selection_menu(selected=0):
         elif key == 'enter':
             handle_enter()
         elif key == 'esc': # Escape key
-            main_menu() # Go back to main menu with the old_selected value
+            main_menu(session) # Go back to main menu with the old_selected value
 
     def update_selection(delta):
         """
@@ -349,13 +424,14 @@ def play_selection_menu(selected=0):
         """Handle enemy selection for confirmation"""
         current_enemy = globals.enemies[menu_state.selected]
         if player.level >= current_enemy['level']:
-            play_confirm_fight(
+            play_confirm_fight(session, 
                 current_enemy,
                 style_text(current_enemy['title'], current_enemy['name']),
                 current_enemy['id'],
                 old_selected=menu_state.selected
             ) # Sends player to the a fight confirmation menu for the current enemy if player meets requirements
 
+    @profiler.profile()
     def update_menu_info():
         """Update the info and tooltip based on the selected enemy"""
 
@@ -424,18 +500,19 @@ def play_selection_menu(selected=0):
         menu_state.tooltip = style_text({'style': 'italic'}, enter_string, ' | ', prev_enemy_name, ' ← | → ', next_enemy_name, controls_tooltip)
         
         # Redraw menu to update displayed output
-        redraw_menu()
+        redraw_menu(session)
     
     # Set the keyboard handler to this menu's key-input handler
-    keyboard_manager.set_handler(on_press)
+    session.input.set_handler(on_press)
     update_menu_info()
 
-def play_confirm_fight(enemy, enemy_name, enemy_id, old_selected=0):
+def play_confirm_fight(session, enemy, enemy_name, enemy_id, old_selected=0):
     """
     Displays the play confirm fight menu when player selects an enemy from the play selection menu.
     Players can select 'Yes' if they want to initiate combat, otherwise 'No' goes back to the play selection menu.
 
     Parameters:
+    session (GameSession): The player's game session
     enemy (dictionary): Data of the selected enemy
     enemy_name (str or Text): (Styled) name of the selected enemy
     enemy_id (str): ID of the selected enemy
@@ -444,6 +521,8 @@ def play_confirm_fight(enemy, enemy_name, enemy_id, old_selected=0):
                         Used to restore the player's selection in the play selection menu when returning from here. 
                         Defaults to 0 if not set.
     """
+    menu_state = session.menu_state
+    player = session.player
     # Set up the menu state for the play confirm menu
     menu_state.options = [style_text({'style': 'bold'}, 'No'), style_text({'style': 'bold'}, 'Yes')]
     menu_state.menu_type = 'basic'
@@ -475,26 +554,32 @@ def play_confirm_fight(enemy, enemy_name, enemy_id, old_selected=0):
         new_selection (int): The new selection value
         """
         menu_state.selected = new_selection
-        redraw_menu()
+        redraw_menu(session)
 
     def handle_exit():
         """Return to selection menu without fighting"""
-        debug.info(Text(f"Did not fight ") + enemy_name)
-        play_selection_menu(selected=old_selected)
+        debug.info("Did not fight %s", enemy_name)
+        play_selection_menu(session, selected=old_selected)
 
     def handle_yes():
         """Initiate combat sequence"""
-        debug.info(Text(f"Fighting ") + enemy_name)
-        globals.in_combat = True # Set global combat variable to true
-        try:
-            # Initiate fight handled in fight.py
-            initiate_fight(enemy, enemy_name, enemy_id)
-        except Exception as e:
-            # If a crash occurs in fight.py, it is handled here
-            crash_handling(e)
-        finally:
-            # Go back to play selection menu after the player successfully ends the fight, or crashes during it
-            play_selection_menu(selected=old_selected)
+        debug.info("Fighting %s", enemy_name)
+        session.in_combat = True # The player is in combat until the battle ends
+        session.input.set_handler(None) # Ignore keys until the battle sets its own handler
+
+        def fight():
+            try:
+                # Initiate fight handled in fight.py
+                initiate_fight(session, enemy, enemy_name, enemy_id)
+            except Exception as e:
+                # If a crash occurs in fight.py, it is handled here
+                crash_handling(session, e)
+            finally:
+                # Go back to play selection menu after the player successfully ends the fight, or crashes during it
+                play_selection_menu(session, selected=old_selected)
+
+        # The battle waits for key presses, so it runs on its own thread instead of blocking the keyboard dispatcher
+        threading.Thread(target=fight, name='battle', daemon=True).start()
 
     def on_press(key):
         """
@@ -517,16 +602,17 @@ def play_confirm_fight(enemy, enemy_name, enemy_id, old_selected=0):
             handle_exit()
             
     # Set the keyboard handler to this menu's key-input handler
-    keyboard_manager.set_handler(on_press)
-    redraw_menu()
+    session.input.set_handler(on_press)
+    redraw_menu(session)
 
-def shop_menu():
+def shop_menu(session):
     """
     Displays the shop menu when player selects 'Shop' from the main menu.
     Shows the player's balance, level, and available weapons' names with labels indicating level requirement eligibility.
     Selection of a weapon sends the player to the shop weapon inspection menu.
 
     Parameters:
+    session (GameSession): The player's game session
     selected (int): The index of the pre-selected option for this menu. 
                     Used to restore the player's selection when returning here from other menus or functions. 
                     Defaults to 0 if not set.
@@ -535,6 +621,8 @@ def shop_menu():
                         Used to restore the player's selection in the main menu when returning from here. 
                         Defaults to 0 if not set.
     """
+    menu_state = session.menu_state
+    player = session.player
 
     # Set sorting state
     menu_state.sort_type = player.settings.get('shopSortType', 'price')
@@ -548,7 +636,7 @@ def shop_menu():
     sort_type = menu_state.sort_type
     sort_order = menu_state.sort_order
     # Initialize displayed shop options
-    displayed_shop = sort_displayed_weapons(sort_type, sort_order, globals.shop_weapons)
+    displayed_shop = globals.shop_sort_orders[(sort_type, sort_order)]
 
     # Set up the menu state for the shop menu
     menu_state.menu_type = 'paged'
@@ -591,12 +679,11 @@ def shop_menu():
                 current_weapon = current_option[1] # Get data of selected weapon
                 current_weapon_name = style_text(current_weapon['title'], current_weapon['name']) # Get and style name of selected weapon
                 # Sends player to the shop weapon inspection menu of the selected weapon
-                shop_view_weapon(current_weapon, current_weapon_name, current_weapon_id)
+                shop_view_weapon(session, current_weapon, current_weapon_name, current_weapon_id)
         elif key == 'esc':  # Escape key
-            main_menu() # Go back to the main menu with old selected value
+            main_menu(session) # Go back to the main menu with old selected value
         elif key == sort_type_keybind: # Key set for the sort type keybind
-            keys = ['levelRequirement', 'price'] # Existing types to sort
-            menu_state.sort_type = keys[(keys.index(menu_state.sort_type) + 1) % len(keys)] # Set the sort type to the next key
+            menu_state.sort_type = SORT_TYPES[(SORT_TYPES.index(menu_state.sort_type) + 1) % len(SORT_TYPES)] # Set the sort type to the next key
             update_menu_info() # Update displayed menu
             player.settings['shopSortType'] = menu_state.sort_type # Save to settings
             player.save(debugging=False) # Save player data to save file
@@ -627,6 +714,7 @@ def shop_menu():
         menu_state.shop_selected = menu_state.selected
         update_menu_info()
 
+    @profiler.profile()
     def update_menu_info():
         """Update options and tooltip based on sort order/type"""
 
@@ -639,22 +727,23 @@ def shop_menu():
         if menu_state.sort_type != sort_type or menu_state.sort_order != sort_order:
             sort_type = menu_state.sort_type
             sort_order = menu_state.sort_order
-            displayed_shop = sort_displayed_weapons(sort_type, sort_order, globals.shop_weapons)
+            displayed_shop = globals.shop_sort_orders[(sort_type, sort_order)]
 
         # ==================
         # Menu options setup
         # ==================
 
         options = [] # Initialize options
+        owned_weapons = set(player.inventory) # Set of owned weapon IDs for fast ownership checks
         # Iterate through the displayed shop weapons to generate menu options
         for weapon_id in displayed_shop:
-            weapon = next((item for item in globals.weapons if item['id'] == weapon_id), None) # Get weapon from weapons data based on weapon's ID
+            weapon = globals.get_weapon(weapon_id) # Get weapon from weapons data based on weapon's ID
             if weapon:
                 # Style weapon name for displayed option
                 option_text = style_text(weapon['title'], weapon['name'])
 
                 # Check if player already owns the weapon
-                if weapon_id in player.inventory:
+                if weapon_id in owned_weapons:
                     owned_text = style_text({'style': 'italic'}, ' (Owned)') if player.display_text else Text(" ✅")
                     option_text += owned_text
                 # If the player does not meet level requirement
@@ -665,7 +754,7 @@ def shop_menu():
                 # Add weapon id, weapon data, and option text to the options list
                 options.append((weapon_id, weapon, option_text))
             else: # If no data was found for given weapon ID
-                debug.warning(f"Error trying to find weapon with ID: {weapon_id}")
+                debug.warning("Error trying to find weapon with ID: %s", weapon_id)
         # Get selected option
         current_option = options[menu_state.selected]  
         # Update the menu options to display the option texts
@@ -699,13 +788,13 @@ def shop_menu():
         # Combine all the tooltips into one, with italic styling applied
         menu_state.tooltip = style_text({'style':'italic'}, sort_tooltip, control_tooltip, extra_tooltip)  
         
-        redraw_menu()
+        redraw_menu(session)
 
     # Set the keyboard handler to this menu's key-input handler
-    keyboard_manager.set_handler(on_press)
+    session.input.set_handler(on_press)
     update_menu_info() 
 
-def shop_view_weapon(weapon, weapon_name, weapon_id, selected=0):
+def shop_view_weapon(session, weapon, weapon_name, weapon_id, selected=0):
     """
     Displays the shop weapon inspection menu when player selects a weapon from the shop menu.
     Shows the player's balance and level at the title.
@@ -713,6 +802,7 @@ def shop_view_weapon(weapon, weapon_name, weapon_id, selected=0):
     Pressing ENTER sends the player to the shop buy weapon menu if player meets requirements.
 
     Parameters:
+    session (GameSession): The player's game session
     weapon (dictionary): Data of the selected weapon
     weapon_name (str or Text): (Styled) name of the selected weapon
     weapon_id (str): ID of the selected weapon
@@ -725,6 +815,8 @@ def shop_view_weapon(weapon, weapon_name, weapon_id, selected=0):
                         Used to restore the player's selection in the shop menu when returning from here. 
                         Defaults to 0 if not set.
     """
+    menu_state = session.menu_state
+    player = session.player
 
     # Set up the menu state for the shop weapon inspection menu
     menu_state.menu_type = 'horizontal'
@@ -767,9 +859,9 @@ def shop_view_weapon(weapon, weapon_name, weapon_id, selected=0):
             # If player meets level requirement, can afford it, and doesn't own it already
             if afford and correct_level and not owned:
                 # Sends player to weapon purchase confirmation menu
-                shop_buy_weapon(weapon, weapon_name, weapon_id, price, menu_state.selected)
+                shop_buy_weapon(session, weapon, weapon_name, weapon_id, price, menu_state.selected)
         elif key == 'esc':
-            shop_menu()  # Go back to the shop menu with old_selected 
+            shop_menu(session)  # Go back to the shop menu with old_selected 
 
     def update_selection(delta):
         """
@@ -784,8 +876,9 @@ def shop_view_weapon(weapon, weapon_name, weapon_id, selected=0):
         if 0 <= new_selected < len(abilities):
             menu_state.selected = new_selected
             update_menu_info()  # Update the displayed info and tooltip
-            redraw_menu()
+            redraw_menu(session)
 
+    @profiler.profile()
     def update_menu_info():
         """Update the info and tooltip based on the selected enemy"""
         nonlocal owned
@@ -825,7 +918,7 @@ def shop_view_weapon(weapon, weapon_name, weapon_id, selected=0):
         # Get selected ability stats (e.g. damage, hit chance)
         ability_stats = abilities[menu_state.selected]
         # Get information of selected ability (e.g. name, description) from attacks data
-        ability_info = next((att for att in globals.attacks if att['id'] == ability_stats['id']), None) 
+        ability_info = globals.get_attack(ability_stats['id']) 
 
         # Create ability title, including selected ability's index and total abilities
         ability_title = Text(f'\n == ABILITIES ({menu_state.selected + 1}/{len(abilities)}) ==\n')
@@ -864,18 +957,19 @@ def shop_view_weapon(weapon, weapon_name, weapon_id, selected=0):
         # Set the tooltip with the ability-specific navigation instructions, enter action prompt, and escape to go back if controls are enabled
         menu_state.tooltip =  style_text({'style':'italic'}, ability_tooltip, enter_string, ' | ESC to go back' if player.display_controls else '')
 
-        redraw_menu()
+        redraw_menu(session)
 
     # Set the keyboard handler to this menu's key-input handler
-    keyboard_manager.set_handler(on_press)
+    session.input.set_handler(on_press)
     update_menu_info() 
 
-def shop_buy_weapon(weapon, weapon_name, weapon_id, price, old_selected=0):
+def shop_buy_weapon(session, weapon, weapon_name, weapon_id, price, old_selected=0):
     """
     Displays the (selected) weapon purchase confirmation menu when player presses ENTER in the shop (selected) weapon inspection menu.
     Players can select 'Yes' if they want to purchase the selected weapon, otherwise 'No' goes back to the shop (selected) weapon inspection menu.
 
     Parameters:
+    session (GameSession): The player's game session
     weapon (dictionary): Data of the selected weapon
     weapon_name (str or Text): (Styled) name of the selected weapon
     weapon_id (str): ID of the selected weapon
@@ -885,6 +979,8 @@ def shop_buy_weapon(weapon, weapon_name, weapon_id, price, old_selected=0):
                         Used to restore the player's selection in the shop weapon inspection menu when returning from here. 
                         Defaults to 0 if not set.
     """
+    menu_state = session.menu_state
+    player = session.player
 
     # Set up the menu state for the weapon purchase confirmation menu
     menu_state.options = [style_text({'style': 'bold'}, 'No'), style_text({'style': 'bold'}, 'Yes')]
@@ -899,7 +995,7 @@ def shop_buy_weapon(weapon, weapon_name, weapon_id, price, old_selected=0):
         """Update selection and redraw menu"""
         # No wrap around in here
         menu_state.selected = new_selection
-        redraw_menu()
+        redraw_menu(session)
     
     def on_press(key):
         """
@@ -915,29 +1011,30 @@ def shop_buy_weapon(weapon, weapon_name, weapon_id, price, old_selected=0):
             update_selection(1)
         elif key == 'enter': 
             if menu_state.selected == 0: # Selects 'No'
-                debug.info(f"Did not purchase {weapon_name}")
+                debug.info("Did not purchase %s", weapon_name)
             elif menu_state.selected == 1: # Selects 'Yes'
                 player.inventory.append(weapon_id) # Add weapon to inventory
                 player.balance -= price # Subtract player's balance with price
-                debug.info(f"Purchased {weapon_name}")
+                debug.info("Purchased %s", weapon_name)
                 player.save()
             # Go back to shop weapon inspection menu with the old_selected value
-            shop_view_weapon(weapon, weapon_name, weapon_id, old_selected)
+            shop_view_weapon(session, weapon, weapon_name, weapon_id, old_selected)
         elif key == 'esc': 
             # Go back to shop weapon inspection with the old_selected value
-            shop_view_weapon(weapon, weapon_name, weapon_id, old_selected)
+            shop_view_weapon(session, weapon, weapon_name, weapon_id, old_selected)
 
     # Set the keyboard handler to this menu's key-input handler
-    keyboard_manager.set_handler(on_press)
-    redraw_menu()
+    session.input.set_handler(on_press)
+    redraw_menu(session)
 
-def inventory_menu(selected=0):
+def inventory_menu(session, selected=0):
     """
     Displays the inventory menu when player selects 'Inventory' from the main menu.
     Shows the player's balance, level, and available weapons' names with labels indicating level requirement eligibility.
     Selection of a weapon sends the player to the inventory weapon inspection menu.
 
     Parameters:
+    session (GameSession): The player's game session
     selected (int): The index of the pre-selected option for this menu. 
                     Used to restore the player's selection when returning here from other menus or functions. 
                     Defaults to 0 if not set.
@@ -946,6 +1043,8 @@ def inventory_menu(selected=0):
                         Used to restore the player's selection in the main menu when returning from here. 
                         Defaults to 0 if not set.
     """
+    menu_state = session.menu_state
+    player = session.player
     
     # Set sorting state
     menu_state.sort_type = player.settings.get('invSortType', 'levelRequirement')
@@ -965,10 +1064,7 @@ def inventory_menu(selected=0):
     current_option = None # Initialize selected option
 
     # Sort inventory by level requirement
-    player.inventory = sorted(
-        player.inventory, 
-        key = lambda weapon_id: next((item['levelRequirement'] for item in globals.weapons if item['id'] == weapon_id), 0)
-    )
+    player.inventory = sort_displayed_weapons('levelRequirement', True, player.inventory)
 
     # Store old sort_type and sort_order
     sort_type = menu_state.sort_type
@@ -1008,12 +1104,11 @@ def inventory_menu(selected=0):
                 current_weapon = current_option[1] # Get data of selected weapon
                 current_weapon_name = style_text(current_weapon['title'], current_weapon['name']) # Get and style name of selected weapon
                 # Sends player to the inventory weapon inspection menu of the selected weapon
-                inv_view_weapon(current_weapon, current_weapon_name, current_weapon_id, menu_state.selected)
+                inv_view_weapon(session, current_weapon, current_weapon_name, current_weapon_id, menu_state.selected)
         elif key == 'esc': 
-            main_menu()  # Go back to the main menu
+            main_menu(session)  # Go back to the main menu
         elif key == sort_type_keybind: # Key set for the sort type keybind
-            keys = ['levelRequirement', 'price'] # Existing types to sort
-            menu_state.sort_type = keys[(keys.index(menu_state.sort_type) + 1) % len(keys)] # Set the sort type to the next key
+            menu_state.sort_type = SORT_TYPES[(SORT_TYPES.index(menu_state.sort_type) + 1) % len(SORT_TYPES)] # Set the sort type to the next key
             update_menu_info() # Update displayed menu
             player.settings['invSortType'] = menu_state.sort_type # Save to settings
             player.save(debugging=False) # Save player data to save file
@@ -1043,6 +1138,7 @@ def inventory_menu(selected=0):
                 menu_state.selected = valid_indices[valid_indices.index(menu_state.selected) + delta]
         update_menu_info()
 
+    @profiler.profile()
     def update_menu_info():
         """Update options and tooltip based on sort order/type"""
 
@@ -1065,7 +1161,7 @@ def inventory_menu(selected=0):
         old_inventory = list(player.inventory) # Get old inventory to compare with updated inventory
         # Iterate through the displayed shop weapons to generate menu options
         for weapon_id in displayed_inventory:
-            weapon = next((item for item in globals.weapons if item['id'] == weapon_id), None) # Get weapon from weapons data based on weapon's ID
+            weapon = globals.get_weapon(weapon_id) # Get weapon from weapons data based on weapon's ID
             if weapon:
                 # Style weapon name for displayed option
                 option_text = style_text(weapon['title'], weapon['name'])
@@ -1082,7 +1178,7 @@ def inventory_menu(selected=0):
                 # Add weapon id, weapon data, and option text to the options list
                 options.append((weapon_id, weapon, option_text))
             else: # If no data was found for given weapon ID
-                debug.warning(f"Error trying to find weapon with ID: {weapon_id}, removing item off inventory.")
+                debug.warning("Error trying to find weapon with ID: %s, removing item off inventory.", weapon_id)
                 player.inventory.remove(weapon_id)
         # If the inventory had removed weapons, the save to player
         if len(old_inventory) != len(player.inventory): player.save(debugging=False)
@@ -1118,13 +1214,13 @@ def inventory_menu(selected=0):
         # Combine all the tooltips into one, with italic styling applied
         menu_state.tooltip = style_text({'style':'italic'}, sort_tooltip, control_tooltip, extra_tooltip)  
 
-        redraw_menu()
+        redraw_menu(session)
 
     # Set the keyboard handler to this menu's key-input handler
-    keyboard_manager.set_handler(on_press)
+    session.input.set_handler(on_press)
     update_menu_info() 
 
-def inv_view_weapon(weapon, weapon_name, weapon_id, old_selected=0):
+def inv_view_weapon(session, weapon, weapon_name, weapon_id, old_selected=0):
     """
     Displays the inventpry weapon inspection menu when player selects a weapon from the shop menu.
     Shows the player's balance and level at the title.
@@ -1132,6 +1228,7 @@ def inv_view_weapon(weapon, weapon_name, weapon_id, old_selected=0):
     Pressing ENTER equips the selected weapon.
 
     Parameters:
+    session (GameSession): The player's game session
     weapon (dictionary): Data of the selected weapon
     weapon_name (str or Text): (Styled) name of the selected weapon
     weapon_id (str): ID of the selected weapon
@@ -1140,6 +1237,8 @@ def inv_view_weapon(weapon, weapon_name, weapon_id, old_selected=0):
                         Used to restore the player's selection in the inventory menu when returning from here. 
                         Defaults to 0 if not set.
     """
+    menu_state = session.menu_state
+    player = session.player
 
     # Set up the menu state for the shop weapon inspection menu
     menu_state.menu_type = 'horizontal'
@@ -1176,11 +1275,11 @@ def inv_view_weapon(weapon, weapon_name, weapon_id, old_selected=0):
                 player.equipped = weapon_id # Set equipped weapon 
                 player.save(debugging=False) # Save to player
 
-                debug.info(f"Equipped {weapon_name}")
+                debug.info("Equipped %s", weapon_name)
                 equipped = True  
                 update_menu_info() 
         elif key == 'esc':
-            inventory_menu(selected=old_selected)  # Go back to the inventory menu with old_selected value
+            inventory_menu(session, selected=old_selected)  # Go back to the inventory menu with old_selected value
 
     def update_selection(delta):
         """
@@ -1196,6 +1295,7 @@ def inv_view_weapon(weapon, weapon_name, weapon_id, old_selected=0):
             menu_state.selected = new_selected
             update_menu_info()
 
+    @profiler.profile()
     def update_menu_info():
         nonlocal correct_level
         nonlocal equipped
@@ -1237,7 +1337,7 @@ def inv_view_weapon(weapon, weapon_name, weapon_id, old_selected=0):
         # Get selected ability stats (e.g. damage, hit chance)
         ability_stats = abilities[menu_state.selected]
         # Get information of selected ability (e.g. name, description) from attacks data
-        ability_info = next((att for att in globals.attacks if att['id'] == ability_stats['id']), None) 
+        ability_info = globals.get_attack(ability_stats['id']) 
 
         # Create ability title, including selected ability's index and total abilities
         ability_title = Text(f'\n == ABILITIES ({menu_state.selected + 1}/{len(abilities)}) ==\n')
@@ -1273,18 +1373,19 @@ def inv_view_weapon(weapon, weapon_name, weapon_id, old_selected=0):
         # Set the tooltip with the ability-specific navigation instructions, enter action prompt, and escape to go back if controls are enabled
         menu_state.tooltip =  style_text({'style':'italic'}, ability_tooltip, enter_string, ' | ESC to go back' if player.display_controls else '')
 
-        redraw_menu()
+        redraw_menu(session)
 
     # Set the keyboard handler to this menu's key-input handler
-    keyboard_manager.set_handler(on_press)
+    session.input.set_handler(on_press)
     update_menu_info() 
 
-def settings_menu(selected=0):
+def settings_menu(session, selected=0):
     """
     Displays the settings menu when player selects 'Settings' from the main menu.
     Shows the settings...
 
     Parameters:
+    session (GameSession): The player's game session
     selected (int): The index of the pre-selected option for this menu. 
                     Used to restore the player's selection when returning here from other menus or functions. 
                     Defaults to 0 if not set.
@@ -1293,12 +1394,19 @@ def settings_menu(selected=0):
                         Used to restore the player's selection in the main menu when returning from here. 
                         Defaults to 0 if not set.
     """
+    menu_state = session.menu_state
+    player = session.player
     options = [
         TwoStateSetting(style_text({'style': 'bold italic'}, 'Show keyboard controls on tooltips:'), 'displayControls'),
         TwoStateSetting(style_text({'style': 'bold italic'}, 'Show text instead of symbols for labels:'), 'displayTextTooltips'),
         TwoStateSetting(style_text({'style': 'bold italic'}, 'Show additional tooltips for symbols:'), 'displayExtraTooltips', None, {'displayTextTooltips': False}, False),
         TwoStateSetting(style_text({'style': 'bold italic'}, 'Switch navigation controls:'), 'useArrowKeys', ['WASD', 'Arrow Keys']),
         TwoStateSetting(style_text({'style': 'bold italic'}, 'Faster battle logs'), 'fasterBattleLogs'),
+        TwoStateSetting(style_text({'style': 'bold italic'}, 'Instant battle logs'), 'instantBattleLogs'),
+        TwoStateSetting(style_text({'style': 'bold italic'}, 'Journaled saves (only save changes)'), 'journaledSaves'),
+        TwoStateSetting(style_text({'style': 'bold italic'}, 'Write debug log'), 'debugLogging'),
+        TwoStateSetting(style_text({'style': 'bold italic'}, 'Profile menus and battles (from next launch)'), 'profiling'),
+        TwoStateSetting(style_text({'style': 'bold italic'}, 'Export metrics (from next launch)'), 'metricsExport'),
         KeyBindSetting(style_text({'style': 'bold italic'}, 'Set keybind for sort key:'), 'primarySortKeybind', ['secondarySortKeybind']),
         KeyBindSetting(style_text({'style': 'bold italic'}, 'Set keybind for sort order:'), 'secondarySortKeybind', ['primarySortKeybind']),
     ]
@@ -1330,17 +1438,17 @@ def settings_menu(selected=0):
             # Switch to previous page if current page isn't the first one
             menu_state.current_page -= 1  # Move to the previous page
             menu_state.selected = menu_state.current_page * menu_state.page_size  # Set selected to the first item of the page
-            redraw_menu()
+            redraw_menu(session)
         # Right arrow / D key
         elif key == ('right' if player.use_arrow_keys else 'd') and menu_state.current_page < menu_state.total_pages - 1: 
             # Switch to next page if current page isn't the last one
             menu_state.current_page += 1  # Move to the next page
             menu_state.selected = menu_state.current_page * menu_state.page_size  # Set selected to the first item of the page
-            redraw_menu()
+            redraw_menu(session)
         elif key == 'enter':
             handle_enter()
         elif key == 'esc':  
-            main_menu()  # Go back to the main menu with old_selected value
+            main_menu(session)  # Go back to the main menu with old_selected value
 
     def update_selection(delta):
         """
@@ -1372,7 +1480,7 @@ def settings_menu(selected=0):
         nonlocal new_options
         
         # Get the selected option and its ID
-        debug.info(menu_state.selected)
+        debug.info('Selected setting %s', menu_state.selected)
         selected_option = new_options[menu_state.selected]
         id = selected_option.id
         setting = player.settings.get(id)
@@ -1383,15 +1491,17 @@ def settings_menu(selected=0):
             # Toggle the setting value (True/False)
                 player.settings[id] = not player.settings[id]
                 player.save(debugging=False)
-                debug.info(f"{'Enabled' if player.settings[id] is True else 'Disabled'} setting: {id}")
+                apply_log_settings(player.settings)
+                debug.info("%s setting: %s", 'Enabled' if player.settings[id] is True else 'Disabled', id)
 
                 update_menu_info() 
             # If it's a keybind setting, open the keybind configuration menu
             elif isinstance(selected_option, KeyBindSetting):
-                set_keybind_menu(selected_option, menu_state.selected)
+                set_keybind_menu(session, selected_option, menu_state.selected)
         else:
-            debug.warning(f"Error finding setting: {id}")
+            debug.warning("Error finding setting: %s", id)
 
+    @profiler.profile()
     def update_menu_info():
         """
         Updates the menu options based on the player's settings.
@@ -1449,23 +1559,25 @@ def settings_menu(selected=0):
         arrow_keys_tooltip = 'Arrow Keys: ↑/↓ to navigate items, ←/→ to navigate pages' if player.use_arrow_keys else 'W/S to navigate items, A/D to navigate pages'
         menu_state.tooltip = style_text({'style': 'italic'}, f'{arrow_keys_tooltip} | ENTER to select | ESC to go back') if player.display_controls else None
         
-        redraw_menu()
+        redraw_menu(session)
 
     # Set the keyboard handler to this menu's key-input handler
-    keyboard_manager.set_handler(on_press)
+    session.input.set_handler(on_press)
     update_menu_info() 
 
-def set_keybind_menu(selected_option, old_selected):
+def set_keybind_menu(session, selected_option, old_selected):
     """
     Handles keybinding for a selected option in the settings menu. 
     This function listens for key presses and assigns the key to the selected option if it is valid.
 
     Parameters:
+    session (GameSession): The player's game session
     selected_option (TwoStateSetting/KeyBindSetting): The selected setting option to bind a key.
 
     old_selected (int): The index of the pre-selected option for the settings menu. 
                         Used to restore the player's selection in the settings menu when returning from here. 
     """
+    player = session.player
     blacklisted_keybind = None  # Track if a key is blacklisted
 
     def on_press(key):
@@ -1483,13 +1595,13 @@ def set_keybind_menu(selected_option, old_selected):
 
         # Handle the ESC key to cancel and return to the settings menu
         elif key == 'esc':  
-            settings_menu(old_selected)  # Go back to the settings menu
+            settings_menu(session, old_selected)  # Go back to the settings menu
 
         # Otherwise, set the keybind if no conflicts or blacklist
         else:
             player.settings[selected_option.id] = key
             player.save(debugging=False)  # Save the keybind
-            settings_menu(old_selected)  # Go back to the settings menu
+            settings_menu(session, old_selected)  # Go back to the settings menu
 
     def update_menu():
         """Update tooltip based on settings"""
@@ -1503,76 +1615,107 @@ def set_keybind_menu(selected_option, old_selected):
         if blacklisted_keybind:
             console.print(style_text({'style': 'bold italic'}, f'You cannot set your keybind to {blacklisted_keybind.upper()}!'))  # Show conflict message
     
-    keyboard_manager.set_handler(on_press)
+    session.input.set_handler(on_press)
     update_menu() 
 
 # ========================
 #       REDRAW LOGIC
 # ========================
 
-def redraw_menu(clear=True):
-    """Redraw the menu."""
-    if clear: clear_terminal()
-    if menu_state.menu_type == 'basic':
-        print_basic_menu(
-            menu_state.options,
-            menu_state.selected,
-            menu_state.title,
-            menu_state.info,
-            menu_state.tooltip_before,
-            menu_state.tooltip
-        )
-    elif menu_state.menu_type == 'horizontal':
-        print_horizontal_menu(
-            menu_state.info,
-            menu_state.title,
-            menu_state.tooltip
-        )
-    elif menu_state.menu_type == 'paged':
-        # Call print_paged_menu and store the returned values
-        current_page, total_pages, start_index = print_paged_menu(
-            menu_state.options,
-            menu_state.selected,
-            menu_state.title,
-            menu_state.tooltip,
-            menu_state.page_size
-        )
-        # Update the menu state with paging information
-        menu_state.current_page = current_page
-        menu_state.total_pages = total_pages
-        menu_state.start_index = start_index
+@profiler.profile()
+def redraw_menu(session, clear=True):
+    """Redraw the menu of a session."""
+    menu_state = session.menu_state
+    with redraw_seconds.time(menu=menu_state.menu_type):  # Track redraw counts and durations per menu type
+        if clear: clear_terminal()
+        if menu_state.menu_type == 'basic':
+            print_basic_menu(
+                menu_state.options,
+                menu_state.selected,
+                menu_state.title,
+                menu_state.info,
+                menu_state.tooltip_before,
+                menu_state.tooltip
+            )
+        elif menu_state.menu_type == 'horizontal':
+            print_horizontal_menu(
+                menu_state.info,
+                menu_state.title,
+                menu_state.tooltip
+            )
+        elif menu_state.menu_type == 'paged':
+            # Call print_paged_menu and store the returned values
+            current_page, total_pages, start_index = print_paged_menu(
+                menu_state.options,
+                menu_state.selected,
+                menu_state.title,
+                menu_state.tooltip,
+                menu_state.page_size
+            )
+            # Update the menu state with paging information
+            menu_state.current_page = current_page
+            menu_state.total_pages = total_pages
+            menu_state.start_index = start_index
 
 # ========================
 #     INITIALIZE GAME
 # ========================
 
-def load_game_data():
-    """Loads game data including enemies, weapons, and player data."""
-    load_enemies()
-    load_weapons()
-    player.load()
+@profiler.profile()
+def load_game_data(session):
+    """Loads game data including enemies, weapons, and the session's player data."""
+    load_content()
+    session.player.load()
+    apply_log_settings(session.player.settings) # Set the debug log level from the player's settings
+
+def main_loop(session):
+    """Main game loop to display the menu and handle game flow of a session."""
+    main_menu(session)  # Display the main menu
+    if startup.enabled:
+        startup.mark('main_menu')
+        session.menu_state.should_exit = True  # --startup-report only measures the time to the first main menu
 
-def main_loop():
-    """Main game loop to display the menu and handle game flow."""
-    main_menu()  # Display the main menu
-    
     # Keep the game running until the exit option is selected
-    while not menu_state.should_exit:
+    while not session.menu_state.should_exit:
         time.sleep(0.1)  # Prevent CPU overload
 
-def start_game():
-    keyboard_manager.start()  # Start keyboard listener
+def start_game(profile=False):
+    """
+    Starts the game and restarts it after crashes.
+
+    Parameters:
+    profile (bool): Whether to profile menus, redraws and battles (the --profile launch option), also enabled by the profiling setting
+
+    Returns:
+    int: Exit code, 1 if no keyboard input is available
+    """
+    # Without any input backend, the game would crash and restart forever
+    if not input_available():
+        print("No keyboard input available: run the game in a terminal, or install pynput and PyGetWindow in a desktop session.")
+        return 1
+    set_window_title("generic terminal rpg")
+    if profile:
+        profiler.enable()
     while True:
         """Main game loop with crash handling and restart"""
+        session = GameSession() # New player and menu state, also after a crash
         try:
-            globals.in_combat = False
-
-            load_game_data() # Load game data
-            main_loop() # Start the game
-
-            break # If the game exits normally, break the loop
+            load_game_data(session) # Load game data
+            startup.mark('load_game_data')
+            if session.player.settings.get('profiling'):
+                profiler.enable()
+            if (session.player.settings.get('metricsExport') or os.environ.get(METRICS_FILE_ENV)) and not metrics.export_handle:
+                metrics.start_export()
+            keyboard_manager.start(session.player.settings.get('inputBackend')) # Start keyboard listener with the input backend from settings
+            startup.mark('keyboard')
+            main_loop(session) # Start the game
+
+            globals.save_manager.flush() # Write any unsaved player data before exiting
+            flush_profile_saves()
+            keyboard_manager.stop() # Stop reading keys (restores the terminal if keys were read from it)
+            return 0 # If the game exits normally, stop restarting it
         except Exception as e:
-            crash_handling(e) # Handle crash
+            crash_handling(session, e) # Handle crash
 
             # ==========
             # Reset data
@@ -1583,6 +1726,5 @@ def start_game():
             globals.weapons = []
             globals.attacks = []
             globals.shop_weapons = []
-
-            # Re-initialize player to reset player values to default
-            player.__init__()
\ No newline at end of file
+            globals.index_content()
+            build_sort_orders()
\ No newline at end of file
@@ -0,0 +1,225 @@
+from .utils import *
+
+# Words the names of generated content are built from
+ADJECTIVES = ['Ancient', 'Blazing', 'Cursed', 'Frozen', 'Gilded', 'Hollow', 'Iron', 'Jagged', 'Lunar', 'Molten',
+              'Obsidian', 'Radiant', 'Rusted', 'Shadow', 'Silent', 'Storm', 'Thorned', 'Venom', 'Wild', 'Zealous']
+WEAPON_NOUNS = ['Blade', 'Sword', 'Saber', 'Cleaver', 'Edge', 'Fang', 'Katana', 'Rapier', 'Scimitar', 'Claymore']
+ATTACK_NOUNS = ['Slash', 'Strike', 'Cleave', 'Thrust', 'Burst', 'Sweep', 'Lunge', 'Rend', 'Surge', 'Crash']
+ENEMY_NOUNS = ['Goblin', 'Wolf', 'Skeleton', 'Ogre', 'Wraith', 'Golem', 'Serpent', 'Harpy', 'Troll', 'Drake']
+ENEMY_ATTACK_NOUNS = ['Bite', 'Claw Swipe', 'Tail Whip', 'Ground Stomp', 'Roar', 'Charge', 'Headbutt', 'Lash']
+
+# Message pools of generated attacks, with the same placeholders as the real ones:
+# start messages only get the attack name, the other pools also get the enemy name (and the damage for hits).
+# Every pool is required, since generated abilities can miss and crit.
+ATTACK_MESSAGES = {
+    'start': [
+        "{attack_name} gathers strength as the blade rises.",
+        "With a steady breath, {attack_name} is unleashed.",
+        "The air shifts as {attack_name} begins."
+    ],
+    'hit': [
+        "{attack_name} strikes {enemy_name} for {damage}.",
+        "{enemy_name} staggers as {attack_name} lands for {damage}.",
+        "A clean hit! {attack_name} deals {damage} to {enemy_name}."
+    ],
+    'crit': [
+        "A critical blow! {attack_name} tears through {enemy_name} for {damage}!",
+        "{attack_name} lands with overwhelming force, dealing {damage} to {enemy_name}!",
+        "{enemy_name} reels as {attack_name} critically hits for {damage}!"
+    ],
+    'miss': [
+        "{attack_name} goes wide, missing {enemy_name} entirely!",
+        "{enemy_name} sidesteps {attack_name} at the last moment.",
+        "{attack_name} cuts through empty air as {enemy_name} ducks away."
+    ]
+}
+
+MAX_LEVEL = 50  # Highest level requirement of generated weapons and level of generated enemies
+
+def random_title(rng):
+    """Returns a random title style like the ones of the real content."""
+    title = {'color': [rng.randint(60, 255) for _ in range(3)]}
+    if rng.random() < 0.2:
+        title['style'] = 'bold'
+    return title
+
+def unique_name(rng, words, nouns, index):
+    """Returns a readable name that is unique thanks to its index."""
+    return f'{rng.choice(words)} {rng.choice(nouns)} {index}'
+
+def generate_attacks(rng, count):
+    """
+    Generates the attacks weapon abilities use.
+
+    Returns:
+    list: Data of the attacks, in the format of data/weapons/attacks/*.json
+    """
+    attacks = []
+    for index in range(count):
+        name = unique_name(rng, ADJECTIVES, ATTACK_NOUNS, index)
+        attacks.append({
+            'name': name.upper(),
+            'id': f'attack_{index}',
+            'title': random_title(rng),
+            'description': f'A generated attack dealing {{minDamage}}-{{maxDamage}} damage.',
+            'messages': ATTACK_MESSAGES
+        })
+    return attacks
+
+def generate_ability(rng, attack_id, level, cooldown):
+    """Returns a weapon ability using an attack, with damage scaled by the weapon's level requirement."""
+    min_damage = rng.randint(5, 10) + level * rng.randint(3, 6)
+    return {
+        'id': attack_id,
+        'minDamage': min_damage,
+        'maxDamage': min_damage + rng.randint(1, 5 + level),
+        'critMulti': round(rng.uniform(0.3, 1.0), 2),
+        'critChance': rng.randint(5, 60),
+        'hitChance': rng.choice([100, 100, 95, 90, 80, 70]),
+        'cooldown': cooldown
+    }
+
+def generate_weapons(rng, count, attack_ids):
+    """
+    Generates weapons with 1-4 abilities each. The first weapon is always the default weapon new players start with.
+
+    Returns:
+    list: Data of the weapons, in the format of data/weapons/*.json
+    """
+    weapons = []
+    for index in range(count):
+        level = 0 if index == 0 else rng.randint(0, MAX_LEVEL)
+        abilities = [generate_ability(rng, attack_id, level, 0 if position == 0 else rng.randint(1, 6))
+                     for position, attack_id in enumerate(rng.sample(attack_ids, min(rng.randint(1, 4), len(attack_ids))))]
+        weapon = {
+            'name': 'Crude Sword' if index == 0 else unique_name(rng, ADJECTIVES, WEAPON_NOUNS, index),
+            'id': 'default' if index == 0 else f'weapon_{index}',
+            'title': random_title(rng),
+            'description': 'A generated weapon for testing the game with a lot of content.',
+            'inShop': index != 0 and rng.random() < 0.8,
+            'levelRequirement': level,
+            'abilities': abilities
+        }
+        if weapon['inShop']:
+            weapon['price'] = rng.randint(1, 20) * 50 + level * 100
+        weapons.append(weapon)
+    return weapons
+
+def generate_enemies(rng, count, reward_weapon_ids):
+    """
+    Generates enemies with 1-4 attacks each and rewards that can drop weapons that aren't in the shop.
+
+    Returns:
+    list: (main data, attacks data) of each enemy, in the format of data/enemies/<id>/main.json and attacks.json
+    """
+    enemies = []
+    for index in range(count):
+        level = rng.randint(0, MAX_LEVEL)
+        boss = rng.random() < 0.05
+        min_money = 10 + level * rng.randint(5, 10)
+        min_xp = 100 + level * rng.randint(40, 60)
+        rewards = {
+            'minMoney': min_money,
+            'maxMoney': min_money + rng.randint(5, 200),
+            'minXp': min_xp,
+            'maxXp': min_xp + rng.randint(10, 500)
+        }
+        if reward_weapon_ids and (boss or rng.random() < 0.3):
+            rewards['weapons'] = {weapon_id: round(rng.uniform(0.05, 5), 2) for weapon_id in rng.sample(reward_weapon_ids, min(rng.randint(1, 3), len(reward_weapon_ids)))}
+        main = {
+            'name': unique_name(rng, ADJECTIVES, ENEMY_NOUNS, index),
+            'id': f'enemy_{index}',
+            'title': random_title(rng),
+            'health': (100 + 4 * level ** 2) * (5 if boss else 1),
+            'level': level,
+            'boss': boss,
+            'rewards': rewards
+        }
+        attacks = []
+        for attack_index in range(rng.randint(1, 4)):
+            min_damage = 5 + level * rng.randint(1, 3)
+            attacks.append({
+                'name': rng.choice(ENEMY_ATTACK_NOUNS),
+                'id': f'enemy_{index}_attack_{attack_index}',
+                'title': random_title(rng),
+                'minDamage': min_damage,
+                'maxDamage': min_damage + rng.randint(1, 10 + level),
+                'critMulti': round(rng.uniform(0.2, 0.7), 2),
+                'critChance': rng.randint(5, 30),
+                'attackChance': rng.randint(5, 60)
+            })
+        enemies.append((main, {'attacks': attacks}))
+    return enemies
+
+def write_json(file_path, data):
+    """Writes a content file with the same indentation as the real content."""
+    with open(file_path, 'w', encoding='utf-8') as file:
+        json.dump(data, file, indent=4)
+
+def generate_content(directory, weapons=10000, attacks=2000, enemies=1000, seed=0):
+    """
+    Writes a synthetic content tree with the same layout and schemas as the data directory.
+    The same counts and seed always generate the same content.
+
+    Parameters:
+    directory (str): Data directory to write to (it gets weapons/, weapons/attacks/ and enemies/ subdirectories)
+    weapons (int): Number of weapons, including the default weapon
+    attacks (int): Number of attacks used by weapon abilities
+    enemies (int): Number of enemies
+    seed (int): Seed of the random number generator
+
+    Returns:
+    dict: Number of weapons, attacks and enemies written
+    """
+    rng = random.Random(seed)
+    weapons_dir = os.path.join(directory, 'weapons')
+    attacks_dir = os.path.join(weapons_dir, 'attacks')
+    enemies_dir = os.path.join(directory, 'enemies')
+    os.makedirs(attacks_dir, exist_ok=True)
+    os.makedirs(enemies_dir, exist_ok=True)
+
+    attack_data = generate_attacks(rng, max(attacks, 1))
+    for attack in attack_data:
+        write_json(os.path.join(attacks_dir, f"{attack['id']}.json"), attack)
+
+    weapon_data = generate_weapons(rng, max(weapons, 1), [attack['id'] for attack in attack_data])
+    for weapon in weapon_data:
+        write_json(os.path.join(weapons_dir, f"{weapon['id']}.json"), weapon)
+
+    reward_weapon_ids = [weapon['id'] for weapon in weapon_data if not weapon['inShop'] and weapon['id'] != 'default']
+    enemy_data = generate_enemies(rng, enemies, reward_weapon_ids)
+    for main, enemy_attacks in enemy_data:
+        enemy_dir = os.path.join(enemies_dir, main['id'])
+        os.makedirs(enemy_dir, exist_ok=True)
+        write_json(os.path.join(enemy_dir, 'main.json'), main)
+        write_json(os.path.join(enemy_dir, 'attacks.json'), enemy_attacks)
+
+    return {'weapons': len(weapon_data), 'attacks': len(attack_data), 'enemies': len(enemy_data)}
+
+def main(arguments=None):
+    """Command line entry point: python -m src.generator <directory>"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate synthetic content for testing the game at scale. Play or benchmark it with GTRPG_DATA_DIR=<directory>.")
+    parser.add_argument('directory', help="Data directory to write the content to")
+    parser.add_argument('--weapons', type=int, default=10000, help="Number of weapons (default: 10000)")
+    parser.add_argument('--attacks', type=int, default=2000, help="Number of weapon attacks (default: 2000)")
+    parser.add_argument('--enemies', type=int, default=1000, help="Number of enemies (default: 1000)")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for reproducible content (default: 0)")
+    parser.add_argument('--force', action='store_true', help="Write into a directory that isn't empty")
+    arguments = parser.parse_args(arguments)
+
+    directory = os.path.abspath(arguments.directory)
+    if os.path.normpath(directory) == os.path.normpath(os.path.join(ROOT, 'data')):
+        parser.error("Refusing to write into the game's own data directory")
+    if os.path.isdir(directory) and os.listdir(directory) and not arguments.force:
+        parser.error(f"{directory} isn't empty, pass --force to write into it anyway")
+
+    start_time = time.perf_counter()
+    counts = generate_content(directory, arguments.weapons, arguments.attacks, arguments.enemies, arguments.seed)
+    elapsed = time.perf_counter() - start_time
+    print(f"Generated {counts['weapons']:,} weapons, {counts['attacks']:,} attacks and {counts['enemies']:,} enemies in {directory} ({elapsed:.2f}s)")
+    print(f"Run the game or benchmarks with it: GTRPG_DATA_DIR={directory} python main.py")
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,8 @@
 from .utils import *
 from .libraries import *
+from .save_manager import SaveManager
+from .profiles import get_profile_store
+from .metrics import saves
 
 # Data loaded from game
 enemies = []
@@ -7,8 +10,42 @@ weapons = []
 attacks = []
 shop_weapons = []
 
+# Registry of the loaded data indexed by ID, kept in sync with the lists above by index_content()
+enemies_by_id = {}
+weapons_by_id = {}
+attacks_by_id = {}
+
+# Precomputed weapon ID orders for each (sort type, ascending) pair, built by game.build_sort_orders()
+weapon_sort_orders = {}
+shop_sort_orders = {}
+
+def index_content():
+    """Rebuild the ID registries from the loaded enemies, weapons and attacks. Call this whenever they are (re)loaded."""
+    global enemies_by_id, weapons_by_id, attacks_by_id
+
+    def index(items):
+        indexed = {}
+        for item in items:
+            indexed.setdefault(item.get('id'), item) # Keep the first item if IDs are duplicated, like a linear search would
+        return indexed
+
+    enemies_by_id = index(enemies)
+    weapons_by_id = index(weapons)
+    attacks_by_id = index(attacks)
+
+def get_enemy(enemy_id):
+    """Returns the enemy data with the given ID, or None if it doesn't exist."""
+    return enemies_by_id.get(enemy_id)
+
+def get_weapon(weapon_id):
+    """Returns the weapon data with the given ID, or None if it doesn't exist."""
+    return weapons_by_id.get(weapon_id)
+
+def get_attack(attack_id):
+    """Returns the attack data with the given ID, or None if it doesn't exist."""
+    return attacks_by_id.get(attack_id)
+
 # Global conditions
-in_combat = False
 crashed = False
 
 # Player data
@@ -21,6 +58,7 @@ class Player():
         self.xp_goal = 100
         self.equipped = 'default'
         self.inventory = ['default']
+        self.profile_id = None # Profile in the profile store the player is saved to, None for the save file
 
         self.display_controls = True
         self.display_extra = True
@@ -37,7 +75,17 @@ class Player():
             'displayTextTooltips': self.display_text,
             'displayExtraTooltips': self.display_extra,
             'useArrowKeys': self.use_arrow_keys,
-            'fasterBattleLogs': False
+            'fasterBattleLogs': False,
+            'instantBattleLogs': False,
+            'battleClockScale': 1,
+            'inputBackend': 'auto',
+            'journaledSaves': False,
+            'logLevel': 'INFO',
+            'debugLogging': True,
+            'logBackupCount': 5,
+            'compressLogs': False,
+            'profiling': False,
+            'metricsExport': False
         }
 
     def level_up(self):
@@ -68,9 +116,14 @@ class Player():
 
     def scale_health(self):
         """Scale and update health based on level. Uses quadratic formula"""
+        self.health = Player.health_for_level(self.level)
+
+    @staticmethod
+    def health_for_level(level):
+        """Returns the player's health at the given level. Uses quadratic formula"""
         scale_factor = 0.05
         base = 100
-        self.health = round(base *(1 + scale_factor * self.level**2))
+        return round(base *(1 + scale_factor * level**2))
 
     def update_self_settings(self):
         """Get settings value of the individual settings or their default value if it doesn't exist inside settings"""
@@ -87,8 +140,19 @@ class Player():
         self.settings['useArrowKeys'] = self.use_arrow_keys
 
     # Player loading/saving
-    def load(self):
-        data = load_file_from_directory(DATA_DIR, 'save_file', backup=True)
+    def load(self, profile_id=None):
+        """
+        Loads the player data from the save file, or from the profile store if a profile ID is given.
+        Later saves go to the same profile.
+
+        Parameters:
+        profile_id (str, optional): ID of the profile to load
+        """
+        self.profile_id = profile_id
+        if profile_id is not None:
+            data = get_profile_store().load(profile_id)
+        else:
+            data = save_manager.load(backup=True)
         if data:
             self.health = data.get('health', self.health)
             self.balance = data.get('money', self.balance)
@@ -99,20 +163,27 @@ class Player():
             self.equipped = data.get('equipped', self.equipped)
             self.inventory = data.get('inventory', self.inventory)
 
-            self.settings = data.get('settings', self.settings)
+            self.settings = {**self.settings, **data.get('settings', {})} # Keep defaults for settings missing from older saves
             self.update_self_settings()
             self.update_saved_settings() # Set settings in case some settings were missing in the settings dictionary
 
             self.level_up() 
             self.scale_health()
-            debug.info('Loaded player data:\n' + str(data))
+            debug.info('Loaded player data:\n%s', data)
         else:
             debug.info('Loaded default player data.')
             self.save(debugging=False)
 
-    def save(self, debugging=True):
-        self.update_self_settings()
+    def save(self, debugging=True, profile_id=None):
+        """
+        Marks the player data as changed, it is written to the save file in the background (see SaveManager).
+        Players loaded from a profile are saved to the profile store instead, also in the background.
 
+        Parameters:
+        debugging (bool): Whether to log the saved data
+        profile_id (str, optional): ID of the profile to save to, defaults to the loaded profile
+        """
+        self.update_self_settings()
 
         data = {
             'health': self.health,
@@ -126,6 +197,11 @@ class Player():
             'equipped': self.equipped,
             'settings': self.settings
         }
-        save_file_from_directory(DATA_DIR, 'save_file', data, debugging=debugging)
+        profile_id = profile_id if profile_id is not None else self.profile_id
+        saves.inc()
+        if profile_id is not None:
+            get_profile_store().save_later(profile_id, data, debugging=debugging)
+        else:
+            save_manager.save(data, debugging=debugging, journaled=self.settings.get('journaledSaves', False))
 
-player = Player()
\ No newline at end of file
+save_manager = SaveManager(DATA_DIR, 'save_file')
\ No newline at end of file
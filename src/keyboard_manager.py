@@ -1,8 +1,72 @@
 from .libraries import *
 from .utils import *
 
-from pynput import keyboard
-from threading import Lock, Thread
+from .terminal_input import TerminalInput
+from .metrics import keys_received, keys_dropped
+from threading import Condition, Lock, Thread
+from collections import deque
+
+MAX_QUEUED_KEYS = 32     # Keys waiting for the handler beyond this are dropped
+COALESCE_BACKLOG = 4     # Repeated navigation keys are merged once this many keys are waiting
+NAVIGATION_KEYS = {'up', 'down', 'left', 'right', 'w', 'a', 's', 'd'}
+
+# Input backends: 'pynput' listens to global key presses of the focused terminal window,
+# 'terminal' reads keys from the terminal itself and also works over SSH
+INPUT_BACKENDS = ['auto', 'pynput', 'terminal']
+
+def load_pynput():
+    """
+    Imports pynput's keyboard module when the pynput backend might be used. pynput needs a desktop session,
+    it can't be imported over SSH or in containers without a display, and importing it is slow.
+
+    Returns:
+    module: pynput.keyboard, or None if pynput or pygetwindow (for focus checks) can't be imported
+    """
+    keyboard = optional_import('pynput.keyboard')
+    if keyboard is None or optional_import('pygetwindow') is None:
+        return None
+    return keyboard
+
+def has_desktop_session():
+    """Whether the game runs in a local desktop session where global keyboard hooks and window focus checks work."""
+    if os.environ.get('SSH_CONNECTION') or os.environ.get('SSH_TTY'):
+        return False
+    if platform.system() in ("Windows", "Darwin"):
+        return True
+    return bool(os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+
+def select_input_backend(preference=None):
+    """
+    Picks the input backend to use. The GTRPG_INPUT_BACKEND environment variable takes priority over the preference.
+
+    Parameters:
+    preference (str, optional): 'auto', 'pynput' or 'terminal', usually the inputBackend setting
+
+    Returns:
+    str: 'pynput' or 'terminal'
+    """
+    preference = os.environ.get('GTRPG_INPUT_BACKEND') or preference or 'auto'
+    terminal_available = TerminalInput.is_supported()
+
+    if preference not in INPUT_BACKENDS:
+        debug.warning("Unknown input backend: %s, picking one automatically", preference)
+    elif preference == 'pynput' and load_pynput():
+        return 'pynput'
+    elif preference == 'terminal' and terminal_available:
+        return 'terminal'
+    elif preference != 'auto':
+        debug.warning("Input backend %s isn't available here, picking one automatically", preference)
+
+    # pynput is only imported if it can be picked, so terminal sessions (e.g. over SSH) never pay for it
+    if (has_desktop_session() or not terminal_available) and load_pynput():
+        return 'pynput'
+    if terminal_available:
+        return 'terminal'
+    raise Exception("No keyboard input available: pynput can't be used and the game isn't running in a terminal")
+
+def input_available():
+    """Whether any input backend can be used: the game runs in a terminal, or pynput can be imported."""
+    return TerminalInput.is_supported() or load_pynput() is not None
 
 class KeyboardManager:
     def __init__(self):
@@ -10,42 +74,123 @@ class KeyboardManager:
         self.lock = Lock()
         self.pressed_keys = set()
         self.listener = None
+        self.terminal_input = None  # Terminal reader, created once and restarted after crashes so the terminal is restored once at exit
+        self.backend = None  # Input backend in use, picked on the first start
         self.shutdown = False
         self.last_key_time = 0  # Track last key press time for debouncing
 
-    def start(self):
-        """Start the keyboard listener (call ONCE at game launch)."""
+        # Keys are handled in order by a single dispatcher thread
+        self.queue = deque()
+        self.queue_condition = Condition()
+        self.dispatcher = None
+        self.dropped_keys = 0    # Keys dropped because the queue was full
+        self.coalesced_keys = 0  # Navigation keys merged into the same waiting key
+
+        # Lets scripted input wait until a menu or battle turn has set its handler
+        self.handler_condition = Condition()
+        self.handler_version = 0  # Increased every time the handler changes
+
+    def start(self, preference=None):
+        """
+        Start the keyboard listener (call ONCE at game launch).
+
+        Parameters:
+        preference (str, optional): Preferred input backend ('auto', 'pynput' or 'terminal'), only used on the first start
+        """
+        if self.backend is None:
+            self.backend = select_input_backend(preference)
+            debug.info("Using the %s input backend", self.backend)
+
         if not self.listener or not self.listener.is_alive():
             self.shutdown = False  # Reset on restart
-            self.listener = keyboard.Listener(
-                on_press=self._handle_press,
-                on_release=self._handle_release
-            )
+            if self.backend == 'pynput':
+                focus_tracker.start()  # Check terminal focus in the background so key presses only read the cached state
+                self.listener = load_pynput().Listener(
+                    on_press=self._handle_press,
+                    on_release=self._handle_release
+                )
+            else:
+                # Keys are read from the terminal itself, so they always belong to the game and are never held
+                if self.terminal_input is None:
+                    self.terminal_input = TerminalInput(on_key=self._handle_key)
+                self.listener = self.terminal_input
             self.listener.start()
+        if not self.dispatcher or not self.dispatcher.is_alive():
+            self.dispatcher = Thread(target=self._dispatch, daemon=True)
+            self.dispatcher.start()
 
     def _handle_press(self, key):
-        """Process key presses (no repeats when holding)."""
+        """Process key presses from pynput (no repeats when holding)."""
         if self.shutdown:  # Immediately return if shutting down
             return
     
         try:
             key_str = key.char if hasattr(key, 'char') else str(key).replace('Key.', '').lower()
-            
-            with self.lock:
+            self._handle_key(key_str, global_hook=True)
+        except Exception as e:
+            print(f"[Key Error] {e}")
+
+    def _handle_key(self, key_str, global_hook=False):
+        """
+        Common path of key presses from every input backend, queues the key for the current handler.
+
+        Parameters:
+        key_str (str): Name of the pressed key
+        global_hook (bool): Whether the key comes from a global keyboard hook (pynput), which needs debouncing,
+                            focus checks and release tracking
+        """
+        keys_received.inc()  # Every key from the backend, keys_dropped counts the ones that never reach a handler
+        if self.shutdown:  # Immediately return if shutting down
+            keys_dropped.inc(reason='shutdown')
+            return
+
+        with self.lock:
+            if global_hook:
                 # Debounce: Ignore keys pressed too quickly (within 50ms)
                 current_time = time.time() * 1000  # Convert to milliseconds
                 if (current_time - self.last_key_time) < 50:
+                    keys_dropped.inc(reason='debounced')
                     return
                 self.last_key_time = current_time
 
-                if self.shutdown or not is_terminal_in_focus():  # Extra check
+                if not is_terminal_in_focus():
+                    keys_dropped.inc(reason='unfocused')
                     return
-                if key_str not in self.pressed_keys:
-                    self.pressed_keys.add(key_str)
-                    if self.current_handler:
-                        Thread(target=self._safe_handler_exec, args=(key_str,), daemon=True).start()
-        except Exception as e:
-            print(f"[Key Error] {e}")
+                if key_str in self.pressed_keys:
+                    keys_dropped.inc(reason='held')
+                    return
+                self.pressed_keys.add(key_str)
+
+            if self.shutdown:  # Extra check
+                keys_dropped.inc(reason='shutdown')
+                return
+            if self.current_handler:
+                self._enqueue(key_str)
+            else:
+                keys_dropped.inc(reason='no_handler')  # e.g. between battle turns
+
+    def _enqueue(self, key_str):
+        """Queue a key for the dispatcher thread, merging or dropping keys if the handler falls behind."""
+        with self.queue_condition:
+            if len(self.queue) >= COALESCE_BACKLOG and key_str in NAVIGATION_KEYS and self.queue[-1] == key_str:
+                self.coalesced_keys += 1  # The same navigation key is already waiting, skip the repeat
+                keys_dropped.inc(reason='coalesced')
+                return
+            if len(self.queue) >= MAX_QUEUED_KEYS:
+                self.dropped_keys += 1
+                keys_dropped.inc(reason='queue_full')
+                return
+            self.queue.append(key_str)
+            self.queue_condition.notify()
+
+    def _dispatch(self):
+        """Run queued keys through the current handler one at a time, in the order they were pressed."""
+        while True:
+            with self.queue_condition:
+                while not self.queue:
+                    self.queue_condition.wait()
+                key_str = self.queue.popleft()
+            self._safe_handler_exec(key_str)
 
     def _safe_handler_exec(self, key_str):
         """Safely execute handler with shutdown check."""
@@ -73,6 +218,23 @@ class KeyboardManager:
             if not self.shutdown:  # Only allow if not shutting down
                 self.current_handler = handler
                 self.pressed_keys.clear()
+        with self.handler_condition:
+            self.handler_version += 1
+            self.handler_condition.notify_all()
+
+    def wait_for_handler(self, since_version, timeout=None):
+        """
+        Wait until a handler is set after the given handler version, e.g. until the next battle turn accepts keys.
+
+        Parameters:
+        since_version (int): The handler_version read before the action that changes the handler
+        timeout (float, optional): Seconds to wait at most
+
+        Returns:
+        bool: Whether a new handler was set in time
+        """
+        with self.handler_condition:
+            return self.handler_condition.wait_for(lambda: self.handler_version > since_version and self.current_handler is not None, timeout)
 
     def stop(self):
         """Force-stop the keyboard listener and all key processing."""
@@ -80,6 +242,8 @@ class KeyboardManager:
             self.shutdown = True  # Block all new key processing
             self.current_handler = None
             self.pressed_keys.clear()
+        with self.queue_condition:
+            self.queue.clear()  # Drop keys that weren't handled yet
         if self.listener:
             self.listener.stop()
             
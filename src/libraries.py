@@ -1,30 +1,47 @@
 import os
 import logging  # For debugging purposes
+import logging.handlers  # Queue-based logging, so log files are written on a background thread
+import queue
 import traceback  # For error handling and tracebacks
 import json
+import hashlib
 import shutil
+import tempfile
 import random
 import time
-import asyncio
 import threading
 import math
-import ctypes
 import platform
 import sys
-import subprocess
 
+# Optional and platform-specific modules are imported the first time they're used (see optional_import),
+# so starting the game doesn't pay for modules it might never need:
+# pynput - used to listen to key inputs
+#   GNU Lesser General Public License v3.0 - https://github.com/moses-palmer/pynput/blob/master/COPYING.LGPL
+#   Not available without a desktop session (e.g. over SSH), keys are read from the terminal instead
+# pygetwindow - used to check if window is active for keyboard input
+#   BSD 3-Clause "New" or "Revised" License - https://github.com/asweigart/PyGetWindow/blob/master/LICENSE.txt
+# rich - used to format text in terminal, imported by formatting.py
+#   MIT License - https://github.com/Textualize/rich/blob/master/LICENSE
+optional_modules = {}  # Imported module (or None if it can't be imported) by name
 
-# Third-party module used to listen to key inputs
-# GNU Lesser General Public License v3.0 - https://github.com/moses-palmer/pynput/blob/master/COPYING.LGPL
-import pynput
+def optional_import(name):
+    """
+    Imports a module the first time it's needed and remembers the result.
 
-# Third-party module used to check if window is active for keyboard input
-# BSD 3-Clause "New" or "Revised" License - https://github.com/asweigart/PyGetWindow/blob/master/LICENSE.txt
-import pygetwindow as gw
+    Args:
+        name (str): Full name of the module (e.g. 'pynput.keyboard').
 
-# Third-party module used to format text in terminal
-# MIT License - https://github.com/Textualize/rich/blob/master/LICENSE
-import rich
+    Returns:
+        module: The module, or None if it can't be imported here (e.g. pynput without a display).
+    """
+    if name not in optional_modules:
+        try:
+            __import__(name)
+            optional_modules[name] = sys.modules[name]
+        except Exception:
+            optional_modules[name] = None
+    return optional_modules[name]
 
 def set_window_title(title):
     """
@@ -34,15 +51,13 @@ def set_window_title(title):
         title (str): The title to set for the terminal window.
     """
     if platform.system() == "Windows":
+        import ctypes
         ctypes.windll.kernel32.SetConsoleTitleW(title)  # Set title for Windows OS
     elif platform.system() == "Darwin":  # macOS
         print(f"\033]0;{title}\a", end="")  # Set title for macOS
     elif platform.system() == "Linux":
         print(f"\033]0;{title}\a", end="")  # Set title for Linux OS
 
-# Set initial window title
-set_window_title("generic terminal rpg")
-
 # Define a class for game settings
 class GameSetting:
     """
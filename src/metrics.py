@@ -0,0 +1,249 @@
+from .utils import *
+from .scheduler import scheduler
+
+import atexit
+import bisect
+import contextlib
+
+METRICS_FILE_ENV = 'GTRPG_METRICS_FILE'  # Environment variable with the file to export metrics to (.prom or .json)
+DEFAULT_METRICS_FILE = os.path.join(LOGS_DIR, 'metrics.prom')
+EXPORT_INTERVAL = 15  # Seconds between metric exports
+
+# Default histogram buckets in seconds, from a fast redraw to a slow save
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+# ========================
+#         METRICS
+# ========================
+
+class Metric:
+    """
+    Base class of the metrics, a value per combination of labels (e.g. the redraws of each menu type).
+
+    Parameters:
+    name (str): Name of the metric in the export
+    description (str): Description of the metric in the export
+    """
+    type = None
+
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self.lock = threading.Lock()
+        self.values = {}  # Value by sorted tuple of (label, value) pairs
+
+    @staticmethod
+    def label_key(labels):
+        """Returns the key of a combination of labels in values."""
+        return tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+    def samples(self):
+        """Returns the (suffix, labels, value) samples of the metric for exporting."""
+        with self.lock:
+            return [('', labels, value) for labels, value in self.values.items()]
+
+class Counter(Metric):
+    """A value that only goes up, like the number of keys pressed."""
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        """Increases the counter by an amount for the given labels."""
+        key = self.label_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+class Gauge(Metric):
+    """A value that goes up and down, like the number of threads. The value can also be read from a function when exporting."""
+    type = 'gauge'
+
+    def __init__(self, name, description, function=None):
+        super().__init__(name, description)
+        self.function = function  # Returns the current value when exporting, if set
+
+    def set(self, value, **labels):
+        """Sets the gauge for the given labels."""
+        with self.lock:
+            self.values[self.label_key(labels)] = value
+
+    def samples(self):
+        if self.function:
+            return [('', (), self.function())]
+        return super().samples()
+
+class Histogram(Metric):
+    """
+    Counts observed values (like durations) into buckets, with their count and sum.
+
+    Parameters:
+    buckets (tuple): Upper bounds of the buckets, sorted
+    """
+    type = 'histogram'
+
+    def __init__(self, name, description, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, description)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        """Adds a value for the given labels."""
+        key = self.label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            counts, total, count = self.values.get(key) or ([0] * (len(self.buckets) + 1), 0, 0)
+            counts[index] += 1
+            self.values[key] = (counts, total + value, count + 1)
+
+    def total_count(self):
+        """Returns the number of observed values over every combination of labels."""
+        with self.lock:
+            return sum(count for _, _, count in self.values.values())
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        """Observes the seconds spent inside the with statement."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        samples = []
+        with self.lock:
+            values = list(self.values.items())
+        for labels, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                samples.append(('_bucket', labels + (('le', str(bound)),), cumulative))
+            samples.append(('_sum', labels, total))
+            samples.append(('_count', labels, count))
+        return samples
+
+# ========================
+#         REGISTRY
+# ========================
+
+class MetricsRegistry:
+    """Holds the game's metrics and writes them to a Prometheus text file or a JSON file."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}           # Metric by name
+        self.export_handle = None   # Scheduler timer of the periodic export
+        self.export_path = None     # File the metrics are exported to
+
+    def _get(self, metric_class, name, description, **kwargs):
+        """Returns the metric with the name, creating it if it doesn't exist."""
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = metric_class(name, description, **kwargs)
+            elif not isinstance(metric, metric_class):
+                raise Exception(f"Metric {name} is already registered as a {metric.type}")
+            return metric
+
+    def counter(self, name, description):
+        """Returns the counter with the name, creating it if it doesn't exist."""
+        return self._get(Counter, name, description)
+
+    def gauge(self, name, description, function=None):
+        """Returns the gauge with the name, creating it if it doesn't exist."""
+        return self._get(Gauge, name, description, function=function)
+
+    def histogram(self, name, description, buckets=DEFAULT_BUCKETS):
+        """Returns the histogram with the name, creating it if it doesn't exist."""
+        return self._get(Histogram, name, description, buckets=buckets)
+
+    def to_prometheus(self):
+        """Returns every metric in the Prometheus text format."""
+        with self.lock:
+            metrics = sorted(self.metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.description}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            for suffix, labels, value in metric.samples():
+                label_text = ','.join(f'{label}="{value}"' for label, value in labels)
+                lines.append(f"{metric.name}{suffix}{'{' + label_text + '}' if label_text else ''} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def to_json(self):
+        """Returns every metric as a JSON-serializable dictionary."""
+        with self.lock:
+            metrics = sorted(self.metrics.values(), key=lambda metric: metric.name)
+        return {
+            'timestamp': time.time(),
+            'metrics': {
+                metric.name: {
+                    'type': metric.type,
+                    'description': metric.description,
+                    'samples': [{'name': metric.name + suffix, 'labels': dict(labels), 'value': value} for suffix, labels, value in metric.samples()]
+                } for metric in metrics
+            }
+        }
+
+    def write(self, file_path):
+        """
+        Writes the metrics to a file, replacing it at once so readers never see a partial file.
+
+        Parameters:
+        file_path (str): Path of the file, JSON if it ends with .json, otherwise the Prometheus text format
+        """
+        if file_path.endswith('.json'):
+            write_json_atomic(file_path, self.to_json(), indent=None)
+            return
+        file_descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(file_path) or '.', suffix='.tmp')
+        try:
+            with os.fdopen(file_descriptor, 'w', encoding='utf-8') as file:
+                file.write(self.to_prometheus())
+            os.replace(temp_path, file_path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+    def _export(self):
+        """Writes the metrics to the export file on the scheduler thread."""
+        try:
+            self.write(self.export_path)
+        except Exception as e:
+            debug.error('Error exporting metrics to %s: %s', self.export_path, e)
+
+    def start_export(self, file_path=None, interval=EXPORT_INTERVAL):
+        """
+        Writes the metrics to a file every interval until the game exits.
+
+        Parameters:
+        file_path (str): File to write to, defaults to GTRPG_METRICS_FILE or src/logs/metrics.prom
+        interval (float): Seconds between writes
+        """
+        self.stop_export()
+        self.export_path = file_path or os.environ.get(METRICS_FILE_ENV) or DEFAULT_METRICS_FILE
+        self.export_handle = scheduler.call_every(interval, self._export)
+        atexit.register(self._export)  # Write the final values when exiting
+        debug.info('Exporting metrics to %s every %s seconds', self.export_path, interval)
+
+    def stop_export(self):
+        """Stops the periodic export."""
+        if self.export_handle:
+            self.export_handle.cancel()
+            self.export_handle = None
+            atexit.unregister(self._export)
+
+# Global instance
+metrics = MetricsRegistry()
+
+# ========================
+#       GAME METRICS
+# ========================
+
+keys_received = metrics.counter('gtrpg_keys_received_total', 'Key presses received from the input backend')
+keys_dropped = metrics.counter('gtrpg_keys_dropped_total', 'Key presses that never reached a handler by reason (no_handler, debounced, unfocused, held, shutdown, coalesced, queue_full)')
+redraw_seconds = metrics.histogram('gtrpg_redraw_seconds', 'Duration of menu redraws by menu type')
+saves = metrics.counter('gtrpg_saves_total', 'Player saves requested')
+save_write_seconds = metrics.histogram('gtrpg_save_write_seconds', 'Duration of writing the player data to disk')
+battles_started = metrics.counter('gtrpg_battles_started_total', 'Battles started')
+battles_finished = metrics.counter('gtrpg_battles_finished_total', 'Battles finished by result (victory, defeat or fled)')
+battle_turns = metrics.histogram('gtrpg_battle_turns', 'Turns per finished battle', buckets=(1, 2, 3, 5, 8, 13, 21, 34, 55))
+threads = metrics.gauge('gtrpg_threads', 'Live threads', function=threading.active_count)
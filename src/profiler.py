@@ -0,0 +1,152 @@
+from .utils import *
+
+import atexit
+import contextlib
+import cProfile
+import functools
+import io
+
+# Directory where the profiles of each run are written
+PROFILES_DIR = os.path.join(LOGS_DIR, 'profiles')
+SUMMARY_FUNCTIONS = 15  # Number of functions listed per section in the summary
+
+class ProfileSection:
+    """Wall time and cProfile data collected for one named section of the game."""
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0                      # Number of times the section ran
+        self.wall_time = 0.0                # Total seconds spent in the section
+        self.max_wall_time = 0.0            # Longest single run in seconds
+        self.profile = cProfile.Profile()   # Function timings, only collected while no other section is profiled
+        self.profiled_calls = 0             # Number of runs with function timings
+
+class Profiler:
+    """
+    Profiles sections of the game (menus, redraws, battle turns and loading) with cProfile when enabled.
+    Only one cProfile profile can be active at a time, so sections that start while another one is
+    profiled (nested sections or sections on other threads) only record their wall time.
+    The profiles are written as .pstats files with a sorted summary when the game exits.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.sections = {}      # ProfileSection by name
+        self.active = None      # Section currently collecting function timings
+        self.directory = None   # Directory the profiles of this run are written to
+
+    def enable(self, directory=PROFILES_DIR):
+        """
+        Starts profiling sections, the results are written when the game exits.
+
+        Parameters:
+        directory (str): Directory to create the run's profile directory in
+        """
+        if self.enabled:
+            return
+        self.directory = os.path.join(directory, time.strftime('%Y%m%d-%H%M%S'))
+        self.enabled = True
+        atexit.register(self.dump)
+        debug.info('Profiling enabled, profiles are written to %s', self.directory)
+
+    @contextlib.contextmanager
+    def section(self, name):
+        """
+        Profiles the code inside the with statement as the named section. Does nothing if profiling is disabled.
+
+        Parameters:
+        name (str): Name of the section, runs with the same name are added together
+        """
+        if not self.enabled:
+            yield
+            return
+
+        with self.lock:
+            section = self.sections.get(name)
+            if section is None:
+                section = self.sections[name] = ProfileSection(name)
+            profiled = self.active is None
+            if profiled:
+                self.active = section
+
+        if profiled:
+            section.profile.enable()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if profiled:
+                section.profile.disable()
+            with self.lock:
+                section.calls += 1
+                section.wall_time += elapsed
+                section.max_wall_time = max(section.max_wall_time, elapsed)
+                if profiled:
+                    section.profiled_calls += 1
+                    self.active = None
+
+    def profile(self, name=None):
+        """
+        Decorator that profiles every call of a function as a section.
+
+        Parameters:
+        name (str): Name of the section, defaults to the module and name of the function (e.g. 'game.shop_menu.update_menu_info')
+        """
+        def decorator(function):
+            section_name = name or f"{function.__module__.rsplit('.', 1)[-1]}.{function.__qualname__.replace('.<locals>', '')}"
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with self.section(section_name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def summary(self):
+        """
+        Returns the profiling summary: the sections sorted by total wall time, each with its slowest functions.
+
+        Returns:
+        str: The summary text
+        """
+        import pstats  # Only needed when writing the profiles, not while starting the game
+        with self.lock:
+            sections = sorted(self.sections.values(), key=lambda section: section.wall_time, reverse=True)
+
+        lines = [f"{'Section':<45} {'Calls':>7} {'Total (s)':>10} {'Mean (ms)':>10} {'Max (ms)':>10}"]
+        for section in sections:
+            mean = section.wall_time / section.calls * 1000 if section.calls else 0
+            lines.append(f'{section.name:<45} {section.calls:>7} {section.wall_time:>10.3f} {mean:>10.2f} {section.max_wall_time * 1000:>10.2f}')
+
+        for section in sections:
+            if not section.profiled_calls:
+                continue
+            stream = io.StringIO()
+            stats = pstats.Stats(section.profile, stream=stream)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(SUMMARY_FUNCTIONS)
+            lines.append('')
+            lines.append(f'=== {section.name} ({section.profiled_calls} of {section.calls} calls profiled) ===')
+            lines.append(stream.getvalue().strip())
+        return '\n'.join(lines)
+
+    def dump(self):
+        """Writes a .pstats file per section and the summary to the run's profile directory."""
+        if not self.enabled or not self.sections:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with self.lock:
+                sections = list(self.sections.values())
+            for section in sections:
+                if section.profiled_calls:
+                    section.profile.dump_stats(os.path.join(self.directory, f'{section.name}.pstats'))
+            with open(os.path.join(self.directory, 'summary.txt'), 'w', encoding='utf-8') as file:
+                file.write(self.summary() + '\n')
+            print(f'Profiles written to {self.directory}')
+        except Exception as e:
+            debug.error('Error writing profiles: %s', e)
+
+# Global instance
+profiler = Profiler()
@@ -0,0 +1,263 @@
+from .utils import *
+from .save_manager import SAVE_DELAY
+from .metrics import save_write_seconds
+
+import atexit
+import copy
+
+# Database holding the player profiles
+PROFILES_DB = os.path.join(DATA_DIR, 'profiles.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    id TEXT PRIMARY KEY,
+    health INTEGER NOT NULL,
+    money INTEGER NOT NULL,
+    level INTEGER NOT NULL,
+    xp INTEGER NOT NULL,
+    xp_goal INTEGER NOT NULL,
+    equipped TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS inventory (
+    profile_id TEXT NOT NULL REFERENCES profiles(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    weapon_id TEXT NOT NULL,
+    PRIMARY KEY (profile_id, position)
+);
+CREATE TABLE IF NOT EXISTS settings (
+    profile_id TEXT NOT NULL REFERENCES profiles(id) ON DELETE CASCADE,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (profile_id, key)
+);
+CREATE INDEX IF NOT EXISTS inventory_weapon ON inventory (weapon_id);
+CREATE INDEX IF NOT EXISTS profiles_level ON profiles (level);
+"""
+
+class ProfileStore:
+    """
+    Stores the save data of many players in one SQLite database, one profile per player.
+    Profiles use the same data format as save_file.json, so Player.load and Player.save work with both.
+    The game saves profiles with save_later: like the SaveManager does for the save file, one background thread
+    waits for the save delay and writes every changed profile in a single transaction.
+
+    Parameters:
+    path (str): Path of the database file
+    """
+    def __init__(self, path=PROFILES_DB):
+        self.path = path
+        self.lock = threading.Lock()  # The connection is shared between the game's threads
+        # Background writer of save_later
+        self.pending_condition = threading.Condition()
+        self.pending = {}           # Latest save data waiting to be written, by profile ID
+        self.dirty_since = None     # time.monotonic() of the first change that wasn't written yet
+        self.debugging = False      # Whether to log the next write
+        self.writing = False        # Whether a write is in progress
+        self.writer = None          # Thread writing the pending profiles
+        import sqlite3  # Only imported when profiles are used, players of the save file don't pay for it at startup
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')     # Readers don't block the writer
+        self.connection.execute('PRAGMA synchronous=NORMAL')   # Safe with WAL, avoids an fsync per transaction
+        self.connection.execute('PRAGMA foreign_keys=ON')
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        """Writes the pending saves and closes the database."""
+        self.flush()
+        with self.lock:
+            self.connection.close()
+
+    def list_profiles(self):
+        """Returns the IDs of every profile, sorted."""
+        with self.lock:
+            return [row[0] for row in self.connection.execute('SELECT id FROM profiles ORDER BY id')]
+
+    def load(self, profile_id):
+        """
+        Loads the save data of a profile.
+
+        Parameters:
+        profile_id (str): ID of the profile
+
+        Returns:
+        dict: The save data, or None if the profile doesn't exist
+        """
+        return self.load_many([profile_id]).get(profile_id)
+
+    def load_many(self, profile_ids=None):
+        """
+        Loads the save data of many profiles with one query per table.
+
+        Parameters:
+        profile_ids (list, optional): IDs of the profiles, every profile if not set
+
+        Returns:
+        dict: Save data by profile ID, profiles that don't exist are left out
+        """
+        if profile_ids is not None and not profile_ids:
+            return {}
+        self.flush()  # Load the latest data, not what was on disk before the pending saves
+
+        if profile_ids is None:
+            condition, parameters = '', []
+        else:
+            condition, parameters = f"WHERE {{}} IN ({','.join('?' * len(profile_ids))})", list(profile_ids)
+
+        with self.lock:
+            profiles = {}
+            query = 'SELECT id, health, money, level, xp, xp_goal, equipped FROM profiles ' + condition.format('id')
+            for id, health, money, level, xp, xp_goal, equipped in self.connection.execute(query, parameters):
+                profiles[id] = {
+                    'health': health,
+                    'money': money,
+                    'level': level,
+                    'xp': {'current': xp, 'max': xp_goal},
+                    'inventory': [],
+                    'equipped': equipped,
+                    'settings': {}
+                }
+
+            query = 'SELECT profile_id, weapon_id FROM inventory ' + condition.format('profile_id') + ' ORDER BY profile_id, position'
+            for profile_id, weapon_id in self.connection.execute(query, parameters):
+                profiles[profile_id]['inventory'].append(weapon_id)
+
+            query = 'SELECT profile_id, key, value FROM settings ' + condition.format('profile_id')
+            for profile_id, key, value in self.connection.execute(query, parameters):
+                profiles[profile_id]['settings'][key] = json.loads(value)
+
+        return profiles
+
+    def save(self, profile_id, data):
+        """
+        Saves the save data of a profile, creating it if it doesn't exist.
+
+        Parameters:
+        profile_id (str): ID of the profile
+        data (dict): Save data in the save_file.json format
+        """
+        self.save_many({profile_id: data})
+
+    def save_many(self, profiles):
+        """
+        Saves the save data of many profiles in a single transaction.
+
+        Parameters:
+        profiles (dict): Save data by profile ID
+        """
+        now = time.time()
+        profile_rows = []
+        inventory_rows = []
+        settings_rows = []
+        for profile_id, data in profiles.items():
+            xp = data.get('xp', {})
+            profile_rows.append((profile_id, data['health'], data['money'], data['level'], xp.get('current', 0), xp.get('max', 100), data['equipped'], now))
+            inventory_rows += [(profile_id, position, weapon_id) for position, weapon_id in enumerate(data.get('inventory', []))]
+            settings_rows += [(profile_id, key, json.dumps(value)) for key, value in data.get('settings', {}).items()]
+        profile_ids = [(profile_id,) for profile_id in profiles]
+
+        with self.lock, self.connection:  # The connection commits the transaction, or rolls it back on errors
+            self.connection.executemany(
+                'INSERT INTO profiles (id, health, money, level, xp, xp_goal, equipped, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT(id) DO UPDATE SET health=excluded.health, money=excluded.money, level=excluded.level, xp=excluded.xp, '
+                'xp_goal=excluded.xp_goal, equipped=excluded.equipped, updated_at=excluded.updated_at',
+                profile_rows
+            )
+            # Inventories and settings are replaced as a whole
+            self.connection.executemany('DELETE FROM inventory WHERE profile_id = ?', profile_ids)
+            self.connection.executemany('DELETE FROM settings WHERE profile_id = ?', profile_ids)
+            self.connection.executemany('INSERT INTO inventory (profile_id, position, weapon_id) VALUES (?, ?, ?)', inventory_rows)
+            self.connection.executemany('INSERT INTO settings (profile_id, key, value) VALUES (?, ?, ?)', settings_rows)
+
+    def save_later(self, profile_id, data, debugging=True):
+        """
+        Marks the save data of a profile as changed, it is written on the background thread after the save delay.
+        Changes made within the save delay are written together, only the latest data of each profile.
+
+        Parameters:
+        profile_id (str): ID of the profile
+        data (dict): Save data in the save_file.json format, copied so later changes don't affect it
+        debugging (bool): Whether to log the data once it is written
+        """
+        with self.pending_condition:
+            self.pending[profile_id] = copy.deepcopy(data)
+            self.debugging = self.debugging or debugging
+            if self.dirty_since is None:
+                self.dirty_since = time.monotonic()
+            if not self.writer or not self.writer.is_alive():
+                self.writer = threading.Thread(target=self._run_writer, daemon=True)
+                self.writer.start()
+                atexit.register(self.flush)
+            self.pending_condition.notify_all()
+
+    def _take_pending(self):
+        """Takes the pending profiles to write them (the pending condition must be held)."""
+        profiles, debugging = self.pending, self.debugging
+        self.pending = {}
+        self.dirty_since = None
+        self.debugging = False
+        self.writing = True
+        return profiles, debugging
+
+    def _run_writer(self):
+        """Waits for changed profiles, lets changes coalesce for the save delay, then writes them."""
+        while True:
+            with self.pending_condition:
+                # Wait for changes and for any flush in progress
+                while not self.pending or self.writing:
+                    self.pending_condition.wait()
+                # Wait for the save delay after the first change, newer changes replace the pending data
+                while self.pending and not self.writing:
+                    remaining = self.dirty_since + SAVE_DELAY - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.pending_condition.wait(remaining)
+                if not self.pending or self.writing:
+                    continue  # Flushed in the meantime
+                profiles, debugging = self._take_pending()
+            self._write_pending(profiles, debugging)
+
+    def _write_pending(self, profiles, debugging):
+        """Writes the pending profiles in one transaction and marks the write as finished."""
+        start = time.perf_counter()
+        try:
+            self.save_many(profiles)
+            save_write_seconds.observe(time.perf_counter() - start, store='profiles')
+            if debugging:
+                debug.debug('Successfully saved %d profiles:\n%s', len(profiles), profiles)
+        except Exception as e:
+            debug.error('Error saving profiles %s: %s', ', '.join(profiles), e)
+        finally:
+            with self.pending_condition:
+                self.writing = False
+                self.pending_condition.notify_all()
+
+    def flush(self):
+        """Writes the pending profiles now and waits for the write to finish. Called when exiting and after crashes."""
+        with self.pending_condition:
+            while self.writing:
+                self.pending_condition.wait()
+            if not self.pending:
+                return
+            profiles, debugging = self._take_pending()
+        self._write_pending(profiles, debugging)
+
+    def delete(self, profile_id):
+        """Deletes a profile with its inventory and settings."""
+        self.flush()  # A pending save would create the profile again
+        with self.lock, self.connection:
+            self.connection.execute('DELETE FROM profiles WHERE id = ?', (profile_id,))
+
+profile_store = None
+
+def get_profile_store():
+    """Returns the shared profile store, opening the database on first use."""
+    global profile_store
+    if profile_store is None:
+        profile_store = ProfileStore()
+    return profile_store
+
+def flush_profile_saves():
+    """Writes the pending saves of every profile, if the profile store was opened."""
+    if profile_store is not None:
+        profile_store.flush()
@@ -0,0 +1,280 @@
+from .utils import *
+from .metrics import save_write_seconds
+
+import atexit
+import copy
+
+SAVE_DELAY = 0.25  # Seconds to wait for more changes before writing, so a burst of changes is written once
+JOURNAL_COMPACT_SIZE = 64 * 1024  # Bytes of journal after which it is folded into the save file
+
+# ========================
+#      SAVE JOURNAL
+# ========================
+
+def diff_save_data(old, new):
+    """
+    Describes the changes between two versions of the player's save data as journal records.
+
+    Parameters:
+    old (dict): Previously saved data
+    new (dict): New data
+
+    Returns:
+    list: Records (without sequence numbers) that turn the old data into the new data when applied in order
+    """
+    records = []
+    for key, value in new.items():
+        old_value = old.get(key)
+        if value == old_value:
+            continue
+        if key == 'money' and isinstance(old_value, int) and isinstance(value, int):
+            records.append({'op': 'money', 'delta': value - old_value})
+        elif key == 'xp' and isinstance(old_value, dict):
+            if value.get('current') != old_value.get('current'):
+                records.append({'op': 'xp', 'delta': value.get('current', 0) - old_value.get('current', 0)})
+            if value.get('max') != old_value.get('max'):
+                records.append({'op': 'set', 'path': ['xp', 'max'], 'value': value.get('max')})
+        elif key == 'inventory' and isinstance(old_value, list):
+            if value[:len(old_value)] == old_value:  # Weapons were added
+                records += [{'op': 'add', 'value': weapon_id} for weapon_id in value[len(old_value):]]
+            elif [weapon_id for weapon_id in old_value if weapon_id in value] == value:  # Weapons were removed
+                records += [{'op': 'remove', 'value': weapon_id} for weapon_id in old_value if weapon_id not in value]
+            else:  # Reordered
+                records.append({'op': 'set', 'path': ['inventory'], 'value': value})
+        elif key == 'settings' and isinstance(old_value, dict):
+            records += [{'op': 'setting', 'key': id, 'value': setting} for id, setting in value.items() if old_value.get(id) != setting]
+        else:
+            records.append({'op': 'set', 'path': [key], 'value': value})
+    return records
+
+def apply_record(data, record):
+    """Applies a journal record (see diff_save_data) to the save data in place."""
+    op = record['op']
+    if op == 'money':
+        data['money'] = data.get('money', 0) + record['delta']
+    elif op == 'xp':
+        xp = data.setdefault('xp', {})
+        xp['current'] = xp.get('current', 0) + record['delta']
+    elif op == 'add':
+        data.setdefault('inventory', []).append(record['value'])
+    elif op == 'remove':
+        if record['value'] in data.get('inventory', []):
+            data['inventory'].remove(record['value'])
+    elif op == 'setting':
+        data.setdefault('settings', {})[record['key']] = record['value']
+    elif op == 'set':
+        target = data
+        for key in record['path'][:-1]:
+            target = target.setdefault(key, {})
+        target[record['path'][-1]] = record['value']
+
+class SaveJournal:
+    """
+    Saves changes as small records appended to a journal file next to the save file, instead of rewriting the save file.
+    Each record has a sequence number, and the save file remembers the last record folded into it,
+    so replaying the journal after a crash during compaction never applies a record twice.
+
+    Parameters:
+    file_path (str): Path of the save file, the journal is the same path with a .journal extension
+    compact_size (int): Bytes of journal after which it is folded into the save file
+    """
+    def __init__(self, file_path, compact_size=JOURNAL_COMPACT_SIZE):
+        self.file_path = file_path
+        self.journal_path = os.path.splitext(file_path)[0] + '.journal'
+        self.compact_size = compact_size
+        self.state = None       # Data as it is on disk (save file + journal), None until loaded or compacted
+        self.sequence = 0       # Sequence number of the last record
+
+    def replay(self, data):
+        """
+        Applies the journal to the data loaded from the save file.
+
+        Parameters:
+        data (dict): Data of the save file
+
+        Returns:
+        dict: The data with every journal record newer than the save file applied
+        """
+        self.sequence = data.pop('journal', 0)
+        unfinished = False
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'r', encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        debug.warning('Ignoring an unfinished record in %s', os.path.basename(self.journal_path))
+                        unfinished = True
+                        break  # Only the last record can be unfinished, if the game stopped while writing it
+                    if record['n'] > self.sequence:
+                        apply_record(data, record)
+                        self.sequence = record['n']
+        if unfinished:
+            self.compact(data)  # Start a clean journal so new records aren't appended to the unfinished one
+        else:
+            self.state = copy.deepcopy(data)
+        return data
+
+    def write(self, data):
+        """Appends the changes since the last write to the journal, and compacts it if it grew too big."""
+        if self.state is None:
+            self.compact(data)
+            return
+
+        records = diff_save_data(self.state, data)
+        if records:
+            lines = []
+            for record in records:
+                self.sequence += 1
+                lines.append(json.dumps({'n': self.sequence, **record}, separators=(',', ':')) + '\n')
+            with open(self.journal_path, 'a', encoding='utf-8') as file:
+                file.write(''.join(lines))
+                file.flush()
+                os.fsync(file.fileno())
+            self.state = copy.deepcopy(data)
+
+        if os.path.exists(self.journal_path) and os.path.getsize(self.journal_path) > self.compact_size:
+            self.compact(data)
+
+    def compact(self, data):
+        """Writes the full data to the save file and empties the journal."""
+        write_json_atomic(self.file_path, {**data, 'journal': self.sequence})
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self.state = copy.deepcopy(data)
+
+    def close(self, data):
+        """Folds the journal into a plain save file, used when journaled saves are turned off."""
+        write_json_atomic(self.file_path, data)
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self.state = None
+        self.sequence = 0
+
+# ========================
+#      SAVE MANAGER
+# ========================
+
+class SaveManager:
+    """
+    Writes a save file behind the game on a background thread.
+    Saving only marks the data as dirty; changes made within the save delay are written together,
+    and every write goes to a temporary file that replaces the save file once it is fully on disk.
+    With journaled saves, only the changes are appended to a journal instead (see SaveJournal).
+
+    Parameters:
+    directory (str): The directory of the save file
+    name (str): The name of the save file, without extension
+    delay (float): Seconds to wait for more changes before writing
+    """
+    def __init__(self, directory, name, delay=SAVE_DELAY):
+        self.file_path = os.path.join(directory, f'{name}.json')
+        self.delay = delay
+        self.condition = threading.Condition()
+        self.pending = None         # Latest data waiting to be written
+        self.dirty_since = None     # time.monotonic() of the first change that wasn't written yet
+        self.debugging = False      # Whether to log the next write
+        self.writing = False        # Whether a write is in progress
+        self.thread = None
+        self.saves_requested = 0    # Number of times the data was marked dirty
+        self.saves_written = 0      # Number of writes to disk
+        self.journaled = False      # Whether changes are appended to the journal instead of rewriting the save file
+        self.journal = SaveJournal(self.file_path)
+
+    def load(self, backup=True):
+        """
+        Loads the save file and replays the journal if there is one.
+
+        Parameters:
+        backup (bool): Whether to create a backup of the save file
+
+        Returns:
+        dict: The saved data, or None if it couldn't be loaded
+        """
+        data = load_file_from_directory(os.path.dirname(self.file_path), os.path.basename(self.file_path), backup=backup)
+        if data:
+            try:
+                data = self.journal.replay(data)
+            except Exception as e:
+                debug.error('Error replaying %s: %s', os.path.basename(self.journal.journal_path), e)
+        return data
+
+    def save(self, data, debugging=True, journaled=False):
+        """
+        Marks the data as dirty, it is written on the background thread after the save delay.
+
+        Parameters:
+        data (dict): The data to save, copied so later changes don't affect it
+        debugging (bool): Whether to log the data once it is written
+        journaled (bool): Whether to append the changes to the journal instead of rewriting the save file
+        """
+        with self.condition:
+            self.journaled = journaled
+            self.pending = copy.deepcopy(data)
+            self.debugging = self.debugging or debugging
+            self.saves_requested += 1
+            if self.dirty_since is None:
+                self.dirty_since = time.monotonic()
+            if not self.thread or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+                atexit.register(self.flush)
+            self.condition.notify_all()
+
+    def _take_pending(self):
+        """Takes the pending data to write it (the condition must be held)."""
+        data, debugging = self.pending, self.debugging
+        self.pending = None
+        self.dirty_since = None
+        self.debugging = False
+        self.writing = True
+        return data, debugging
+
+    def _run(self):
+        """Waits for dirty data, lets changes coalesce for the save delay, then writes them."""
+        while True:
+            with self.condition:
+                # Wait for changes and for any flush in progress
+                while self.pending is None or self.writing:
+                    self.condition.wait()
+                # Wait for the save delay after the first change, newer changes replace the pending data
+                while self.pending is not None and not self.writing:
+                    remaining = self.dirty_since + self.delay - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                if self.pending is None or self.writing:
+                    continue  # Flushed in the meantime
+                data, debugging = self._take_pending()
+            self._write(data, debugging)
+
+    def _write(self, data, debugging):
+        """Writes the data to the save file and marks the write as finished."""
+        start = time.perf_counter()
+        try:
+            if self.journaled:
+                self.journal.write(data)
+            elif self.journal.state is not None or os.path.exists(self.journal.journal_path):
+                self.journal.close(data)  # Journaled saves were turned off
+            else:
+                write_json_atomic(self.file_path, data)
+            self.saves_written += 1
+            save_write_seconds.observe(time.perf_counter() - start, store='journal' if self.journaled else 'file')
+            if debugging:
+                debug.debug('Successfully saved %s:\n%s', os.path.basename(self.file_path), data)
+        except Exception as e:
+            debug.error('Error saving %s: %s', os.path.basename(self.file_path), e)
+        finally:
+            with self.condition:
+                self.writing = False
+                self.condition.notify_all()
+
+    def flush(self):
+        """Writes pending changes now and waits for the write to finish. Called when exiting and after crashes."""
+        with self.condition:
+            while self.writing:
+                self.condition.wait()
+            if self.pending is None:
+                return
+            data, debugging = self._take_pending()
+        self._write(data, debugging)
@@ -0,0 +1,101 @@
+from .libraries import *
+from .utils import *
+
+import heapq
+import itertools
+
+class TimerHandle:
+    """A scheduled callback, returned by Scheduler.call_later and Scheduler.call_every so it can be cancelled."""
+    def __init__(self, callback, args, interval=None):
+        self.callback = callback      # Function to call when the timer is due
+        self.args = args              # Arguments for the callback
+        self.interval = interval      # Seconds between repeats (None if the timer only runs once)
+        self.cancelled = False        # Whether the timer was cancelled
+
+    def cancel(self):
+        """Stops the timer from running (again). Cancelled timers are dropped when they are due."""
+        self.cancelled = True
+
+class Scheduler:
+    """
+    Runs callbacks at deadlines on a single background thread.
+    The thread sleeps on a condition variable until the earliest deadline or until a new timer is added,
+    so waiting timers use no CPU and no thread is created per timer.
+    """
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.timers = []                    # Heap of (deadline, sequence, handle)
+        self.sequence = itertools.count()   # Keeps timers with the same deadline in the order they were added
+        self.thread = None
+
+    def call_later(self, delay, callback, *args):
+        """
+        Calls a function once after a delay.
+
+        Parameters:
+        delay (float): Real seconds to wait
+        callback (function): Function to call on the scheduler thread
+        *args: Arguments for the callback
+
+        Returns:
+        TimerHandle: Handle to cancel the timer
+        """
+        handle = TimerHandle(callback, args)
+        self._schedule(time.monotonic() + max(delay, 0), handle)
+        return handle
+
+    def call_every(self, interval, callback, *args):
+        """
+        Calls a function every interval, starting one interval from now, until it is cancelled or the callback returns False.
+
+        Parameters:
+        interval (float): Real seconds between calls
+        callback (function): Function to call on the scheduler thread
+        *args: Arguments for the callback
+
+        Returns:
+        TimerHandle: Handle to cancel the timer
+        """
+        handle = TimerHandle(callback, args, max(interval, 0))
+        self._schedule(time.monotonic() + handle.interval, handle)
+        return handle
+
+    def _schedule(self, deadline, handle):
+        """Adds a timer to the heap and wakes the scheduler thread up so it can wait for the new earliest deadline."""
+        with self.condition:
+            heapq.heappush(self.timers, (deadline, next(self.sequence), handle))
+            if not self.thread or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+            self.condition.notify()
+
+    def _run(self):
+        """Waits for the earliest deadline and runs its callback, forever."""
+        while True:
+            with self.condition:
+                while True:
+                    # Drop cancelled timers so they don't wake the thread up
+                    while self.timers and self.timers[0][2].cancelled:
+                        heapq.heappop(self.timers)
+                    if not self.timers:
+                        self.condition.wait()
+                        continue
+                    timeout = self.timers[0][0] - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    self.condition.wait(timeout)
+                deadline, _, handle = heapq.heappop(self.timers)
+
+            # Run the callback outside of the lock so it can schedule more timers
+            try:
+                repeat = handle.callback(*handle.args)
+            except Exception as e:
+                debug.error("Error in scheduled callback %s: %s", getattr(handle.callback, '__name__', handle.callback), e)
+                repeat = False
+
+            # Repeat from the previous deadline so a repeating timer doesn't drift
+            if handle.interval is not None and repeat is not False and not handle.cancelled:
+                self._schedule(deadline + handle.interval, handle)
+
+# Global instance
+scheduler = Scheduler()
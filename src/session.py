@@ -0,0 +1,60 @@
+from .utils import *
+from .globals import Player
+from .keyboard_manager import keyboard_manager
+
+# ========================
+#       MENU STATE
+# ========================
+
+class MenuState:
+    """Manages the state of the current menu, including options, pagination, sorting, and UI elements."""
+    def __init__(self):
+        # Core menu state
+        self.current_menu = None               # Tracks the current active menu
+        self.should_exit = False               # Determines whether the menu should exit
+
+        # Menu option state
+        self.selected = 0                      # Index of the currently selected option
+        self.main_menu_selected = 0            # Last selected for the main menu
+        self.shop_selected = 0                 # Last selected for the shop
+        self.options = []                      # List of menu options
+        self.title = None                      # Title displayed at the top of the menu
+        self.info = None                       # Additional information displayed in the menu
+        self.tooltip_before = None             # Tooltip displayed before the main tooltip (used for timers)
+        self.tooltip = None                    # Main tooltip for the current menu
+        self.menu_type = 'basic'               # Type of menu: 'basic', 'horizontal', or 'paged'
+
+        # Pagination state
+        self.page_size = 5                     # Number of options per page for paged menus
+        self.current_page = 1                  # Current page number (1-based index)
+        self.total_pages = 1                   # Total number of pages
+        self.start_index = 0                   # Index of the first option on the current page
+
+        # Sorting state
+        self.sort_type = None                  # Type of sorting applied (e.g., alphabetical, value-based)
+        self.sort_order = None                 # Order of sorting (e.g., ascending or descending)
+
+# ========================
+#         SESSION
+# ========================
+
+class GameSession:
+    """
+    Everything that belongs to one player's game: the player data, the menu on screen, the current battle
+    and where the player's keys come from. Menu and fight functions take the session as their first parameter,
+    so one process can run several sessions at once.
+    The content (enemies, weapons, attacks and their indexes in globals.py) isn't part of a session: it is only read
+    while playing, so every session shares the same parsed copy.
+
+    Parameters:
+    player (Player, optional): The player, a new default player if not set
+    input (KeyboardManager, optional): Where the menus set their key handlers, defaults to the game's keyboard manager
+    battle_seed (int, optional): Seed for the rolls of the session's battles (e.g. for reproducible battles), None for random rolls
+    """
+    def __init__(self, player=None, input=None, battle_seed=None):
+        self.player = player or Player()
+        self.input = input or keyboard_manager
+        self.menu_state = MenuState()       # State of the menu shown by game.py
+        self.battle = None                  # State of the current or last battle (fight.BattleState)
+        self.in_combat = False              # Whether the player is in a battle
+        self.battle_seed = battle_seed
@@ -0,0 +1,240 @@
+from .utils import *
+from .combat import resolve_abilities, expected_damage
+from . import globals
+
+# Third-party module used to run many battles at once as arrays (only needed for balance tools)
+# BSD 3-Clause "New" or "Revised" License - https://github.com/numpy/numpy/blob/main/LICENSE.txt
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Streak state of the previous attack, stored as integers in the arrays
+NO_ATTACK, MISS, NORMAL, CRIT = 0, 1, 2, 3
+
+# Percentiles reported for the remaining health
+HEALTH_PERCENTILES = [5, 25, 50, 75, 95]
+
+def require_numpy():
+    """Raises an error explaining how to install NumPy if it is missing."""
+    if np is None:
+        raise ImportError("The battle simulator requires NumPy, install it with: pip install numpy")
+
+def roll_chances(rng, chances):
+    """
+    Vectorized version of utils.roll_chance, rolls a random number between 0 and 100 for every chance.
+
+    Parameters:
+    rng (numpy.random.Generator): Random number generator
+    chances (numpy.ndarray): Chances as integer percentages
+
+    Returns:
+    numpy.ndarray: True where the roll succeeded
+    """
+    return np.floor(rng.random(len(chances)) * 101) <= chances
+
+def resolve_attacks(rng, attacks, chosen, mask, streak, player=True):
+    """
+    Vectorized version of CombatEngine.determine_attack for one side of many battles.
+    Updates the streak state arrays in place where mask is True.
+
+    Parameters:
+    rng (numpy.random.Generator): Random number generator
+    attacks (dict): Arrays of attack stats (see attack_arrays)
+    chosen (numpy.ndarray): Index of the attack used in each battle
+    mask (numpy.ndarray): True for the battles where the attack happens
+    streak (list): Arrays of the attacker's previous attack ID, type, hit chance and crit chance, where 0 stands for None
+    player (bool): Whether the attacks are from the player (True) or the enemy (False)
+
+    Returns:
+    numpy.ndarray: Damage dealt in each battle (0 for misses and where mask is False)
+    """
+    previous_id, previous_type, previous_hit, previous_crit = streak
+    min_damage = attacks['minDamage'][chosen]
+    max_damage = attacks['maxDamage'][chosen]
+    damage = min_damage + np.floor(rng.random(len(chosen)) * (max_damage - min_damage + 1)).astype(np.int64)
+    attack_hit = attacks['hitChance'][chosen]
+    attack_crit = attacks['critChance'][chosen]
+
+    # Previous chances only carry over when the same attack is used again, enemies never carry over their hit chance
+    same_attack = previous_id == chosen
+    if player:
+        hit_chance = np.where(same_attack & (previous_hit > 0), previous_hit, attack_hit)
+        hit_chance = np.where(previous_type == MISS, np.minimum(hit_chance + 5, 100), hit_chance) # Streak prevention for misses
+    else:
+        hit_chance = np.where(same_attack, 100, attack_hit)
+    crit_chance = np.where(same_attack & (previous_crit > 0), previous_crit, attack_crit)
+    crit_chance = np.where(previous_type == NORMAL, np.minimum(crit_chance + 1, 100), crit_chance) # Streak prevention for normal hits
+
+    missed = (hit_chance < 100) & roll_chances(rng, 100 - hit_chance)
+    critted = ~missed & roll_chances(rng, crit_chance)
+    crit_damage = np.maximum(np.rint(damage * (1 + attacks['critMulti'][chosen])).astype(np.int64), max_damage + 1)
+
+    previous_id[mask] = chosen[mask]
+    previous_type[mask] = np.where(missed, MISS, np.where(critted, CRIT, NORMAL))[mask]
+    previous_hit[mask] = np.where(missed, hit_chance, attack_hit)[mask]
+    previous_crit[mask] = np.where(critted | missed, attack_crit, crit_chance)[mask]
+
+    return np.where(mask & ~missed, np.where(critted, crit_damage, damage), 0)
+
+def attack_arrays(attacks):
+    """Converts a list of attacks into arrays of their stats, indexed like the list."""
+    return {
+        'minDamage': np.array([attack['minDamage'] for attack in attacks], dtype=np.int64),
+        'maxDamage': np.array([attack['maxDamage'] for attack in attacks], dtype=np.int64),
+        'hitChance': np.array([attack.get('hitChance', 100) for attack in attacks], dtype=np.int64),
+        'critChance': np.array([attack['critChance'] for attack in attacks], dtype=np.int64),
+        'critMulti': np.array([attack['critMulti'] for attack in attacks], dtype=np.float64),
+        'cooldown': np.array([attack.get('cooldown', 0) for attack in attacks], dtype=np.int64)
+    }
+
+def simulate_battles(weapon, enemy, player_level, battles=100000, seed=None, max_turns=1000, player_health=None):
+    """
+    Runs many independent battles in lockstep as NumPy arrays, using the same rules as the CombatEngine.
+    The player always uses the strongest ability that is off cooldown, like CombatEngine.choose_ability.
+
+    Parameters:
+    weapon (dict): Data of the player's weapon
+    enemy (dict): Data of the enemy
+    player_level (int): Level of the player, used to scale the player's health
+    battles (int): Number of battles to run
+    seed (int, optional): Seed for reproducible results
+    max_turns (int): Battles that last longer than this are counted as unfinished
+    player_health (int, optional): Overrides the player's health instead of scaling it by level
+
+    Returns:
+    dict: Win rate, distribution of turns and percentiles of the remaining health.
+    """
+    require_numpy()
+    rng = np.random.default_rng(seed)
+
+    abilities = resolve_abilities(weapon)
+    player_attacks = attack_arrays(abilities)
+    enemy_attacks = attack_arrays(enemy['attacks'])
+    enemy_weights = np.cumsum([attack['attackChance'] for attack in enemy['attacks']], dtype=np.float64)
+    # Order in which abilities are tried, strongest first
+    priority = sorted(range(len(abilities)), key=lambda index: expected_damage(abilities[index]), reverse=True)
+
+    if player_health is None:
+        player_health = globals.Player.health_for_level(player_level)
+
+    # State of the battles that are still running, finished battles are removed every turn
+    player_hp = np.full(battles, player_health, dtype=np.int64)
+    enemy_hp = np.full(battles, enemy['health'], dtype=np.int64)
+    cooldowns = np.zeros((battles, len(abilities)), dtype=np.int64)
+    player_streak = [np.full(battles, -1, dtype=np.int64)] + [np.zeros(battles, dtype=np.int64) for _ in range(3)]
+    enemy_streak = [np.full(battles, -1, dtype=np.int64)] + [np.zeros(battles, dtype=np.int64) for _ in range(3)]
+
+    # Results of the finished battles
+    finished_turns = []
+    finished_player_hp = []
+    finished_enemy_hp = []
+
+    for turn in range(1, max_turns + 1):
+        if len(player_hp) == 0:
+            break
+        rows = np.arange(len(player_hp))
+
+        # ===========
+        # Player turn
+        # ===========
+
+        # Pick the strongest ability that is off cooldown, battles without one idle for the turn
+        chosen = np.full(len(rows), -1, dtype=np.int64)
+        for index in reversed(priority):
+            chosen = np.where(cooldowns[:, index] == 0, index, chosen)
+        attacking = chosen >= 0
+        chosen = np.maximum(chosen, 0)
+
+        # Set the cooldown of the chosen ability, then update every cooldown
+        updated_cooldowns = cooldowns.copy()
+        updated_cooldowns[rows, chosen] = player_attacks['cooldown'][chosen] + 1
+        cooldowns = np.where(attacking[:, None], np.maximum(updated_cooldowns - 1, 0), cooldowns)
+
+        damage = resolve_attacks(rng, player_attacks, chosen, attacking, player_streak)
+        enemy_hp = np.maximum(enemy_hp - damage, 0)
+
+        # ==========
+        # Enemy turn
+        # ==========
+
+        enemy_alive = enemy_hp > 0
+        chosen = np.searchsorted(enemy_weights, rng.random(len(rows)) * enemy_weights[-1], side='right')
+        damage = resolve_attacks(rng, enemy_attacks, chosen, enemy_alive, enemy_streak, player=False)
+        player_hp = np.maximum(player_hp - damage, 0)
+
+        # Record and remove finished battles
+        running = (player_hp > 0) & enemy_alive
+        if not running.all():
+            finished = ~running
+            finished_turns.append(np.full(int(finished.sum()), turn, dtype=np.int64))
+            finished_player_hp.append(player_hp[finished])
+            finished_enemy_hp.append(enemy_hp[finished])
+
+            player_hp = player_hp[running]
+            enemy_hp = enemy_hp[running]
+            cooldowns = cooldowns[running]
+            player_streak = [state[running] for state in player_streak]
+            enemy_streak = [state[running] for state in enemy_streak]
+
+    unfinished = len(player_hp)
+    finished_turns = np.concatenate(finished_turns) if finished_turns else np.zeros(0, dtype=np.int64)
+    finished_player_hp = np.concatenate(finished_player_hp) if finished_player_hp else np.zeros(0, dtype=np.int64)
+    finished_enemy_hp = np.concatenate(finished_enemy_hp) if finished_enemy_hp else np.zeros(0, dtype=np.int64)
+
+    wins = (finished_enemy_hp <= 0) & (finished_player_hp > 0)
+    losses = ~wins
+    turn_counts = np.bincount(finished_turns) if len(finished_turns) else np.zeros(0, dtype=np.int64)
+
+    def health_percentiles(health, max_health):
+        if len(health) == 0:
+            return None
+        return dict(zip(HEALTH_PERCENTILES, (np.percentile(health, HEALTH_PERCENTILES) / max_health * 100).round(2).tolist()))
+
+    return {
+        'battles': battles,
+        'winRate': float(wins.sum() / battles),
+        'unfinished': unfinished,
+        'meanTurns': float(finished_turns.mean()) if len(finished_turns) else None,
+        'turnPercentiles': dict(zip(HEALTH_PERCENTILES, np.percentile(finished_turns, HEALTH_PERCENTILES).tolist())) if len(finished_turns) else None,
+        'turnCounts': {turn: int(count) for turn, count in enumerate(turn_counts) if count}, # Number of finished battles by turns taken
+        'playerHealthPercentiles': health_percentiles(finished_player_hp[wins], player_health), # Remaining health (%) of the player in won battles
+        'enemyHealthPercentiles': health_percentiles(finished_enemy_hp[losses], enemy['health']) # Remaining health (%) of the enemy in lost battles
+    }
+
+def print_report(weapon_id, enemy_id, player_level, result, elapsed):
+    """Prints a readable report of a simulation result."""
+    print(f"{weapon_id} vs {enemy_id} at level {player_level}: {result['battles']} battles in {elapsed:.2f}s ({result['battles'] / max(elapsed, 1e-9):,.0f} battles/s)")
+    print(f"  Win rate: {result['winRate'] * 100:.3f}%" + (f" ({result['unfinished']} unfinished)" if result['unfinished'] else ''))
+    if result['meanTurns'] is not None:
+        print(f"  Turns: mean {result['meanTurns']:.2f}, percentiles {result['turnPercentiles']}")
+    if result['playerHealthPercentiles']:
+        print(f"  Remaining player health in wins (%): {result['playerHealthPercentiles']}")
+    if result['enemyHealthPercentiles']:
+        print(f"  Remaining enemy health in losses (%): {result['enemyHealthPercentiles']}")
+
+def main(arguments=None):
+    """Command line entry point: python -m src.simulation <weapon id> <enemy id> <player level>"""
+    import argparse
+    from .game import load_content
+
+    parser = argparse.ArgumentParser(description="Simulate many battles between a weapon and an enemy.")
+    parser.add_argument('weapon', help="ID of the player's weapon")
+    parser.add_argument('enemy', help="ID of the enemy")
+    parser.add_argument('level', type=int, help="Level of the player")
+    parser.add_argument('-n', '--battles', type=int, default=100000, help="Number of battles to simulate")
+    parser.add_argument('--seed', type=int, default=None, help="Seed for reproducible results")
+    arguments = parser.parse_args(arguments)
+
+    load_content()
+    weapon = globals.get_weapon(arguments.weapon)
+    enemy = globals.get_enemy(arguments.enemy)
+    if weapon is None or enemy is None:
+        parser.error(f"Unknown {'weapon' if weapon is None else 'enemy'} ID")
+
+    start_time = time.perf_counter()
+    result = simulate_battles(weapon, enemy, arguments.level, arguments.battles, arguments.seed)
+    print_report(arguments.weapon, arguments.enemy, arguments.level, result, time.perf_counter() - start_time)
+
+if __name__ == '__main__':
+    main()
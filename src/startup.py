@@ -0,0 +1,125 @@
+import builtins
+import importlib.util
+import os
+import sys
+import threading
+import time
+
+# Only the standard library is imported here, main.py enables the timer before importing the game
+
+STARTUP_BUDGET_ENV = 'GTRPG_STARTUP_BUDGET'  # Environment variable overriding the startup budget in seconds
+STARTUP_BUDGET = 0.5  # Seconds from launching main.py to an interactive main menu before the report fails
+REPORT_IMPORTS = 15   # Number of slowest imports listed in the report
+
+class StartupTimer:
+    """
+    Measures the time from launching main.py to the first interactive main menu (the --startup-report launch option).
+    Every newly imported module is timed like python -X importtime does: its cumulative time and its self time
+    without the modules it imported. Only imports on the main thread are timed, since they're the ones the player waits for.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.start = None               # time.perf_counter() when the timer was enabled
+        self.budget = STARTUP_BUDGET    # Seconds allowed until the main menu
+        self.phases = []                # (name, seconds since start) of every finished phase
+        self.imports = {}               # (self seconds, cumulative seconds) by module name
+        self.import_stack = []          # [module name, start, seconds spent in nested imports] of the imports in progress
+        self.original_import = None     # builtins.__import__ before the timer replaced it
+        self.main_thread = None
+
+    def enable(self, budget=None):
+        """
+        Starts timing the startup and the imports.
+
+        Parameters:
+        budget (float, optional): Seconds allowed until the main menu, defaults to GTRPG_STARTUP_BUDGET or STARTUP_BUDGET
+        """
+        if self.enabled:
+            return
+        self.enabled = True
+        self.start = time.perf_counter()
+        self.budget = budget or float(os.environ.get(STARTUP_BUDGET_ENV) or STARTUP_BUDGET)
+        self.main_thread = threading.get_ident()
+        self.original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def mark(self, name):
+        """Records the end of a startup phase (e.g. loading the game data). Does nothing if the timer is disabled."""
+        if self.enabled:
+            self.phases.append((name, time.perf_counter() - self.start))
+
+    def _new_module(self, name, globals, fromlist, level):
+        """Returns the name of the module an import statement loads for the first time, None if it's already loaded."""
+        if level:
+            try:
+                name = importlib.util.resolve_name('.' * level + name, (globals or {}).get('__package__') or '')
+            except (ImportError, ValueError):
+                return None
+        if name not in sys.modules:
+            return name
+        # from package import submodule, the submodule isn't an attribute of the package until it's loaded
+        for item in fromlist or ():
+            if item != '*' and not hasattr(sys.modules[name], item):
+                return f'{name}.{item}'
+        return None
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        """Replacement of builtins.__import__ that times modules imported for the first time."""
+        module_name = self._new_module(name, globals, fromlist, level) if threading.get_ident() == self.main_thread else None
+        if module_name is None:
+            return self.original_import(name, globals, locals, fromlist, level)
+
+        entry = [module_name, time.perf_counter(), 0.0]
+        self.import_stack.append(entry)
+        try:
+            return self.original_import(name, globals, locals, fromlist, level)
+        finally:
+            self.import_stack.pop()
+            cumulative = time.perf_counter() - entry[1]
+            if self.import_stack:
+                self.import_stack[-1][2] += cumulative
+            self.imports.setdefault(module_name, (cumulative - entry[2], cumulative))
+
+    def report(self):
+        """
+        Returns the startup report: the duration of every phase and the slowest imports.
+
+        Returns:
+        str: The report text
+        """
+        total = self.phases[-1][1] if self.phases else time.perf_counter() - self.start
+        lines = [f"Startup: {total:.3f}s to the main menu (budget {self.budget:.3f}s)", '']
+        lines.append(f"{'Phase':<30} {'Duration (ms)':>14} {'Since launch (ms)':>18}")
+        previous = 0.0
+        for name, since_start in self.phases:
+            lines.append(f'{name:<30} {(since_start - previous) * 1000:>14.1f} {since_start * 1000:>18.1f}')
+            previous = since_start
+
+        slowest = sorted(self.imports.items(), key=lambda item: item[1][0], reverse=True)[:REPORT_IMPORTS]
+        lines.append('')
+        lines.append(f"{'Slowest imports':<45} {'Self (ms)':>10} {'Cumulative (ms)':>16}")
+        for module_name, (self_time, cumulative) in slowest:
+            lines.append(f'{module_name:<45} {self_time * 1000:>10.1f} {cumulative * 1000:>16.1f}')
+        lines.append(f'{len(self.imports)} modules imported')
+        return '\n'.join(lines)
+
+    def finish(self):
+        """
+        Stops timing imports and prints the report.
+
+        Returns:
+        int: Exit code, 1 if the startup took longer than the budget
+        """
+        if not self.enabled:
+            return 0
+        builtins.__import__ = self.original_import
+        self.enabled = False
+        print(self.report())
+        total = self.phases[-1][1] if self.phases else 0
+        if total > self.budget:
+            print(f"Startup took {total - self.budget:.3f}s longer than the budget of {self.budget:.3f}s")
+            return 1
+        return 0
+
+# Global instance
+startup = StartupTimer()
@@ -0,0 +1,182 @@
+from .libraries import *
+from .utils import *
+
+import atexit
+import codecs
+
+if platform.system() == "Windows":
+    import msvcrt
+else:
+    import select
+    import termios
+    import tty
+
+# Escape sequences sent by terminals for special keys, mapped to the same key names as pynput
+ESCAPE_SEQUENCES = {
+    '[A': 'up', '[B': 'down', '[C': 'right', '[D': 'left',
+    'OA': 'up', 'OB': 'down', 'OC': 'right', 'OD': 'left',  # Sent in application cursor mode
+    '[H': 'home', '[F': 'end', 'OH': 'home', 'OF': 'end',
+    '[2~': 'insert', '[3~': 'delete', '[5~': 'page_up', '[6~': 'page_down'
+}
+
+# Single characters with a key name
+CONTROL_CHARACTERS = {
+    '\r': 'enter', '\n': 'enter',
+    '\t': 'tab',
+    ' ': 'space',
+    '\x7f': 'backspace', '\x08': 'backspace'
+}
+
+# Scan codes sent by msvcrt after '\x00' or '\xe0' for special keys on Windows
+WINDOWS_SCAN_CODES = {
+    'H': 'up', 'P': 'down', 'K': 'left', 'M': 'right',
+    'G': 'home', 'O': 'end', 'R': 'insert', 'S': 'delete', 'I': 'page_up', 'Q': 'page_down'
+}
+
+def decode_keys(text):
+    """
+    Decodes characters read from a terminal into key names, like the ones the pynput backend produces.
+
+    Parameters:
+    text (str): Characters read from the terminal
+
+    Returns:
+    tuple: The list of decoded key names and the characters of an unfinished escape sequence at the end
+           (a lone '\x1b' is returned as unfinished too, since it may be the start of a sequence)
+    """
+    keys = []
+    index = 0
+    while index < len(text):
+        character = text[index]
+        if character == '\x1b':
+            # Escape sequences are ESC + '[' + parameters + a final character, or ESC + 'O' + a final character
+            if index + 1 >= len(text):
+                return keys, text[index:]
+            if text[index + 1] not in '[O':
+                keys.append('esc')  # ESC followed by a normal key
+                index += 1
+                continue
+            end = index + 2
+            if text[index + 1] == '[':
+                while end < len(text) and ' ' <= text[end] <= '?':  # Skip parameters like '3' or '1;5'
+                    end += 1
+            if end >= len(text):
+                return keys, text[index:]
+            sequence = text[index + 1:end + 1]
+            if sequence in ESCAPE_SEQUENCES:
+                keys.append(ESCAPE_SEQUENCES[sequence])
+            index = end + 1  # Unknown sequences (e.g. keys with modifiers) are skipped
+        else:
+            if character in CONTROL_CHARACTERS:
+                keys.append(CONTROL_CHARACTERS[character])
+            elif character.isprintable():
+                keys.append(character)
+            index += 1
+    return keys, ''
+
+class TerminalInput:
+    """
+    Reads key presses from the terminal the game runs in, without any global keyboard hook or focus checks.
+    This works over SSH and in containers where pynput can't be used. Keys are read by a single thread that
+    blocks on the terminal and passes every decoded key name to on_key.
+
+    Args:
+        on_key (function): Called with the name of every key pressed.
+    """
+    def __init__(self, on_key):
+        self.on_key = on_key
+        self.thread = None
+        self.running = False
+        self.fd = None
+        self.old_attributes = None   # Terminal attributes to restore when stopping
+        self.wake_pipe = None        # Pipe used to wake the reading thread up when stopping
+        self.stop_registered = False # Whether stop is registered to run at exit, only once since the game restarts reading after crashes
+
+    @staticmethod
+    def is_supported():
+        """Whether the game runs in an interactive terminal that keys can be read from."""
+        try:
+            return sys.stdin is not None and sys.stdin.isatty()
+        except (AttributeError, ValueError):
+            return False
+
+    def is_alive(self):
+        """Whether the reading thread is running."""
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        """Switches the terminal to cbreak mode (keys are read as soon as they're pressed, without echo) and starts reading."""
+        if self.is_alive():
+            return
+        self.running = True
+        if platform.system() != "Windows":
+            self.fd = sys.stdin.fileno()
+            self.old_attributes = termios.tcgetattr(self.fd)
+            tty.setcbreak(self.fd)
+            if not self.stop_registered:
+                atexit.register(self.stop)  # Restore the terminal even if the game exits unexpectedly
+                self.stop_registered = True
+            self.wake_pipe = os.pipe()
+        self.thread = threading.Thread(target=self._run_windows if platform.system() == "Windows" else self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stops reading and restores the terminal's previous mode."""
+        self.running = False
+        wake_pipe, self.wake_pipe = self.wake_pipe, None
+        if wake_pipe:
+            try:
+                os.write(wake_pipe[1], b'\0')
+            except OSError:
+                pass  # The reading thread already stopped and closed the pipe
+        if self.old_attributes is not None:
+            termios.tcsetattr(self.fd, termios.TCSADRAIN, self.old_attributes)
+            self.old_attributes = None
+
+    def _run(self):
+        """Reads and decodes keys until stopped (Linux and macOS)."""
+        wake_pipe = self.wake_pipe
+        wake_fd = wake_pipe[0]
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')  # Keeps characters split between reads
+        pending = ''
+        try:
+            while self.running:
+                # Wait for input, only wait briefly if an unfinished escape sequence may still be completed
+                readable, _, _ = select.select([self.fd, wake_fd], [], [], 0.05 if pending else None)
+                if wake_fd in readable or not self.running:
+                    break
+                if not readable:
+                    # Nothing followed the escape character, so it was the ESC key itself
+                    keys, pending = decode_keys(pending[1:])
+                    keys.insert(0, 'esc')
+                else:
+                    data = os.read(self.fd, 1024)
+                    if not data:
+                        break  # The terminal was closed
+                    keys, pending = decode_keys(pending + decoder.decode(data))
+                for key in keys:
+                    self.on_key(key)
+        except Exception as e:
+            debug.error("Terminal input stopped: %s", e)
+        finally:
+            for pipe_fd in wake_pipe:
+                os.close(pipe_fd)
+
+    def _run_windows(self):
+        """Reads and decodes keys until stopped (Windows console)."""
+        try:
+            while self.running:
+                character = msvcrt.getwch()
+                if not self.running:
+                    break
+                if character in ('\x00', '\xe0'):
+                    key = WINDOWS_SCAN_CODES.get(msvcrt.getwch())
+                elif character == '\x1b':
+                    key = 'esc'
+                else:
+                    keys, _ = decode_keys(character)
+                    key = keys[0] if keys else None
+                if key:
+                    self.on_key(key)
+        except Exception as e:
+            debug.error("Terminal input stopped: %s", e)
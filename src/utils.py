@@ -1,32 +1,150 @@
 from .libraries import *
 
+import atexit
+import gzip
+
 # Constants: Directory paths for various project assets
 ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), '..'))
 SRC_DIR = os.path.join(ROOT, 'src')
-DATA_DIR = os.path.join(ROOT, 'data')
+DATA_DIR = os.environ.get('GTRPG_DATA_DIR') or os.path.join(ROOT, 'data')  # GTRPG_DATA_DIR points the game to other content, e.g. from src.generator
 ENEMIES_DIR = os.path.join(DATA_DIR, 'enemies')
 WEAPONS_DIR = os.path.join(DATA_DIR, 'weapons')
 ATTACKS_DIR = os.path.join(WEAPONS_DIR, 'attacks')
 LOGS_DIR = os.path.join(SRC_DIR, 'logs')
+CACHE_DIR = os.path.join(SRC_DIR, 'cache')
 
 # Ensure the logs directory exists, if not, create it
 os.makedirs(LOGS_DIR, exist_ok=True)
 
 # Set up logging for better debugging and error monitoring
-# The debug log will capture all debug-level messages
+# Log records are put on a queue and written to the log files by a background listener thread,
+# so logging never waits for the disk. Messages use %-style arguments so they're only formatted if logged.
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+LOG_LEVEL_ENV = 'GTRPG_LOG_LEVEL'       # Environment variable overriding the debug log level (e.g. DEBUG, INFO, WARNING, OFF)
+DEFAULT_LOG_LEVEL = 'INFO'
+LOG_LEVEL_OFF = logging.CRITICAL + 1    # Level above every message, disables a logger
+
+# Log files are rotated when they get too big or too old, keeping a number of older files next to them
+LOG_MAX_BYTES = 5 * 1024 * 1024         # Size after which a log file is rotated
+LOG_MAX_AGE = 7 * 24 * 60 * 60          # Seconds after which a log file is rotated
+LOG_BACKUP_COUNT = 5                    # Number of rotated files kept per log
+
+class RotatingLogHandler(logging.handlers.RotatingFileHandler):
+    """
+    Appends to a log file and rotates it (log.1, log.2, ...) once it is bigger than max_bytes or older than max_age.
+    Rotated files can be compressed with gzip. Handlers run on the log listener thread, so rotating never blocks the game.
+
+    Parameters:
+        file_path (str): Path of the log file.
+        max_bytes (int): Size in bytes after which the file is rotated, 0 to never rotate by size.
+        max_age (float): Age in seconds after which the file is rotated, 0 to never rotate by age.
+        backup_count (int): Number of rotated files to keep.
+        compress (bool): Whether to compress rotated files with gzip.
+    """
+    def __init__(self, file_path, max_bytes=LOG_MAX_BYTES, max_age=LOG_MAX_AGE, backup_count=LOG_BACKUP_COUNT, compress=False):
+        super().__init__(file_path, mode='a', maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+        self.max_age = max_age
+        self.compress = compress
+        # The age of an existing file counts from its last change, so old logs are rotated on the first new record
+        started_at = os.path.getmtime(file_path) if os.path.exists(file_path) else time.time()
+        self.rollover_at = started_at + max_age
+
+    def configure(self, backup_count=None, compress=None):
+        """Changes the number of kept files and whether they are compressed, applied at the next rotation."""
+        if backup_count is not None:
+            self.backupCount = max(int(backup_count), 0)
+        if compress is not None:
+            self.compress = bool(compress)
+
+    def rotation_filename(self, default_name):
+        return default_name + '.gz' if self.compress else default_name
+
+    def rotate(self, source, dest):
+        if not self.compress or not os.path.exists(source):
+            super().rotate(source, dest)
+            return
+        with open(source, 'rb') as source_file, gzip.open(dest, 'wb') as dest_file:
+            shutil.copyfileobj(source_file, dest_file)
+        os.remove(source)
+
+    def shouldRollover(self, record):
+        if self.max_age and time.time() >= self.rollover_at and os.path.exists(self.baseFilename):
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self):
+        if self.backupCount <= 0:
+            # RotatingFileHandler only rotates with backups, without them the file is started over
+            if self.stream:
+                self.stream.close()
+                self.stream = None
+            open(self.baseFilename, 'w').close()
+        else:
+            super().doRollover()
+        self.rollover_at = time.time() + self.max_age
+
+# The debug log will capture all messages from the configured level
 # To debug, open up a powershell terminal then type "Clear-Host; Get-Content ./src/logs/debug.log -Wait" and press enter
-debug_handler = logging.FileHandler(os.path.join(LOGS_DIR, 'debug.log'), mode='w', encoding='utf-8')
-debug_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
-debug = logging.getLogger("debug")
-debug.setLevel(logging.DEBUG)
-debug.addHandler(debug_handler)
+# (set GTRPG_LOG_LEVEL=DEBUG to see every message)
+debug_handler = RotatingLogHandler(os.path.join(LOGS_DIR, 'debug.log'))
+debug_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+debug_handler.addFilter(logging.Filter("debug"))
 
 # The crash log will capture errors and critical crashes
-crash_handler = logging.FileHandler(os.path.join(LOGS_DIR, 'crash.log'), mode='a', encoding='utf-8')
-crash_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+crash_handler = RotatingLogHandler(os.path.join(LOGS_DIR, 'crash.log'))
+crash_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+crash_handler.addFilter(logging.Filter("crash"))
+
+# Both loggers share one queue, the file handlers filter the records by logger name
+log_queue = queue.SimpleQueue()
+log_listener = logging.handlers.QueueListener(log_queue, debug_handler, crash_handler)
+log_listener.start()
+
+debug = logging.getLogger("debug")
+debug.addHandler(logging.handlers.QueueHandler(log_queue))
+debug.propagate = False
+
 crash = logging.getLogger("crash")
 crash.setLevel(logging.ERROR)
-crash.addHandler(crash_handler)
+crash.addHandler(logging.handlers.QueueHandler(log_queue))
+crash.propagate = False
+
+def parse_log_level(level):
+    """
+    Converts a log level name like 'DEBUG' or 'off' to a logging level.
+
+    Returns:
+        int: The logging level, or None if the name isn't a valid level.
+    """
+    if isinstance(level, int):
+        return level
+    if not isinstance(level, str):
+        return None
+    level = level.strip().upper()
+    if level in ('OFF', 'NONE', 'DISABLED'):
+        return LOG_LEVEL_OFF
+    value = logging.getLevelName(level)
+    return value if isinstance(value, int) else None
+
+def configure_logging(level=None, debug_file=True):
+    """
+    Sets the level of the debug log. The GTRPG_LOG_LEVEL environment variable takes priority over the given level.
+
+    Parameters:
+        level (str): Name of the log level (default is INFO).
+        debug_file (bool): Whether to write the debug log at all. The crash log is always written.
+    """
+    level = parse_log_level(os.environ.get(LOG_LEVEL_ENV)) or parse_log_level(level) or parse_log_level(DEFAULT_LOG_LEVEL)
+    debug.setLevel(level if debug_file else LOG_LEVEL_OFF)
+
+def apply_log_settings(settings):
+    """Sets up the logs from the player's settings (logLevel, debugLogging, logBackupCount and compressLogs)."""
+    configure_logging(settings.get('logLevel'), settings.get('debugLogging', True))
+    for handler in (debug_handler, crash_handler):
+        handler.configure(settings.get('logBackupCount'), settings.get('compressLogs'))
+
+configure_logging()
+atexit.register(log_listener.stop)  # Write the remaining records when exiting
 
 def int_str(string):
     """
@@ -41,21 +159,23 @@ def int_str(string):
     except:
         return None
 
-def roll_chance(chance):
+def roll_chance(chance, rng=random):
     """
     Simulates a chance roll.
     
     Returns True if a random number between 0 and 100 is less than or equal to the chance.
     The chance is expressed as an integer percentage (e.g., 50 for 50%).
+    A seeded `random.Random` can be passed as rng to make rolls reproducible.
     """
-    return random.randint(0, 100) <= chance
+    return rng.randint(0, 100) <= chance
 
-def roll_percentage(chance):
+def roll_percentage(chance, rng=random):
     """
     Simulates a precise percentage roll, handles decimal chances like 0.25 for 0.25%.
     
     Parameters:
         chance (float): The percentage chance (e.g., 0.25 for 0.25%).
+        rng (random.Random): The random number generator to roll with (default is the `random` module).
     
     Returns:
         bool: True if the roll succeeds, False otherwise.
@@ -64,7 +184,7 @@ def roll_percentage(chance):
     decimals = len(chance_str.split('.')[1]) if '.' in chance_str else 0
     precision = 10 ** (decimals + 2)  # +2 because percentages are ×100
     scaled_chance = int(chance * (10 ** decimals))  # 0.025 → 25
-    roll = random.randint(1, precision)  # 1-1000 for 0.025%
+    roll = rng.randint(1, precision)  # 1-1000 for 0.025%
     
     return roll <= scaled_chance
 
@@ -126,16 +246,84 @@ def merge(left, right, key, ascending):
     
     return sorted_array
 
-def is_terminal_in_focus():
+# Titles of windows that count as the game's terminal
+TERMINAL_TITLES = ['Command Prompt', 'Terminal', 'Visual Studio Code', 'PowerShell', 'generic terminal rpg']
+
+def query_terminal_focus():
     """
-    Check if the terminal window is currently in focus.
+    Asks the window manager if the terminal window is currently in focus. This is slow, use is_terminal_in_focus instead.
     
     Returns:
         bool: True if the terminal window is in focus, False otherwise.
     """
+    gw = optional_import('pygetwindow')
+    if gw is None:
+        return True  # Focus can't be checked without pygetwindow
     active_window = gw.getActiveWindow()
-    terminal_titles = ['Command Prompt', 'Terminal', 'Visual Studio Code', 'PowerShell', 'generic terminal rpg']
-    return active_window and any(t in active_window.title for t in terminal_titles)
+    return bool(active_window and any(t in active_window.title for t in TERMINAL_TITLES))
+
+class FocusTracker:
+    """
+    Keeps the terminal's focus state up to date from a background thread, so key presses only read a cached value.
+
+    Args:
+        interval (float): Seconds between focus checks.
+    """
+    def __init__(self, interval=0.2):
+        self.interval = interval
+        self.focused = False         # Cached focus state
+        self.updated_at = None       # time.monotonic() of the last check
+        self.queries_avoided = 0     # Focus checks answered from the cache instead of the window manager
+        self.thread = None
+        self.lock = threading.Lock()
+
+    @property
+    def age(self):
+        """Seconds since the focus state was last checked, or None if it was never checked."""
+        return None if self.updated_at is None else time.monotonic() - self.updated_at
+
+    def refresh(self):
+        """Checks the focus state now. Keeps the previous state if the window manager can't be reached."""
+        try:
+            self.focused = query_terminal_focus()
+        except Exception as e:
+            debug.warning("Couldn't check terminal focus: %s", e)
+        self.updated_at = time.monotonic()
+        return self.focused
+
+    def start(self):
+        """Checks the focus state once and starts the background thread if it isn't running."""
+        with self.lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self.refresh()
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        """Refreshes the focus state every interval."""
+        while True:
+            time.sleep(self.interval)
+            self.refresh()
+
+    def is_focused(self):
+        """Returns the cached focus state, starting the tracker on first use."""
+        if self.updated_at is None:
+            self.start()
+        else:
+            self.queries_avoided += 1
+        return self.focused
+
+focus_tracker = FocusTracker()
+
+def is_terminal_in_focus():
+    """
+    Check if the terminal window is currently in focus, using the focus state cached by the focus tracker.
+    
+    Returns:
+        bool: True if the terminal window is in focus, False otherwise.
+    """
+    return focus_tracker.is_focused()
 
 def load_data_from_directory(directory, data_type):
     """
@@ -157,11 +345,33 @@ def load_data_from_directory(directory, data_type):
                     with open(file_path, 'r') as file:
                         data.append(json.load(file))
                 except Exception as e:
-                    debug.error(f'Error loading {data_type} data from {file_name}: {e}')
+                    debug.error('Error loading %s data from %s: %s', data_type, file_name, e)
     else:
-        debug.warning(f'Directory {directory} does not exist.')
+        debug.warning('Directory %s does not exist.', directory)
     return data
 
+def get_directory_fingerprint(*directories):
+    """
+    Builds a fingerprint of every JSON file inside the given directories (including subdirectories).
+    Only the file paths, sizes and modification times are used, so no file has to be opened.
+    
+    Parameters:
+        directories (str): The directories to fingerprint.
+    
+    Returns:
+        str: A hex digest that changes whenever a file is added, removed or modified.
+    """
+    entries = []
+    for directory in directories:
+        for root, _, file_names in os.walk(directory):
+            for file_name in file_names:
+                if file_name.endswith('json'):
+                    file_path = os.path.join(root, file_name)
+                    stat = os.stat(file_path)
+                    entries.append(f'{os.path.relpath(file_path, ROOT)}|{stat.st_size}|{stat.st_mtime_ns}')
+    entries.sort()  # os.walk order is not guaranteed, so sort to keep the fingerprint stable
+    return hashlib.sha1('\n'.join(entries).encode('utf-8')).hexdigest()
+
 def load_file_from_directory(directory, name, extension='.json', backup=False):
     """
     Loads data from a single file in the specified directory.
@@ -180,48 +390,85 @@ def load_file_from_directory(directory, name, extension='.json', backup=False):
         file_name = f'{name}{extension}' if not name.endswith(extension) else name
         file_path = os.path.join(directory, file_name)
         try:
+            # Read the file once, it is parsed and backed up from memory
+            with open(file_path, 'rb') as file:
+                content = file.read()
             if extension == '.json':
-                with open(file_path, 'r') as file:
-                    data = json.load(file)
-                    debug.debug(f'Successfully loaded {file_name}')
-            save_backup(file_path, file_name)
+                data = json.loads(content)
+                debug.debug('Successfully loaded %s', file_name)
+            if backup:
+                save_backup(file_path, file_name, content=content, empty=not data)
         except FileNotFoundError:
-            debug.warning(f'File {file_name} does not exist.')
+            debug.warning('File %s does not exist.', file_name)
             return None
         except Exception as e:
-            debug.error(f'Error loading {file_name}: {e}')
+            debug.error('Error loading %s: %s', file_name, e)
             return None
     else:
-        debug.error(f'Directory {directory} does not exist.')
+        debug.error('Directory %s does not exist.', directory)
     return data
 
-def save_backup(file_path, file_name):
+def save_backup(file_path, file_name, content=None, empty=None):
     """
     Creates a backup of a file before modifying or overwriting it.
+    The backup is only written if its content differs from the existing backup.
     
     Parameters:
         file_path (str): The path of the file to back up.
         file_name (str): The name of the file to back up.
+        content (bytes): The content of the file if it was already read, so it isn't read again.
+        empty (bool): Whether the file's data is empty if it was already parsed (empty files aren't backed up).
+    """
+    try:
+        if content is None:
+            if not os.path.exists(file_path):
+                return
+            with open(file_path, 'rb') as file:
+                content = file.read()
+        if not content:
+            return
+        if empty is None and file_path.endswith('.json'):
+            empty = not json.loads(content)
+        if empty:
+            return
+
+        backup_file_path = file_path + '.bak'
+        # Compare sizes first so the backup is only read when it may be identical
+        if os.path.exists(backup_file_path) and os.path.getsize(backup_file_path) == len(content):
+            with open(backup_file_path, 'rb') as file:
+                if hashlib.sha1(file.read()).digest() == hashlib.sha1(content).digest():
+                    return
+        with open(backup_file_path, 'wb') as file:
+            file.write(content)
+    except Exception as e:
+        debug.error('Error saving backup of %s: %s', file_name, e)
+
+def write_json_atomic(file_path, data, indent=4):
     """
-    allow_backup = True
-    if os.path.exists(file_path) and os.stat(file_path).st_size > 0:
-        if file_path.endswith('.json'):
-            try:
-                with open(file_path, 'r') as file:
-                    data = json.load(file)
-                    if not data: backup = False
-            except Exception as e:
-                allow_backup = False
-                debug.error(f'Error saving backup of {file_name}: {e}')
-
-        if allow_backup:
-            backup_file_path = file_path + '.bak'
-            try:
-                shutil.copy(file_path, backup_file_path)
-            except Exception as e:
-                debug.error(f'Error saving backup of {file_name}: {e}')
-
-def save_file_from_directory(directory, name, data, extension='.json', backup=True, debugging=True):
+    Writes JSON data to a file without ever leaving a half-written file behind.
+    The data is written to a temporary file next to it, flushed to disk and then renamed over the file.
+    
+    Parameters:
+        file_path (str): The path of the file to write.
+        data (dict or list): The data to write.
+        indent (int): The JSON indentation, or None for a compact file (default is 4).
+    """
+    directory, file_name = os.path.split(file_path)
+    file_descriptor, temp_path = tempfile.mkstemp(prefix=f'.{file_name}.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(file_descriptor, 'w') as file:
+            json.dump(data, file, indent=indent)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+def save_file_from_directory(directory, name, data, extension='.json', backup=True, debugging=True, indent=4):
     """
     Saves data to a specified file in the given directory.
     
@@ -232,6 +479,7 @@ def save_file_from_directory(directory, name, data, extension='.json', backup=Tr
         extension (str): The file extension (default is '.json').
         backup (bool): Whether to create a backup of the file before saving (default is True).
         debugging (bool): Whether to log debug messages (default is True).
+        indent (int): The JSON indentation, or None for a compact file (default is 4).
     """
     if os.path.exists(directory):
         file_name = f'{name}{extension}' if not name.endswith(extension) else name
@@ -241,10 +489,10 @@ def save_file_from_directory(directory, name, data, extension='.json', backup=Tr
                 save_backup(file_path, file_name)
             if extension == '.json':
                 with open(file_path, 'w') as file:
-                    json.dump(data, file, indent=4)
+                    json.dump(data, file, indent=indent)
             if debugging:
-                debug.debug(f'Successfully saved {file_name}:\n{str(data)}')
+                debug.debug('Successfully saved %s:\n%s', file_name, data)
         except Exception as e:
-            debug.error(f'Error saving {file_name}: {e}')
+            debug.error('Error saving %s: %s', file_name, e)
     else:
-        debug.error(f'Directory {directory} does not exist.')
+        debug.error('Directory %s does not exist.', directory)
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Import the game as the src package from the repository root, like python -m src.<tool> does
+ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
@@ -0,0 +1,51 @@
+import atexit
+import os
+import pty
+import sys
+
+import pytest
+
+from src.keyboard_manager import KeyboardManager
+from src.metrics import keys_received, keys_dropped
+
+@pytest.mark.skipif(sys.platform == 'win32', reason="Reads keys from a pseudo terminal")
+def test_terminal_restarts_register_stop_once(monkeypatch):
+    """Crash handling restarts the listener, the terminal must still only be restored once at exit."""
+    leader, follower = pty.openpty()
+    terminal = os.fdopen(follower, 'r')
+    registered = []
+    monkeypatch.setattr(sys, 'stdin', terminal)
+    monkeypatch.setattr(atexit, 'register', lambda function, *args, **kwargs: registered.append(function))
+
+    manager = KeyboardManager()
+    manager.backend = 'terminal'
+    try:
+        for _ in range(3):
+            manager.start()
+            manager.stop()
+            manager.listener.thread.join(5)
+            assert not manager.listener.is_alive()
+    finally:
+        terminal.close()
+        os.close(leader)
+
+    assert registered == [manager.terminal_input.stop]
+
+def dropped(reason):
+    """Returns the keys dropped for a reason so far."""
+    return keys_dropped.values.get(keys_dropped.label_key({'reason': reason}), 0)
+
+def test_every_received_key_is_counted():
+    """Keys are counted when they arrive, also the ones that never reach a handler."""
+    manager = KeyboardManager()
+    received, no_handler, shutdown = keys_received.values.get((), 0), dropped('no_handler'), dropped('shutdown')
+
+    manager._handle_key('a')  # No handler is set
+    manager.current_handler = lambda key: None
+    manager._handle_key('b')  # Queued for the handler
+    manager.stop()
+    manager._handle_key('c')  # The manager is shutting down
+
+    assert keys_received.values[()] - received == 3
+    assert dropped('no_handler') - no_handler == 1
+    assert dropped('shutdown') - shutdown == 1
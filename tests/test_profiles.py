@@ -0,0 +1,24 @@
+import threading
+
+from src.profiles import ProfileStore
+
+def make_profile(money):
+    """Returns save data in the save_file.json format."""
+    return {'health': 100, 'money': money, 'level': 1, 'xp': {'current': 0, 'max': 100}, 'inventory': ['default'], 'equipped': 'default', 'settings': {}}
+
+def test_save_later_writes_every_profile_on_one_thread(tmp_path):
+    store = ProfileStore(str(tmp_path / 'profiles.db'))
+    transactions = []
+    save_many = store.save_many
+    store.save_many = lambda profiles: (transactions.append(len(profiles)), save_many(profiles))
+    threads_before = threading.active_count()
+
+    for index in range(500):
+        store.save_later(f'player_{index}', make_profile(index), debugging=False)
+    store.save_later('player_3', make_profile(333), debugging=False)  # Replaces the pending data of the profile
+    assert threading.active_count() - threads_before == 1
+
+    assert store.load('player_3')['money'] == 333  # Loading writes the pending profiles first
+    assert transactions == [500]
+    assert len(store.list_profiles()) == 500
+    store.close()
@@ -0,0 +1,23 @@
+import pytest
+
+from src import globals
+from src.game import load_content
+from src.simulation import simulate_battles
+from src.solver import MatchupSolver
+
+BATTLES = 200000  # Standard error of the simulated win rate is about 0.1 percentage points
+
+def test_solver_agrees_with_simulator():
+    """The exact solver and the Monte Carlo simulator implement the same rules, on a close matchup they agree within sampling error."""
+    pytest.importorskip('numpy')  # Required by the simulator
+    load_content()
+    weapon, enemy = globals.get_weapon('copper'), globals.get_enemy('skeleton')
+
+    exact = MatchupSolver(weapon, enemy, 2, bucket=1).solve(tolerance=0)
+    fast = MatchupSolver(weapon, enemy, 2).solve()
+    simulated = simulate_battles(weapon, enemy, 2, BATTLES, seed=1)
+
+    assert exact['unresolved'] < 1e-9
+    assert abs(exact['winProbability'] - simulated['winRate']) < 0.005
+    assert abs(exact['expectedTurns'] - simulated['meanTurns']) < 0.05
+    assert abs(fast['winProbability'] - exact['winProbability']) < 0.0001
@@ -0,0 +1,31 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Runs the --startup-report path of main.py in a fresh interpreter (so every import is timed) without a keyboard:
+# the game's imports, load_game_data and the first main menu, which has to accept scripted keys
+HEADLESS_STARTUP = '''
+import sys
+import tempfile
+from src.startup import startup
+startup.enable()
+from src import game, globals
+from src.session import GameSession
+from src.save_manager import SaveManager
+startup.mark('imports')
+globals.save_manager = SaveManager(tempfile.mkdtemp(), 'save_file')  # Never touch the real save file
+session = GameSession()
+game.load_game_data(session)
+startup.mark('load_game_data')
+game.main_loop(session)  # Marks main_menu and returns once the main menu is shown
+from src.e2e import ScriptedInput
+ScriptedInput(session).wait()  # The main menu accepts keys
+sys.exit(startup.finish())
+'''
+
+def test_startup_within_budget():
+    result = subprocess.run([sys.executable, '-c', HEADLESS_STARTUP], cwd=ROOT, capture_output=True, text=True, timeout=120)
+    assert 'to the main menu' in result.stdout, result.stderr
+    assert result.returncode == 0, result.stdout[result.stdout.find('Startup:'):]